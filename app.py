@@ -1,15 +1,42 @@
 import streamlit as st
+import atexit
 import os
 from dotenv import load_dotenv
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import json
+import shutil
+import subprocess
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+from study_buddy.aggregates import StudyAggregates
+from study_buddy.artifacts import ArtifactStore, content_digest, ingest_recipe
+from study_buddy.config import data_dir
+from study_buddy.conversation import ConversationMemory
+from study_buddy.export import export_extension, export_file, import_records, read_records
+from study_buddy.instrumentation import METRICS, JsonlSink, RerunTimer, measure, profile_rerun
+from study_buddy.intents import SUBJECTS, LEARNING_STYLES
+from study_buddy.jobs import DONE, FAILED, JobQueue, default_queue_path, sweep_uploads
+from study_buddy.lazy import lazy_import
+from study_buddy.llm_client import LLMBackend, TutorBackendError
+from study_buddy.progress import FREQUENCIES, load_session_columns, study_time_figure
+from study_buddy.quiz import ReviewQueue, answer_item, bank_items
+from study_buddy.quiz_generation import ClozeGenerator, generate_quiz_items
+from study_buddy.response_cache import CachedBackend, LRUCache, SQLiteCache
+from study_buddy.storage import Storage
+from study_buddy.tutor import ResponseTiming, TemplateBackend, generate_ai_response
+from study_buddy.vector_store import store_for_user
+
+# Loaded the first time a chart is drawn
+px = lazy_import("plotly.express")
 
 # Load environment variables
 load_dotenv()
 
+rerun_timer = RerunTimer()
+
 # Page configuration
 st.set_page_config(
     page_title="AI Learning Platform",
@@ -56,92 +83,349 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'user_data' not in st.session_state:
-    st.session_state.user_data = {
-        'name': '',
-        'subject': '',
-        'learning_style': '',
-        'goals': [],
-        'progress': {},
-        'study_sessions': [],
-        'quiz_scores': []
+
+STREAM_REPAINT_SECONDS = 0.05
+CHAT_PAGE_SIZE = 20
+# Due quiz items are counted up to this many; beyond it the Progress page shows "N+"
+QUIZ_DUE_SHOWN = 50
+# Question generation: chunks per batch, and worker threads shared by every session
+QUIZ_BATCH_CHUNKS = 8
+QUIZ_WORKERS = 4
+# While an upload job is queued or running, the page reruns itself this often to show its progress
+JOB_POLL_SECONDS = 1.0
+# Per-student objects kept per server process. Each browser session without a name gets
+# its own guest account, so these are bounded; an evicted entry is rebuilt from storage
+STUDENT_CACHE_ENTRIES = 256
+STUDENT_CACHE_TTL_SECONDS = 3600
+# Open vector stores kept per server process; each holds its whole index in memory
+VECTOR_STORE_CACHE_ENTRIES = 32
+# Sources of the notes indexed for the tutor next to uploaded documents
+CHAT_NOTES_SOURCE = "Your earlier questions"
+SESSION_NOTES_SOURCE = "Your study sessions"
+EXPORT_CHOICES = {
+    "NDJSON (gzip)": ("ndjson", True),
+    "NDJSON": ("ndjson", False),
+    "Parquet": ("parquet", False),
+}
+RECOMMENDATIONS = {
+    "Visual": [
+        "Use mind maps and diagrams to organize concepts",
+        "Watch educational videos and infographics",
+        "Create visual flashcards with images",
+        "Use color coding for different topics"
+    ],
+    "Auditory": [
+        "Listen to educational podcasts and lectures",
+        "Read aloud or discuss topics with others",
+        "Use voice notes to record your understanding",
+        "Participate in group discussions"
+    ],
+    "Kinesthetic": [
+        "Use hands-on activities and experiments",
+        "Take frequent breaks and move around",
+        "Use physical objects to represent concepts",
+        "Practice with real-world applications"
+    ],
+    "Reading/Writing": [
+        "Take detailed notes and summaries",
+        "Write essays and explanations",
+        "Create written flashcards",
+        "Read extensively on topics"
+    ]
+}
+
+
+@st.cache_resource
+def get_storage():
+    """One SQLite connection pool shared by every session on this server"""
+    storage = Storage(data_dir("study_buddy.db"))
+    storage.add_quiz_items(bank_items())
+    return storage
+
+
+@st.cache_resource
+def get_tutor_backend():
+    """Tutor backend behind a memory and on-disk response cache, shared by all sessions"""
+    # A configured chat API (or the local stub server) replaces the built-in templates
+    if os.getenv("OPENAI_API_KEY") or os.getenv("OPENAI_BASE_URL"):
+        backend = LLMBackend(model=os.getenv("OPENAI_MODEL", "gpt-3.5-turbo"))
+    else:
+        backend = TemplateBackend()
+    return CachedBackend(
+        backend,
+        memory=LRUCache(maxsize=1024, ttl=3600),
+        disk=SQLiteCache(data_dir("response_cache.db"))
+    )
+
+
+@st.cache_resource
+def attach_metrics_sink():
+    """Append every metric sample to the JSON-lines file named by STUDY_BUDDY_METRICS_LOG, if set"""
+    path = os.getenv("STUDY_BUDDY_METRICS_LOG")
+    if not path:
+        return None
+    sink = JsonlSink(path)
+    METRICS.add_sink(sink)
+    atexit.register(sink.flush)
+    return sink
+
+
+@st.cache_resource
+def get_conversation_memory():
+    """Token-budgeted chat context for tutor prompts, backed by the shared storage"""
+    return ConversationMemory(get_storage())
+
+
+@st.cache_resource(max_entries=STUDENT_CACHE_ENTRIES, ttl=STUDENT_CACHE_TTL_SECONDS)
+def get_aggregates(user_id):
+    """Running totals for a student, shared by all of their sessions on this server"""
+    return StudyAggregates.from_storage(get_storage(), user_id)
+
+
+@st.cache_resource(max_entries=STUDENT_CACHE_ENTRIES, ttl=STUDENT_CACHE_TTL_SECONDS)
+def get_review_queue(user_id, subject):
+    """A student's quiz items in a subject ordered by due time, shared by all of their sessions"""
+    storage = get_storage()
+    storage.enroll_items(user_id, subject, time.time())
+    return ReviewQueue.from_storage(storage, user_id, subject)
+
+
+@st.cache_resource
+def get_quiz_pool():
+    """Worker threads for question generation, bounded for the whole server"""
+    return ThreadPoolExecutor(max_workers=QUIZ_WORKERS, thread_name_prefix="quiz-gen")
+
+
+@st.cache_resource
+def get_artifact_store():
+    """Processed uploads keyed by content hash, so a file any student already uploaded is not re-embedded"""
+    max_mb = int(os.getenv("STUDY_BUDDY_ARTIFACT_CACHE_MB", "2048"))
+    return ArtifactStore(data_dir("artifacts"), max_bytes=max_mb << 20)
+
+
+def worker_setting():
+    """STUDY_BUDDY_WORKERS: a number of workers to start, "external", or "0" for none"""
+    workers = os.getenv("STUDY_BUDDY_WORKERS", "0").strip() or "0"
+    if workers == "external":
+        return workers
+    if workers.isdigit():
+        return str(int(workers))
+    # Shown on every run, since a cached resource would show it only once
+    st.error(
+        f"STUDY_BUDDY_WORKERS should be a number of worker processes or \"external\", not {workers!r}. "
+        "Uploads are processed in the page until it is fixed."
+    )
+    return "0"
+
+
+@st.cache_resource
+def get_job_queue(workers):
+    """Queue for uploads processed by worker processes, or None to process them in the page's own run.
+
+    ``workers`` comes from ``worker_setting()``: n starts n workers with this
+    server, and "external" only submits jobs, for workers run with
+    ``python -m study_buddy.jobs``.
+    """
+    if workers == "0":
+        return None
+    job_queue = JobQueue(default_queue_path())
+    # Uploads left from an earlier run whose jobs will never finish
+    sweep_uploads(job_queue, data_dir("uploads"))
+    if workers != "external":
+        # A separate command, since processes spawned from here would re-run this script on import
+        service = subprocess.Popen(
+            [sys.executable, "-m", "study_buddy.jobs", "--workers", workers, "--queue", job_queue.path],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        atexit.register(service.terminate)
+    return job_queue
+
+
+@st.cache_resource(max_entries=VECTOR_STORE_CACHE_ENTRIES)
+def get_vector_store(user_id):
+    """Keep recent students' vector indexes open; a store evicted here is reloaded from disk on next use"""
+    return store_for_user(user_id)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_progress_figure(user_id, data_version, freq):
+    """Study-time chart; keyed on the aggregates version so unchanged data is not re-plotted"""
+    return study_time_figure(load_session_columns(get_storage(), user_id), freq)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_topic_figure(user_id, data_version):
+    """Minutes per topic for the ten most-studied topics, re-plotted only when the data changes"""
+    topics = get_aggregates(user_id).topic_minutes.most_common(10)
+    return px.bar(
+        x=[topic for topic, _ in topics],
+        y=[minutes for _, minutes in topics],
+        labels={'x': 'Topic', 'y': 'Study Time (minutes)'}
+    )
+
+
+def load_profile(name):
+    """Load a student's profile; an empty name gets a guest account for this browser session"""
+    user = storage.get_or_create_user(name.strip() or st.session_state.guest_name)
+    return {
+        'id': user['id'],
+        'name': name,
+        'subject': user['subject'],
+        'learning_style': user['learning_style']
     }
 
-if 'chat_history' not in st.session_state:
-    st.session_state.chat_history = []
 
-# Sidebar for user profile
-with st.sidebar:
-    st.title("🎓 AI Learning Platform")
-    st.markdown("---")
+def format_timestamp(timestamp):
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M")
+
+
+def send_to_tutor(prompt, reply_area, store=None, history=None):
+    """Stream the tutor's answer into reply_area, then store both sides of the exchange in one write"""
+    asked_at = time.time()
+    st.session_state.chat_cursors = []
+    reply_area.write(f"**You:** {prompt}")
+    placeholder = reply_area.empty()
+    timing = ResponseTiming()
+    chunks = generate_ai_response(
+        prompt, st.session_state.user_data, store=store, backend=get_tutor_backend(), stream=True, history=history
+    )
+    ai_response = ""
+    painted_at = 0.0
+    try:
+        for chunk in timing.track(chunks):
+            ai_response += chunk
+            # Each repaint resends the whole reply, so cap the refresh rate
+            if time.perf_counter() - painted_at >= STREAM_REPAINT_SECONDS:
+                placeholder.write(f"**AI Tutor:** {ai_response}▌")
+                painted_at = time.perf_counter()
+    except TutorBackendError as e:
+        placeholder.error(f"The tutor is unavailable right now, please try again. ({e})")
+        return
+    if timing.ttft_ms is None or not ai_response:
+        placeholder.warning("The tutor sent back an empty reply, please try again.")
+        reply_area.caption(f"⏱️ No answer after {timing.total_ms:.0f} ms")
+        METRICS.record("tutor.full_reply", timing.total_ms)
+        return
+    placeholder.write(f"**AI Tutor:** {ai_response}")
+    reply_area.caption(f"⏱️ First token in {timing.ttft_ms:.0f} ms · full answer in {timing.total_ms:.0f} ms")
+    METRICS.record("tutor.first_token", timing.ttft_ms)
+    METRICS.record("tutor.full_reply", timing.total_ms)
+    with storage.batch() as batch:
+        batch.add_message(st.session_state.user_data['id'], 'user', prompt, created_at=asked_at)
+        batch.add_message(st.session_state.user_data['id'], 'assistant', ai_response)
+    if store is not None:
+        # Later questions can then be grounded in what the student asked before
+        store.add_notes([prompt], CHAT_NOTES_SOURCE)
+
+
+# Widget callbacks run before the next script run, so the page they lead to
+# already reflects the change and no extra st.rerun() is needed
+def switch_user():
+    st.session_state.user_data = load_profile(st.session_state.user_name)
+    st.session_state.chat_cursors = []
+    # Uploads were indexed into the previous profile's store, so the new one starts over
+    st.session_state.study_materials = {}
+    st.session_state.pop('upload_jobs', None)
+    st.session_state.pop('quiz_generation', None)
+
+
+def add_goal():
+    if st.session_state.new_goal:
+        get_storage().add_goal(st.session_state.user_data['id'], st.session_state.new_goal)
+        st.session_state.new_goal = ""
+
+
+def remove_goal(goal_id):
+    get_storage().remove_goal(st.session_state.user_data['id'], goal_id)
+
+
+def record_session():
+    topic = st.session_state.session_topic
+    if topic:
+        user_id = st.session_state.user_data['id']
+        started_at = time.time()
+        revision = get_storage().add_session(user_id, topic, st.session_state.session_duration, started_at)
+        get_aggregates(user_id).add_session(topic, st.session_state.session_duration, started_at, revision=revision)
+        get_vector_store(st.session_state.user_data['id']).add_notes([topic], SESSION_NOTES_SOURCE)
+        st.toast("Study session recorded!")
+
+
+def submit_answer(item_id, subject):
+    choice = st.session_state[f"quiz_choice_{item_id}"]
+    if choice is None:
+        st.session_state.quiz_feedback = (False, "Pick an answer first.")
+        return
+    user_id = st.session_state.user_data['id']
+    storage = get_storage()
+    item = storage.get_quiz_item(item_id)
+    correct, state, revision = answer_item(storage, get_review_queue(user_id, subject), user_id, item, choice)
+    get_aggregates(user_id).add_quiz_score(100.0 if correct else 0.0, revision=revision)
+    days = f"{state.interval_days} day{'s' if state.interval_days != 1 else ''}"
+    if correct:
+        st.session_state.quiz_feedback = (True, f"Correct! Great job! You'll see this again in {days}.")
+    else:
+        answer = item['choices'][item['answer']]
+        st.session_state.quiz_feedback = (False, f"Incorrect. The answer is {answer}. You'll see this again in {days}.")
+
+
+def render_sidebar():
+    with st.sidebar:
+        st.title("🎓 AI Learning Platform")
+        st.markdown("---")
     
-    # User Profile Section
-    st.subheader("👤 Student Profile")
+        # User Profile Section
+        st.subheader("👤 Student Profile")
     
-    # Get user information
-    user_name = st.text_input("Your Name", value=st.session_state.user_data['name'])
-    if user_name != st.session_state.user_data['name']:
-        st.session_state.user_data['name'] = user_name
+        # Get user information
+        st.text_input("Your Name", value=st.session_state.user_data['name'], key="user_name", on_change=switch_user)
     
-    subject = st.selectbox(
-        "Main Subject",
-        ["Mathematics", "Science", "English", "History", "Computer Science", "Other"],
-        index=0 if not st.session_state.user_data['subject'] else 
-        ["Mathematics", "Science", "English", "History", "Computer Science", "Other"].index(st.session_state.user_data['subject'])
-    )
-    if subject != st.session_state.user_data['subject']:
-        st.session_state.user_data['subject'] = subject
-    
-    learning_style = st.selectbox(
-        "Learning Style",
-        ["Visual", "Auditory", "Kinesthetic", "Reading/Writing"],
-        index=0 if not st.session_state.user_data['learning_style'] else 
-        ["Visual", "Auditory", "Kinesthetic", "Reading/Writing"].index(st.session_state.user_data['learning_style'])
-    )
-    if learning_style != st.session_state.user_data['learning_style']:
-        st.session_state.user_data['learning_style'] = learning_style
-    
-    # Learning Goals
-    st.subheader("🎯 Learning Goals")
-    new_goal = st.text_input("Add a new goal")
-    if st.button("Add Goal") and new_goal:
-        if 'goals' not in st.session_state.user_data:
-            st.session_state.user_data['goals'] = []
-        st.session_state.user_data['goals'].append(new_goal)
-        st.rerun()
-    
-    # Display current goals
-    if st.session_state.user_data['goals']:
-        for i, goal in enumerate(st.session_state.user_data['goals']):
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.write(f"• {goal}")
-            with col2:
-                if st.button("Remove", key=f"remove_{i}"):
-                    st.session_state.user_data['goals'].pop(i)
-                    st.rerun()
+        subject = st.selectbox(
+            "Main Subject",
+            SUBJECTS,
+            index=0 if not st.session_state.user_data['subject'] else 
+            SUBJECTS.index(st.session_state.user_data['subject'])
+        )
+        if subject != st.session_state.user_data['subject']:
+            st.session_state.user_data['subject'] = subject
+            storage.update_profile(user_id, subject=subject)
     
-    st.markdown("---")
+        learning_style = st.selectbox(
+            "Learning Style",
+            LEARNING_STYLES,
+            index=0 if not st.session_state.user_data['learning_style'] else 
+            LEARNING_STYLES.index(st.session_state.user_data['learning_style'])
+        )
+        if learning_style != st.session_state.user_data['learning_style']:
+            st.session_state.user_data['learning_style'] = learning_style
+            storage.update_profile(user_id, learning_style=learning_style)
+    
+        # Learning Goals
+        st.subheader("🎯 Learning Goals")
+        st.text_input("Add a new goal", key="new_goal")
+        st.button("Add Goal", on_click=add_goal)
+    
+        # Display current goals
+        if goals:
+            for goal in goals:
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.write(f"• {goal['text']}")
+                with col2:
+                    st.button("Remove", key=f"remove_{goal['id']}", on_click=remove_goal, args=(goal['id'],))
+    
+        st.markdown("---")
     
-    # Quick Stats
-    st.subheader("📊 Quick Stats")
-    if st.session_state.user_data['study_sessions']:
-        total_study_time = sum(session['duration'] for session in st.session_state.user_data['study_sessions'])
-        st.metric("Total Study Time", f"{total_study_time} minutes")
+        # Quick Stats
+        st.subheader("📊 Quick Stats")
+        if aggregates.session_count:
+            st.metric("Total Study Time", f"{aggregates.total_minutes} minutes")
         
-        if st.session_state.user_data['quiz_scores']:
-            avg_score = sum(st.session_state.user_data['quiz_scores']) / len(st.session_state.user_data['quiz_scores'])
-            st.metric("Average Quiz Score", f"{avg_score:.1f}%")
+            if aggregates.quiz_count:
+                st.metric("Average Quiz Score", f"{aggregates.quiz_mean:.1f}%")
 
-# Main content area
-st.markdown('<h1 class="main-header">🎓 AI-Powered Learning Platform</h1>', unsafe_allow_html=True)
-
-# Navigation tabs
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["🏠 Dashboard", "🤖 AI Tutor", "📚 Study Materials", "📊 Progress", "⚙️ Settings"])
 
 # Dashboard Tab
-with tab1:
+def render_dashboard():
     st.header("Welcome to Your Personalized Learning Dashboard")
     
     if st.session_state.user_data['name']:
@@ -154,7 +438,7 @@ with tab1:
         st.markdown("""
         <div class="metric-card">
             <h3>Study Sessions</h3>
-            <h2>""" + str(len(st.session_state.user_data['study_sessions'])) + """</h2>
+            <h2>""" + str(aggregates.session_count) + """</h2>
         </div>
         """, unsafe_allow_html=True)
     
@@ -162,26 +446,24 @@ with tab1:
         st.markdown("""
         <div class="metric-card">
             <h3>Goals Set</h3>
-            <h2>""" + str(len(st.session_state.user_data['goals'])) + """</h2>
+            <h2>""" + str(len(goals)) + """</h2>
         </div>
         """, unsafe_allow_html=True)
     
     with col3:
-        total_time = sum(session['duration'] for session in st.session_state.user_data['study_sessions'])
         st.markdown(f"""
         <div class="metric-card">
             <h3>Total Study Time</h3>
-            <h2>{total_time} min</h2>
+            <h2>{aggregates.total_minutes} min</h2>
         </div>
         """, unsafe_allow_html=True)
     
     with col4:
-        if st.session_state.user_data['quiz_scores']:
-            avg_score = sum(st.session_state.user_data['quiz_scores']) / len(st.session_state.user_data['quiz_scores'])
+        if aggregates.quiz_count:
             st.markdown(f"""
             <div class="metric-card">
                 <h3>Avg Quiz Score</h3>
-                <h2>{avg_score:.1f}%</h2>
+                <h2>{aggregates.quiz_mean:.1f}%</h2>
             </div>
             """, unsafe_allow_html=True)
         else:
@@ -199,18 +481,18 @@ with tab1:
     
     with col1:
         st.subheader("📈 Recent Study Sessions")
-        if st.session_state.user_data['study_sessions']:
-            recent_sessions = st.session_state.user_data['study_sessions'][-5:]
+        recent_sessions = storage.recent_sessions(user_id, limit=5)
+        if recent_sessions:
             for session in recent_sessions:
-                st.write(f"📚 {session['topic']} - {session['duration']} minutes ({session['date']})")
+                st.write(f"📚 {session.topic} - {session.duration} minutes ({format_timestamp(session.started_at)})")
         else:
             st.info("No study sessions recorded yet. Start studying to see your progress!")
     
     with col2:
         st.subheader("🎯 Current Goals")
-        if st.session_state.user_data['goals']:
-            for goal in st.session_state.user_data['goals']:
-                st.write(f"✅ {goal}")
+        if goals:
+            for goal in goals:
+                st.write(f"✅ {goal['text']}")
         else:
             st.info("No goals set yet. Add some learning goals in the sidebar!")
     
@@ -218,32 +500,6 @@ with tab1:
     st.subheader("🤖 AI Learning Recommendations")
     
     if st.session_state.user_data['learning_style']:
-        recommendations = {
-            "Visual": [
-                "Use mind maps and diagrams to organize concepts",
-                "Watch educational videos and infographics",
-                "Create visual flashcards with images",
-                "Use color coding for different topics"
-            ],
-            "Auditory": [
-                "Listen to educational podcasts and lectures",
-                "Read aloud or discuss topics with others",
-                "Use voice notes to record your understanding",
-                "Participate in group discussions"
-            ],
-            "Kinesthetic": [
-                "Use hands-on activities and experiments",
-                "Take frequent breaks and move around",
-                "Use physical objects to represent concepts",
-                "Practice with real-world applications"
-            ],
-            "Reading/Writing": [
-                "Take detailed notes and summaries",
-                "Write essays and explanations",
-                "Create written flashcards",
-                "Read extensively on topics"
-            ]
-        }
         
         st.markdown("""
         <div class="feature-card">
@@ -251,44 +507,53 @@ with tab1:
         </div>
         """, unsafe_allow_html=True)
         
-        for rec in recommendations[st.session_state.user_data['learning_style']]:
+        for rec in RECOMMENDATIONS[st.session_state.user_data['learning_style']]:
             st.write(f"💡 {rec}")
 
+
 # AI Tutor Tab
-with tab2:
+def render_tutor():
     st.header("🤖 AI Tutor - Your Personalized Learning Assistant")
     
     # Chat interface
     st.subheader("💬 Chat with Your AI Tutor")
     
-    # Display chat history
-    for message in st.session_state.chat_history:
-        if message['role'] == 'user':
-            st.write(f"**You:** {message['content']}")
+    # Display one page of chat history; one extra row tells us whether older pages exist
+    cursors = st.session_state.chat_cursors
+    page = storage.recent_messages(user_id, limit=CHAT_PAGE_SIZE + 1, before_id=cursors[-1] if cursors else None)
+    has_older = len(page) > CHAT_PAGE_SIZE
+    page = page[-CHAT_PAGE_SIZE:]
+    if has_older or cursors:
+        older_col, newer_col = st.columns(2)
+        with older_col:
+            # The page can be empty if another session reset the chat while this one was paged back
+            st.button(
+                "⬆️ Older messages", disabled=not has_older, on_click=cursors.append,
+                args=(page[0].id,) if page else None
+            )
+        with newer_col:
+            st.button("⬇️ Newer messages", disabled=not cursors, on_click=cursors.pop)
+        st.caption(f"Page {len(cursors) + 1} · {storage.count_messages(user_id)} messages in total")
+    for message in page:
+        if message.role == 'user':
+            st.write(f"**You:** {message.content}")
         else:
-            st.write(f"**AI Tutor:** {message['content']}")
+            st.write(f"**AI Tutor:** {message.content}")
     
+    # New replies stream in here, below the history; the next rerun lists them with the rest
+    reply_area = st.container()
+
     # Chat input
     user_input = st.text_input("Ask your AI tutor anything:", key="chat_input")
     
     if st.button("Send") and user_input:
-        # Add user message to history
-        st.session_state.chat_history.append({
-            'role': 'user',
-            'content': user_input,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Generate AI response
-        ai_response = generate_ai_response(user_input, st.session_state.user_data)
-        
-        st.session_state.chat_history.append({
-            'role': 'assistant',
-            'content': ai_response,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        st.rerun()
+        # Ground free-form questions in the student's uploaded material and the conversation so far
+        send_to_tutor(
+            user_input,
+            reply_area,
+            store=get_vector_store(st.session_state.user_data['id']),
+            history=tutor_history()
+        )
     
     # Quick action buttons
     st.subheader("🚀 Quick Actions")
@@ -296,51 +561,31 @@ with tab2:
     
     with col1:
         if st.button("📚 Explain a Concept"):
-            st.session_state.chat_history.append({
-                'role': 'user',
-                'content': "Can you explain a key concept from my subject?",
-                'timestamp': datetime.now().isoformat()
-            })
-            ai_response = generate_ai_response("Can you explain a key concept from my subject?", st.session_state.user_data)
-            st.session_state.chat_history.append({
-                'role': 'assistant',
-                'content': ai_response,
-                'timestamp': datetime.now().isoformat()
-            })
-            st.rerun()
+            send_to_tutor("Can you explain a key concept from my subject?", reply_area)
     
     with col2:
         if st.button("❓ Generate Quiz"):
-            st.session_state.chat_history.append({
-                'role': 'user',
-                'content': "Generate a quiz question for me to practice",
-                'timestamp': datetime.now().isoformat()
-            })
-            ai_response = generate_ai_response("Generate a quiz question for me to practice", st.session_state.user_data)
-            st.session_state.chat_history.append({
-                'role': 'assistant',
-                'content': ai_response,
-                'timestamp': datetime.now().isoformat()
-            })
-            st.rerun()
+            send_to_tutor("Generate a quiz question for me to practice", reply_area)
     
     with col3:
         if st.button("📖 Study Plan"):
-            st.session_state.chat_history.append({
-                'role': 'user',
-                'content': "Create a personalized study plan for me",
-                'timestamp': datetime.now().isoformat()
-            })
-            ai_response = generate_ai_response("Create a personalized study plan for me", st.session_state.user_data)
-            st.session_state.chat_history.append({
-                'role': 'assistant',
-                'content': ai_response,
-                'timestamp': datetime.now().isoformat()
-            })
-            st.rerun()
+            send_to_tutor("Create a personalized study plan for me", reply_area)
+
+
+def tutor_history():
+    """The conversation so far, for backends that answer in its context; None for those that ignore it"""
+    if not getattr(get_tutor_backend(), 'uses_history', True):
+        return None
+    try:
+        return get_conversation_memory().context(user_id)
+    except OSError as e:
+        # Token counts need tiktoken's tables, which are downloaded on first use
+        st.caption(f"⚠️ Answering without the earlier conversation, which could not be measured ({e.__class__.__name__})")
+        return None
+
 
 # Study Materials Tab
-with tab3:
+def render_materials():
     st.header("📚 Study Materials")
     
     # Upload study materials
@@ -350,13 +595,37 @@ with tab3:
     if uploaded_file is not None:
         st.success(f"File uploaded: {uploaded_file.name}")
         
-        # Simulate processing
-        with st.spinner("Processing your study material..."):
-            # In real implementation, this would use LangChain to process the document
+        # Process each upload once; the uploader hands back the same file on every rerun
+        if uploaded_file.file_id not in st.session_state.study_materials:
+            vector_store = get_vector_store(st.session_state.user_data['id'])
+            job_queue = get_job_queue(worker_setting())
+            if job_queue is None:
+                artifact = process_upload(uploaded_file, vector_store)
+            else:
+                artifact = poll_upload_job(job_queue, uploaded_file, vector_store)
+            if artifact is not None:
+                material = {key: artifact.meta[key] for key in ('pages', 'chunks', 'tokens', 'preview', 'summary')}
+                material.update(name=uploaded_file.name, cached=artifact.cached)
+                material['added'], material['source'] = index_artifact(artifact, uploaded_file.name, vector_store)
+                material['document'] = artifact.digest
+                st.session_state.study_materials[uploaded_file.file_id] = material
+        
+        material = st.session_state.study_materials.get(uploaded_file.file_id)
+        if material is not None:
             st.write("📄 Document Analysis Complete!")
-            st.write("✅ Key concepts extracted")
-            st.write("✅ Summary generated")
-            st.write("✅ Quiz questions created")
+            if material.get('cached'):
+                st.caption("⚡ This file was processed before, so its saved analysis was reused")
+            st.write(f"✅ {material['pages']} pages read")
+            st.write(f"✅ {material['chunks']} study chunks ({material['tokens']} tokens) indexed for your AI tutor")
+            if material.get('summary'):
+                st.write(f"📝 **Summary:** {material['summary']}")
+            if material['preview']:
+                with st.expander("Preview"):
+                    st.write(material['preview'])
+            if not material['added']:
+                st.caption(f"📎 Already in your notes as {material['source']}, so it was not added again")
+            if material['chunks']:
+                render_quiz_generation(material)
     
     # Study session tracking
     st.subheader("⏱️ Track Study Session")
@@ -364,80 +633,214 @@ with tab3:
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        topic = st.text_input("What did you study?")
+        st.text_input("What did you study?", key="session_topic")
     
     with col2:
-        duration = st.number_input("Duration (minutes)", min_value=1, value=30)
+        st.number_input("Duration (minutes)", min_value=1, value=30, key="session_duration")
     
     with col3:
-        if st.button("📝 Record Session") and topic:
-            new_session = {
-                'topic': topic,
-                'duration': duration,
-                'date': datetime.now().strftime("%Y-%m-%d %H:%M"),
-                'timestamp': datetime.now().isoformat()
-            }
-            st.session_state.user_data['study_sessions'].append(new_session)
-            st.success("Study session recorded!")
-            st.rerun()
+        st.button("📝 Record Session", on_click=record_session)
+
+
+def index_artifact(artifact, name, vector_store):
+    """Copy a processed upload into a student's vector store once; returns (added now, source its chunks are under)"""
+    user_id = st.session_state.user_data['id']
+    claimed, source = storage.claim_document(user_id, artifact.digest, name)
+    if not claimed:
+        return False, source
+    try:
+        with measure("materials.index"):
+            for batch, vectors in artifact.iter_batches(64):
+                vector_store.add_chunks(batch, name, vectors=vectors, document=artifact.digest)
+            vector_store.save()
+    except BaseException:
+        storage.release_document(user_id, artifact.digest)
+        raise
+    return True, source
+
+
+def process_upload(uploaded_file, vector_store):
+    """Extract, chunk and embed an upload during this run, showing a progress bar"""
+    progress_bar = st.progress(0.0, text="Processing your study material...")
+    
+    def report_page(page):
+        fraction = page.number / page.total if page.total else 0.0
+        progress_bar.progress(min(fraction, 1.0), text=f"Reading page {page.number} of {page.total or '?'}")
+    
+    with measure("materials.ingest"):
+        # Identical files share one extracted, chunked and embedded copy across all students
+        artifact = get_artifact_store().process(
+            uploaded_file, uploaded_file.name, vector_store.embedder, on_page=report_page
+        )
+    progress_bar.empty()
+    return artifact
+
+
+def poll_upload_job(job_queue, uploaded_file, vector_store):
+    """Queue an upload for the worker processes, or show how its job is going; returns the artifact once ready"""
+    artifact_store = get_artifact_store()
+    recipe = ingest_recipe(vector_store.embedder)
+    upload_jobs = st.session_state.setdefault('upload_jobs', {})
+    job_id = upload_jobs.get(uploaded_file.file_id)
+    if job_id is None:
+        digest = content_digest(uploaded_file)
+        artifact = artifact_store.get(digest, recipe)
+        if artifact is not None:
+            return artifact
+        # Workers read the upload from disk, since it only lives in this server's memory
+        sweep_uploads(job_queue, data_dir("uploads"))
+        path = data_dir("uploads", f"{digest}-{uuid.uuid4().hex}")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(uploaded_file, f)
+        uploaded_file.seek(0)
+        # Workers embed with the default embedder at this store's dimension
+        job_id = upload_jobs[uploaded_file.file_id] = job_queue.submit('process_upload', {
+            'path': path,
+            'filename': uploaded_file.name,
+            'artifacts': artifact_store.root,
+            'max_bytes': artifact_store.max_bytes,
+            'dim': vector_store.embedder.dim,
+        })
+    
+    job = job_queue.get(job_id)
+    if job is not None and job.status == DONE:
+        artifact = artifact_store.get(job.result['digest'], recipe)
+        if artifact is not None:
+            artifact.cached = False
+            return artifact
+        # Evicted before this session picked it up; queue it again on the next run
+        job = None
+    if job is None or job.status == FAILED:
+        # Forgotten, so the button's rerun submits the upload as a new job
+        del upload_jobs[uploaded_file.file_id]
+        if job is not None:
+            st.error(f"Could not process {uploaded_file.name}: {job.error}")
+        st.button("🔄 Process again")
+    else:
+        label = "Waiting for a worker..." if job.status == 'queued' else "Processing your study material..."
+        st.progress(job.progress, text=label)
+        st.button("🔄 Check progress")
+        st.session_state.poll_jobs = True
+    return None
+
+
+def poll_again(seconds):
+    """Rerun the script after a pause, which anything the student does cuts short"""
+    placeholder = st.empty()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        # Sending an element lets Streamlit stop this run at once if a rerun was requested
+        placeholder.empty()
+    st.rerun()
+
+
+def render_quiz_generation(material):
+    """Practice questions from an uploaded document, reported batch by batch as they are generated"""
+    # Keyed by content, since two different files can share a name
+    source, document = material['source'], material['document']
+    subject = st.session_state.user_data['subject'] or SUBJECTS[0]
+    created_so_far = st.session_state.setdefault('quiz_generation', {})
+    col1, col2 = st.columns(2)
+    with col1:
+        start = st.button("🧠 Create Practice Questions")
+    with col2:
+        # Any rerun (this button, or leaving the page) interrupts the loop below, which cancels the batches
+        st.button("⏹️ Stop", disabled=not start)
+    if not start:
+        if document in created_so_far:
+            st.write(f"✅ {created_so_far[document]} {subject} practice questions created from this document")
+        return
+
+    user_id = st.session_state.user_data['id']
+    review_queue = get_review_queue(user_id, subject)
+    total_batches = -(-material['chunks'] // QUIZ_BATCH_CHUNKS)
+    progress_bar = st.progress(0.0, text="Creating practice questions...")
+    latest = st.empty()
+    created = duplicates = 0
+    texts = (record['text'] for record in get_vector_store(st.session_state.user_data['id']).iter_chunks(source, document))
+    batches = generate_quiz_items(
+        texts, ClozeGenerator(), topic=source, executor=get_quiz_pool(), batch_size=QUIZ_BATCH_CHUNKS
+    )
+    with measure("materials.quiz_generation"), closing(batches):
+        for done, batch in enumerate(batches, start=1):
+            created += storage.add_quiz_items([(subject, *item) for item in batch.items], owner_id=user_id)
+            for due_at, item_id in storage.enroll_items(user_id, subject, time.time()):
+                review_queue.reschedule(item_id, due_at)
+            duplicates += batch.duplicates
+            created_so_far[document] = created
+            progress_bar.progress(
+                min(done / total_batches, 1.0), text=f"Batch {done} of {total_batches}: {created} questions so far"
+            )
+            if batch.items:
+                latest.caption(f"Latest: {batch.items[-1][1]}")
+    progress_bar.empty()
+    latest.empty()
+    st.success(
+        f"✅ {created} {subject} practice questions created ({duplicates} near-duplicates skipped). "
+        "They are in the 📊 Progress quiz."
+    )
+
 
 # Progress Tab
-with tab4:
+def render_progress():
     st.header("📊 Learning Progress")
     
-    if st.session_state.user_data['study_sessions']:
+    if aggregates.session_count:
         # Study time chart
         st.subheader("📈 Study Time Over Time")
         
-        # Create sample data for visualization
-        dates = [session['date'] for session in st.session_state.user_data['study_sessions']]
-        durations = [session['duration'] for session in st.session_state.user_data['study_sessions']]
+        grouping = st.radio("Group by", list(FREQUENCIES), horizontal=True)
+        fig = build_progress_figure(user_id, aggregates.version, FREQUENCIES[grouping])
+        with measure("progress.plotly_chart"):
+            st.plotly_chart(fig, use_container_width=True)
         
-        df = pd.DataFrame({
-            'Date': dates,
-            'Study Time (minutes)': durations
-        })
-        
-        fig = px.line(df, x='Date', y='Study Time (minutes)', 
-                     title='Study Time Trend')
-        st.plotly_chart(fig, use_container_width=True)
+        # Time per topic
+        st.subheader("📚 Time by Topic")
+        topic_fig = build_topic_figure(user_id, aggregates.version)
+        with measure("progress.plotly_chart"):
+            st.plotly_chart(topic_fig, use_container_width=True)
         
         # Progress towards goals
         st.subheader("🎯 Goal Progress")
-        if st.session_state.user_data['goals']:
-            for goal in st.session_state.user_data['goals']:
-                st.write(f"**{goal}**")
-                progress = min(len(st.session_state.user_data['study_sessions']) * 10, 100)
+        if goals:
+            for goal in goals:
+                st.write(f"**{goal['text']}**")
+                progress = min(aggregates.session_count * 10, 100)
                 st.progress(progress / 100)
                 st.write(f"{progress}% complete")
     
-    # Quiz performance
-    st.subheader("📝 Quiz Performance")
-    
-    # Simulate quiz taking
-    if st.button("Take a Practice Quiz"):
-        quiz_question = "What is the capital of France?"
-        answer = st.radio(quiz_question, ["London", "Paris", "Berlin", "Madrid"])
-        
-        if st.button("Submit Answer"):
-            if answer == "Paris":
-                score = 100
-                st.success("Correct! Great job!")
-            else:
-                score = 0
-                st.error("Incorrect. The answer is Paris.")
-            
-            st.session_state.user_data['quiz_scores'].append(score)
-            st.rerun()
+    # Spaced-repetition practice in the student's main subject
+    st.subheader("📝 Practice Quiz")
+    subject = st.session_state.user_data['subject'] or SUBJECTS[0]
+    review_queue = get_review_queue(user_id, subject)
+    feedback = st.session_state.pop('quiz_feedback', None)
+    if feedback:
+        correct, message = feedback
+        (st.success if correct else st.error)(message)
+
+    due = review_queue.due(limit=QUIZ_DUE_SHOWN)
+    if due:
+        item = storage.get_quiz_item(due[0])
+        more = "+" if len(due) == QUIZ_DUE_SHOWN else ""
+        st.caption(f"{len(due)}{more} {subject} question(s) due · {item['topic']}")
+        st.radio(item['question'], item['choices'], index=None, key=f"quiz_choice_{item['id']}")
+        st.button("Submit Answer", on_click=submit_answer, args=(item['id'], subject))
+    elif len(review_queue):
+        st.info(f"🎉 No {subject} questions due. Next review: {format_timestamp(review_queue.next_due_at())}")
+    else:
+        st.info(f"No practice questions for {subject} yet.")
     
     # Display quiz scores
-    if st.session_state.user_data['quiz_scores']:
+    if aggregates.quiz_count:
         st.write("Recent Quiz Scores:")
-        for i, score in enumerate(st.session_state.user_data['quiz_scores'][-5:]):
+        for i, score in enumerate(storage.recent_quiz_scores(user_id, limit=5)):
             st.write(f"Quiz {i+1}: {score}%")
 
+
 # Settings Tab
-with tab5:
+def render_settings():
     st.header("⚙️ Settings")
     
     st.subheader("🔧 Platform Settings")
@@ -452,82 +855,189 @@ with tab5:
     
     # Data export
     st.subheader("📤 Export Data")
+    export_format = st.selectbox("Format", list(EXPORT_CHOICES), key="export_format")
     if st.button("Export Learning Data"):
-        # Create JSON export
-        export_data = {
-            'user_data': st.session_state.user_data,
-            'chat_history': st.session_state.chat_history,
-            'export_date': datetime.now().isoformat()
-        }
-        
-        st.download_button(
-            label="Download Data",
-            data=json.dumps(export_data, indent=2),
-            file_name=f"learning_data_{datetime.now().strftime('%Y%m%d')}.json",
-            mime="application/json"
-        )
+        # Records stream from the database into a temp file; only the finished file is read back
+        fmt, compress = EXPORT_CHOICES[export_format]
+        with measure("settings.export"):
+            export_path = export_file(storage, user_id, st.session_state.user_data, fmt=fmt, compress=compress)
+        try:
+            with open(export_path, "rb") as export:
+                st.download_button(
+                    label="Download Data",
+                    data=export,
+                    file_name=f"learning_data_{datetime.now().strftime('%Y%m%d')}{export_extension(fmt, compress)}",
+                    mime="application/octet-stream"
+                )
+        finally:
+            os.unlink(export_path)
+
+    # Import data
+    st.subheader("📥 Import Data")
+    backup = st.file_uploader(
+        "Restore from an export (replaces your current data)",
+        type=["ndjson", "gz", "parquet"],
+        key="import_file"
+    )
+    if backup is not None and st.button("Import Learning Data"):
+        try:
+            counts = import_records(storage, user_id, read_records(backup), aggregates=aggregates)
+        except ValueError as e:
+            st.error(f"Could not import {backup.name}: {e}")
+        else:
+            # Notes indexed from the replaced history would otherwise keep coming back as tutor context
+            get_vector_store(user_id).clear()
+            # The imported schedule replaced the one the cached heaps were built from
+            get_review_queue.clear()
+            st.session_state.user_data = load_profile(st.session_state.user_data['name'])
+            st.session_state.study_materials = {}
+            st.session_state.chat_cursors = []
+            st.success("Imported " + ", ".join(f"{n} {kind.replace('_', ' ')}s" for kind, n in counts.items()))
     
     # Reset data
     st.subheader("🗑️ Reset Data")
     if st.button("Reset All Data"):
-        st.session_state.user_data = {
-            'name': '',
-            'subject': '',
-            'learning_style': '',
-            'goals': [],
-            'progress': {},
-            'study_sessions': [],
-            'quiz_scores': []
-        }
-        st.session_state.chat_history = []
+        storage.reset_user(user_id)
+        aggregates.reset()
+        get_vector_store(user_id).clear()
+        # Rebuilt from the emptied schedule the next time a quiz is shown
+        get_review_queue.clear()
+        st.session_state.user_data = load_profile(st.session_state.user_data['name'])
+        st.session_state.study_materials = {}
+        st.session_state.chat_cursors = []
         st.success("All data has been reset!")
 
-# AI Response Generation Function
-def generate_ai_response(user_input, user_data):
-    """Generate AI responses based on user input and profile"""
-    
-    input_lower = user_input.lower()
-    
-    # Personalized responses based on user data
-    if "explain" in input_lower or "concept" in input_lower:
-        subject = user_data.get('subject', 'general')
-        learning_style = user_data.get('learning_style', 'general')
-        
-        if subject == "Mathematics":
-            if learning_style == "Visual":
-                return "Let me explain this mathematical concept visually! 🎨\n\n**Algebraic Equations**\n\nThink of an equation like a balanced scale. When you have 2x + 5 = 13, imagine:\n\n⚖️ Left side: 2x + 5\n⚖️ Right side: 13\n\nTo solve, you need to keep the scale balanced:\n1. Subtract 5 from both sides: 2x = 8\n2. Divide both sides by 2: x = 4\n\nVisual tip: Draw the scale and show how each operation maintains balance!"
+    # Developer tools stay hidden unless the server runs with STUDY_BUDDY_DEV=1
+    if dev_mode():
+        render_dev_panel()
+
+
+def dev_mode():
+    # Not a URL parameter: profiling slows every session on the server, so visitors can't turn it on
+    return os.getenv("STUDY_BUDDY_DEV") == "1"
+
+
+def set_dev_profiling(option):
+    # Copied out of the widget so profiling stays on while other pages are open
+    st.session_state.dev_profiling[option] = st.session_state[f"dev_{option}"]
+
+
+def render_dev_panel():
+    """Latency and allocation metrics per section across all sessions, and opt-in rerun profiling"""
+    st.subheader("🛠️ Developer: Performance")
+    profiling = st.session_state.dev_profiling
+    st.checkbox(
+        "Profile every rerun with cProfile", value=profiling['cprofile'],
+        key="dev_cprofile", on_change=set_dev_profiling, args=("cprofile",)
+    )
+    st.checkbox(
+        "Trace allocations with tracemalloc (slow; also fills the KB column)", value=profiling['tracemalloc'],
+        key="dev_tracemalloc", on_change=set_dev_profiling, args=("tracemalloc",)
+    )
+
+    summary = METRICS.summary()
+    if summary:
+        st.write("Latency per section, all sessions on this server (recent samples):")
+        st.dataframe(
+            [
+                {
+                    'section': name,
+                    'count': row['count'],
+                    'p50 ms': round(row['p50_ms'], 2),
+                    'p95 ms': round(row['p95_ms'], 2),
+                    'max ms': round(row['max_ms'], 2),
+                    'net alloc KB': None if row['alloc_kb'] is None else round(row['alloc_kb'], 1),
+                }
+                for name, row in summary.items()
+            ],
+            use_container_width=True
+        )
+    if st.button("Clear Metrics"):
+        METRICS.clear()
+
+    last_profile = st.session_state.get('last_rerun_profile')
+    if last_profile is not None:
+        if last_profile.profile_text:
+            with st.expander("cProfile of the previous rerun (top 25 by cumulative time)"):
+                st.code(last_profile.profile_text)
+        if last_profile.allocations:
+            with st.expander("Top allocation sites in the previous rerun"):
+                st.dataframe(last_profile.allocations, use_container_width=True)
+
+
+PAGES = {
+    "🏠 Dashboard": render_dashboard,
+    "🤖 AI Tutor": render_tutor,
+    "📚 Study Materials": render_materials,
+    "📊 Progress": render_progress,
+    "⚙️ Settings": render_settings,
+}
+
+
+def render_timing():
+    """Where this rerun's time went, and what skipping the other pages saved"""
+    last_ms = st.session_state.page_render_ms
+    last_ms.update((name, ms) for name, ms in rerun_timer.sections.items() if name in PAGES)
+    skipped = [page for page in PAGES if page not in rerun_timer.sections]
+    saved_ms = sum(last_ms.get(page, 0.0) for page in skipped)
+    with st.expander(f"⏱️ Rerun took {rerun_timer.total_ms:.0f} ms"):
+        for name, ms in rerun_timer.sections.items():
+            st.write(f"✅ {name}: {ms:.1f} ms")
+        for page in skipped:
+            if page in last_ms:
+                st.write(f"⏭️ {page}: skipped (took {last_ms[page]:.1f} ms when last shown)")
             else:
-                return "Let me explain this mathematical concept! 📐\n\n**Algebraic Equations**\n\nAn equation is like a puzzle where you need to find the value of x.\n\nExample: 2x + 5 = 13\n\nStep 1: Isolate the variable (x)\n- Subtract 5 from both sides: 2x = 8\n\nStep 2: Solve for x\n- Divide both sides by 2: x = 4\n\n**Key Principle:** Whatever you do to one side, you must do to the other to keep the equation balanced!"
-        
-        elif subject == "Science":
-            return "Let me explain this science concept! 🔬\n\n**The Scientific Method**\n\n1. **Observation** - Notice something interesting\n2. **Question** - Ask 'why' or 'how'\n3. **Hypothesis** - Make an educated guess\n4. **Experiment** - Test your hypothesis\n5. **Analysis** - Look at the results\n6. **Conclusion** - Decide if your hypothesis was correct\n\n**Example:** Why do plants grow toward light?\n- Hypothesis: Plants need light for photosynthesis\n- Test: Grow plants with and without light\n- Result: Plants with light grow better\n- Conclusion: Light is essential for plant growth!"
-        
-        else:
-            return "I'd be happy to explain any concept! 📚\n\nTo give you the best explanation, could you tell me:\n1. What specific topic you'd like to learn about?\n2. What's your current understanding level?\n3. Do you prefer examples, definitions, or step-by-step explanations?\n\nI'll tailor my explanation to your learning style and make it engaging!"
-    
-    elif "quiz" in input_lower or "question" in input_lower:
-        subject = user_data.get('subject', 'general')
-        
-        if subject == "Mathematics":
-            return "Here's a math quiz question for you! 🧮\n\n**Question:** If a rectangle has a length of 8 units and a width of 6 units, what is its area?\n\n**Options:**\nA) 14 square units\nB) 28 square units\nC) 48 square units\nD) 56 square units\n\n**Hint:** Remember, area of a rectangle = length × width\n\nTake your time to think about it!"
-        
-        elif subject == "Science":
-            return "Here's a science quiz question! 🔬\n\n**Question:** Which of the following is NOT a state of matter?\n\n**Options:**\nA) Solid\nB) Liquid\nC) Gas\nD) Energy\n\n**Hint:** Think about the three main states of matter and what energy is.\n\nWhat do you think the answer is?"
-        
-        else:
-            return "Here's a general knowledge question! 🎯\n\n**Question:** What is the capital of France?\n\n**Options:**\nA) London\nB) Paris\nC) Berlin\nD) Madrid\n\nThis is a great way to test your knowledge!"
-    
-    elif "study plan" in input_lower or "plan" in input_lower:
-        subject = user_data.get('subject', 'general')
-        learning_style = user_data.get('learning_style', 'general')
-        
-        return f"Here's your personalized study plan! 📋\n\n**Subject:** {subject}\n**Learning Style:** {learning_style}\n\n**Weekly Study Plan:**\n\n**Monday & Wednesday:**\n- 30 minutes: Review previous concepts\n- 45 minutes: Learn new material\n- 15 minutes: Practice problems\n\n**Tuesday & Thursday:**\n- 30 minutes: Interactive exercises\n- 30 minutes: Quiz practice\n- 15 minutes: Note-taking\n\n**Friday:**\n- 60 minutes: Comprehensive review\n- 30 minutes: Self-assessment\n\n**Weekend:**\n- 30 minutes: Relaxed review\n- 15 minutes: Plan next week\n\n**Tips for your {learning_style} learning style:**\n- Take regular breaks\n- Use active learning techniques\n- Review material within 24 hours\n- Practice regularly\n\nWould you like me to adjust this plan based on your specific goals?"
-    
-    elif "help" in input_lower or "stuck" in input_lower:
-        return "I'm here to help! 🤝\n\n**How I can assist you:**\n\n📚 **Learning Support:**\n- Explain difficult concepts\n- Provide step-by-step solutions\n- Give examples and analogies\n\n🎯 **Study Guidance:**\n- Create personalized study plans\n- Suggest learning strategies\n- Track your progress\n\n❓ **Practice:**\n- Generate quiz questions\n- Provide practice problems\n- Give feedback on answers\n\n📊 **Progress Tracking:**\n- Monitor your study sessions\n- Analyze your performance\n- Suggest improvements\n\n**Just ask me anything!** What would you like help with today?"
-    
-    else:
-        return "I'm your AI learning assistant! 🤖\n\nI can help you with:\n\n📚 **Learning:** Explain concepts, provide examples, answer questions\n🎯 **Planning:** Create study plans, set goals, track progress\n❓ **Practice:** Generate quizzes, provide exercises, give feedback\n📊 **Analysis:** Review your performance, suggest improvements\n\nWhat would you like to work on today? Feel free to ask me anything about your studies!"
+                st.write(f"⏭️ {page}: skipped")
+        st.caption(f"Rendering only the open page saved about {saved_ms:.0f} ms on this rerun")
+
+
+# Opt-in profiling from the developer panel; the report is shown there on the next rerun
+dev_profiling = st.session_state.setdefault('dev_profiling', {'cprofile': False, 'tracemalloc': False})
+with profile_rerun(
+    cprofile=dev_mode() and dev_profiling['cprofile'], trace_allocations=dev_mode() and dev_profiling['tracemalloc']
+) as rerun_profile:
+    with rerun_timer.section("Setup"):
+        storage = get_storage()
+
+        # Initialize session state
+        if 'guest_name' not in st.session_state:
+            st.session_state.guest_name = f"guest-{uuid.uuid4().hex}"
+
+        if 'user_data' not in st.session_state:
+            st.session_state.user_data = load_profile('')
+
+        if 'study_materials' not in st.session_state:
+            st.session_state.study_materials = {}
+
+        # Keyset cursors for paging back through chat history; empty means the latest page
+        if 'chat_cursors' not in st.session_state:
+            st.session_state.chat_cursors = []
+
+        user_id = st.session_state.user_data['id']
+        aggregates = get_aggregates(user_id)
+        # Another server process sharing the database may have written since these totals were built
+        aggregates.sync(storage, user_id)
+
+        # Render time of each page when it was last shown, to estimate what skipping it saves
+        if 'page_render_ms' not in st.session_state:
+            st.session_state.page_render_ms = {}
+
+        attach_metrics_sink()
+
+        goals = storage.list_goals(user_id)
+
+    with rerun_timer.section("Sidebar"):
+        render_sidebar()
+
+    # Main content area
+    st.markdown('<h1 class="main-header">🎓 AI-Powered Learning Platform</h1>', unsafe_allow_html=True)
+
+    # Navigation; unlike st.tabs, only the selected page runs on each rerun
+    active_page = st.radio("Page", list(PAGES), horizontal=True, key="active_page", label_visibility="collapsed")
+    with rerun_timer.section(active_page):
+        PAGES[active_page]()
+if dev_profiling['cprofile'] or dev_profiling['tracemalloc']:
+    st.session_state.last_rerun_profile = rerun_profile
 
 # Footer
 st.markdown("---")
@@ -536,4 +1046,13 @@ st.markdown("""
     <p>🎓 AI-Powered Learning Platform | Personalized Education for Every Student</p>
     <p>Built with Streamlit, LangChain, and OpenAI</p>
 </div>
-""", unsafe_allow_html=True) 
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+render_timing()
+
+# Whole-script time of this rerun, for the developer panel and benchmarks/load_test.py
+METRICS.record("rerun/total", rerun_timer.total_ms)
+
+# Last, after everything is shown and timed, so the wait holds up nothing
+if st.session_state.pop('poll_jobs', False):
+    poll_again(JOB_POLL_SECONDS)
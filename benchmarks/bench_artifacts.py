@@ -0,0 +1,97 @@
+"""Benchmark: processing an upload cold versus reusing its cached artifact.
+
+Writes a synthetic text document of about --pages pages and processes it
+into a fresh vector store twice through an ``ArtifactStore``: once cold,
+where the document is extracted, chunked and embedded, and once more as
+a second student would upload the same file. It reports milliseconds and
+embedder calls for each; the warm upload should not embed anything. It
+then fills a store capped at --cap-mb with distinct documents and checks
+that the least recently used entries are evicted first. Run from the
+repository root:
+
+    python benchmarks/bench_artifacts.py [--pages 200] [--cap-mb 1]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.artifacts import ArtifactStore  # noqa: E402
+from study_buddy.vector_store import HashingEmbedder, VectorStore  # noqa: E402
+
+WORDS = (
+    "cell membrane protein enzyme energy glucose respiration nucleus gene chromosome division tissue "
+    "organ system plant animal light water carbon oxygen transport signal hormone neuron muscle"
+).split()
+
+
+class CountingEmbedder(HashingEmbedder):
+    """HashingEmbedder that counts the texts it embeds"""
+
+    def __init__(self, dim=256):
+        super().__init__(dim)
+        self.texts = 0
+
+    def embed(self, texts):
+        self.texts += len(texts)
+        return super().embed(texts)
+
+
+def make_document(pages, seed):
+    rng = random.Random(seed)
+    lines = []
+    for _ in range(pages * 40):
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(12)).capitalize() + ".")
+    return "\n".join(lines).encode()
+
+
+def upload(artifacts, vector_dir, data, embedder):
+    """Milliseconds to get an upload into a student's vector store"""
+    started = time.perf_counter()
+    vector_store = VectorStore(vector_dir, embedder=embedder)
+    artifact = artifacts.process(io.BytesIO(data), "notes.txt", embedder)
+    for batch, vectors in artifact.iter_batches(64):
+        vector_store.add_chunks(batch, "notes.txt", vectors=vectors)
+    vector_store.save()
+    return (time.perf_counter() - started) * 1000, artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--cap-mb", type=float, default=1.0, help="size limit for the eviction check")
+    args = parser.parse_args()
+
+    data = make_document(args.pages, seed=1)
+    with tempfile.TemporaryDirectory() as tmp:
+        artifacts = ArtifactStore(os.path.join(tmp, "artifacts"))
+        print(f"document: {len(data) / 1e6:.1f} MB\n")
+        print(f"{'upload':<22} | {'ms':>9} | {'texts embedded':>14} | {'chunks':>6}")
+        for label, student in (("first (cold)", "ann"), ("same file again", "bob")):
+            embedder = CountingEmbedder()
+            ms, artifact = upload(artifacts, os.path.join(tmp, "vectors", student), data, embedder)
+            print(f"{label:<22} | {ms:>9.1f} | {embedder.texts:>14} | {artifact.meta['chunks']:>6}")
+        print(f"\ncache entry: {artifacts.total_bytes() / 1e6:.1f} MB, hits {artifacts.hits}, misses {artifacts.misses}")
+
+        capped = ArtifactStore(os.path.join(tmp, "capped"), max_bytes=int(args.cap_mb * (1 << 20)))
+        embedder = HashingEmbedder()
+        documents = [make_document(20, seed) for seed in range(2, 14)]
+        for data in documents:
+            capped.process(io.BytesIO(data), "notes.txt", embedder)
+            # Keep the first document in use, so it should outlive the others
+            capped.process(io.BytesIO(documents[0]), "notes.txt", embedder)
+        kept = capped.process(io.BytesIO(documents[0]), "notes.txt", embedder).cached
+        print(
+            f"capped at {args.cap_mb} MB: {capped.evictions} evicted, {capped.total_bytes() / 1e6:.2f} MB kept, "
+            f"most used entry {'kept' if kept else 'evicted'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark: learning-data export, in-memory JSON vs. streamed formats.
+
+Fills a temporary database with synthetic history, then exports it with
+the old approach (one dict, then ``json.dumps(indent=2)``) and with each
+streamed format. Reports time, output size and peak Python memory
+(tracemalloc, which also slows everything down). Run from the repository
+root:
+
+    python benchmarks/bench_export.py [--records 50000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.export import export_file, import_records, read_records  # noqa: E402
+from study_buddy.storage import Storage  # noqa: E402
+
+PROFILE = {'name': "bench", 'subject': "Science", 'learning_style': "Visual"}
+
+
+def legacy_export(storage, user_id):
+    export_data = {
+        'user_data': {
+            **PROFILE,
+            'goals': [goal['text'] for goal in storage.list_goals(user_id)],
+            'study_sessions': [session._asdict() for session in storage.iter_sessions(user_id)],
+            'quiz_scores': [attempt.score for attempt in storage.iter_quiz_attempts(user_id)],
+        },
+        'chat_history': [message._asdict() for message in storage.iter_messages(user_id)],
+    }
+    return json.dumps(export_data, indent=2).encode()
+
+
+def measure(label, fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<16} | {elapsed:>7.2f} | {size / 1e6:>8.2f} | {peak / 1e6:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=50000, help="sessions, quiz attempts and messages each")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(os.path.join(tmp, "bench.db"))
+        user_id = storage.get_or_create_user(PROFILE['name'])['id']
+        now = time.time()
+        with storage.batch() as batch:
+            for i in range(args.records):
+                batch.add_session(user_id, f"topic {i % 12}", 30, now - i * 3600)
+                batch.add_quiz_attempt(user_id, float(i % 100), "quiz", now - i * 3600)
+                role = 'user' if i % 2 == 0 else 'assistant'
+                batch.add_message(user_id, role, f"message {i} about photosynthesis and cell biology", now - i)
+
+        print(f"{args.records} each of sessions, quiz attempts and messages\n")
+        print(f"{'export':<16} | {'seconds':>7} | {'MB out':>8} | {'peak MB':>8}")
+        measure("json (legacy)", lambda: len(legacy_export(storage, user_id)))
+        paths = {}
+        for label, fmt, compress in (
+            ("ndjson", "ndjson", False),
+            ("ndjson.gz", "ndjson", True),
+            ("parquet", "parquet", False),
+        ):
+            def run(fmt=fmt, compress=compress, label=label):
+                paths[label] = export_file(storage, user_id, PROFILE, fmt=fmt, compress=compress, directory=tmp)
+                return os.path.getsize(paths[label])
+            measure(label, run)
+
+        print(f"\n{'import':<16} | {'seconds':>7} | {'MB in':>8} | {'peak MB':>8}")
+        target = storage.get_or_create_user("restored")['id']
+        for label, path in paths.items():
+            def run(path=path):
+                with open(path, "rb") as f:
+                    import_records(storage, target, read_records(f))
+                return os.path.getsize(path)
+            measure(label, run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark: cold-start import time and first-render latency of app.py.
+
+Import time: the imports at the top of app.py are collected with ``ast``
+and run in a fresh interpreter under ``python -X importtime``, after
+``import streamlit``, since a Streamlit server has already loaded that.
+Reports the cumulative time of each top-level import and whether any
+module that should be deferred (faiss, PyPDF2, tiktoken, httpx,
+plotly.express, pyarrow.parquet) was loaded anyway.
+
+First render: a fresh interpreter imports streamlit, then times the first
+``AppTest`` run of app.py against an empty data directory.
+
+Each measurement takes the median of --repeat fresh processes. With
+--import-budget-ms or --render-budget-ms the script exits non-zero when
+over budget, so CI can track regressions. --json prints the numbers as
+JSON. Run from the repository root:
+
+    python benchmarks/bench_import_time.py [--repeat 3] [--import-budget-ms 300] [--json]
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+APP = os.path.join(ROOT, "app.py")
+DEFERRED = ("faiss", "PyPDF2", "tiktoken", "httpx", "plotly.express", "pyarrow.parquet")
+
+FIRST_RENDER = """
+import time, streamlit
+from streamlit.testing.v1 import AppTest
+started = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+elapsed = time.perf_counter() - started
+assert not at.exception, at.exception
+print(elapsed * 1000)
+"""
+
+
+def app_imports():
+    """Top-level modules imported by app.py, in order"""
+    tree = ast.parse(open(APP).read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return [module for module in dict.fromkeys(modules) if module != "streamlit"]
+
+
+def run_python(args, env=None):
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, 'PYTHONPATH': ROOT, **(env or {})},
+    )
+
+
+def measure_imports(modules):
+    """(cumulative ms per top-level import after streamlit, deferred modules loaded) for one fresh process"""
+    code = "import streamlit\n" + "".join(f"import {module}\n" for module in modules)
+    stderr = run_python(["-X", "importtime", "-c", code]).stderr
+    cumulative, loaded, after_streamlit = {}, set(), False
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or line.count("|") != 2:
+            continue
+        _, cumulative_us, field = line.split("|")
+        name = field.strip()
+        if name in DEFERRED:
+            loaded.add(name)
+        # Nested imports are indented by two spaces per level after the one-space separator
+        if field.startswith("  "):
+            continue
+        if after_streamlit:
+            cumulative[name] = int(cumulative_us) / 1000
+        after_streamlit = after_streamlit or name == "streamlit"
+    return cumulative, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--import-budget-ms", type=float, help="fail if app imports take longer than this")
+    parser.add_argument("--render-budget-ms", type=float, help="fail if the first render takes longer than this")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    modules = app_imports()
+    runs = [measure_imports(modules) for _ in range(args.repeat)]
+    names = dict.fromkeys(name for run in runs for name in run[0])
+    per_module = {name: statistics.median(run[0].get(name, 0.0) for run in runs) for name in names}
+    import_ms = statistics.median(sum(run[0].values()) for run in runs)
+    loaded = sorted(set().union(*(run[1] for run in runs)))
+
+    with tempfile.TemporaryDirectory() as data:
+        render_ms = statistics.median(
+            float(run_python(["-c", FIRST_RENDER.format(app=APP)], {'STUDY_BUDDY_DATA_DIR': data}).stdout.split()[-1])
+            for _ in range(args.repeat)
+        )
+
+    results = {
+        'app_import_ms': round(import_ms, 1),
+        'first_render_ms': round(render_ms, 1),
+        'deferred_modules_loaded': loaded,
+        'imports': {module: round(ms, 1) for module, ms in per_module.items()},
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'import (after streamlit)':<32} | {'ms':>7}")
+        for module, ms in sorted(per_module.items(), key=lambda item: -item[1]):
+            print(f"{module:<32} | {ms:>7.1f}")
+        print(f"{'total':<32} | {import_ms:>7.1f}\n")
+        print(f"first render (AppTest)           | {render_ms:>7.1f}")
+        print(f"deferred modules loaded at start | {', '.join(loaded) or 'none'}")
+
+    over = []
+    if args.import_budget_ms is not None and import_ms > args.import_budget_ms:
+        over.append(f"app imports took {import_ms:.0f} ms, budget {args.import_budget_ms:.0f} ms")
+    if args.render_budget_ms is not None and render_ms > args.render_budget_ms:
+        over.append(f"first render took {render_ms:.0f} ms, budget {args.render_budget_ms:.0f} ms")
+    if over:
+        sys.exit("over budget: " + "; ".join(over))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Benchmark: streaming ingestion throughput and peak memory on a large PDF.
+
+Builds a synthetic text PDF and runs it through study_buddy.ingest,
+reporting pages/sec, chunks produced and peak memory. Run from the
+repository root:
+
+    python benchmarks/bench_ingest.py [--pages 500] [--lines 45]
+"""
+
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.ingest import ingest  # noqa: E402
+
+WORDS = (
+    "photosynthesis mitochondria equation derivative integral theorem "
+    "revolution empire democracy sonnet metaphor algorithm recursion "
+    "variable function matrix energy velocity molecule cell membrane"
+).split()
+
+
+def write_synthetic_pdf(path, pages, lines, seed=0):
+    """Write a plain multi-page PDF with `lines` lines of text per page"""
+    rng = random.Random(seed)
+    offsets = []
+
+    with open(path, "wb") as out:
+        def emit(obj):
+            offsets.append(out.tell())
+            out.write(f"{len(offsets)} 0 obj\n".encode() + obj + b"\nendobj\n")
+
+        out.write(b"%PDF-1.4\n")
+        page_ids = [4 + 2 * i for i in range(pages)]
+        emit(b"<< /Type /Catalog /Pages 2 0 R >>")
+        kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+        emit(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+        emit(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+        for pid in page_ids:
+            text = ["BT /F1 10 Tf 12 TL 50 780 Td"]
+            for _ in range(lines):
+                text.append(f"({' '.join(rng.choices(WORDS, k=12))}) '")
+            text.append("ET")
+            stream = "\n".join(text).encode()
+            emit(
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                b"/Resources << /Font << /F1 3 0 R >> >> "
+                + f"/Contents {pid + 1} 0 R >>".encode()
+            )
+            emit(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+        xref = out.tell()
+        out.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            out.write(f"{offset:010d} 00000 n \n".encode())
+        out.write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=45)
+    parser.add_argument("--max-tokens", type=int, default=512)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "synthetic.pdf")
+        write_synthetic_pdf(path, args.pages, args.lines)
+        size_mb = os.path.getsize(path) / 1e6
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tracemalloc.start()
+        started = time.perf_counter()
+        chunks = tokens = pages = 0
+        with open(path, "rb") as stream:
+            def on_page(page):
+                nonlocal pages
+                pages = page.number
+
+            for chunk in ingest(stream, path, on_page=on_page, max_tokens=args.max_tokens):
+                chunks += 1
+                tokens += chunk.n_tokens
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f"file size          {size_mb:10.2f} MB")
+    print(f"pages              {pages:10d}")
+    print(f"chunks             {chunks:10d} ({tokens} tokens)")
+    print(f"throughput         {pages / elapsed:10.1f} pages/sec")
+    print(f"peak traced alloc  {peak / 1e6:10.2f} MB")
+    print(f"peak RSS growth    {(rss_after - rss_before) / 1024:10.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Micro-benchmark: compiled intent router vs. the old if/elif substring chain.
+
+Run from the repository root:
+
+    python benchmarks/bench_intents.py [--messages 20000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy import intents  # noqa: E402
+from study_buddy.tutor import generate_ai_response  # noqa: E402
+
+SAMPLES = [
+    "Can you explain a key concept from my subject?",
+    "Generate a quiz question for me to practice",
+    "Create a personalized study plan for me",
+    "I'm stuck on my homework, can you help?",
+    "What's the weather like on Mars?",
+    "How do I solve 2x + 5 = 13?",
+    "Please explain photosynthesis and then give me a quiz",
+    "I need a plan for my exams next week",
+]
+
+
+def legacy_generate_ai_response(user_input, user_data):
+    """The original if/elif chain from app.py, kept as the baseline"""
+    input_lower = user_input.lower()
+    subject = user_data.get('subject', 'general')
+    learning_style = user_data.get('learning_style', 'general')
+    if "explain" in input_lower or "concept" in input_lower:
+        intent = intents.EXPLAIN
+    elif "quiz" in input_lower or "question" in input_lower:
+        intent = intents.QUIZ
+    elif "study plan" in input_lower or "plan" in input_lower:
+        intent = intents.PLAN
+    elif "help" in input_lower or "stuck" in input_lower:
+        intent = intents.HELP
+    else:
+        intent = intents.GENERAL
+    return intents._render(intent, subject, learning_style)
+
+
+def make_corpus(n, unique, seed=0):
+    rng = random.Random(seed)
+    filler = ["today", "please", "about", "cells", "algebra", "the", "war", "poems", "loops"]
+    corpus = []
+    for i in range(n):
+        message = rng.choice(SAMPLES)
+        if unique:
+            message = f"{message} {' '.join(rng.choices(filler, k=4))} #{i}"
+        corpus.append(message)
+    return corpus
+
+
+def check_parity(corpus, profiles):
+    for message in corpus:
+        for profile in profiles:
+            assert generate_ai_response(message, profile) == legacy_generate_ai_response(message, profile), message
+
+
+def bench(label, fn, corpus, profile, repeat):
+    intents.classify.cache_clear()
+    best = min(timeit.repeat(lambda: [fn(m, profile) for m in corpus], number=1, repeat=repeat))
+    per_msg_us = best / len(corpus) * 1e6
+    print(f"{label:<34} {per_msg_us:8.3f} us/message")
+    return per_msg_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    profiles = [
+        {'subject': s, 'learning_style': l}
+        for s in intents.SUBJECTS for l in intents.LEARNING_STYLES
+    ] + [{}]
+    check_parity(make_corpus(500, unique=True, seed=1) + SAMPLES, profiles)
+
+    profile = {'subject': "Mathematics", 'learning_style': "Visual"}
+    for unique in (False, True):
+        corpus = make_corpus(args.messages, unique)
+        kind = "unique messages" if unique else "repeated quick actions"
+        print(f"\n{args.messages} {kind}:")
+        legacy = bench("legacy if/elif chain", legacy_generate_ai_response, corpus, profile, args.repeat)
+        routed = bench("compiled router", generate_ai_response, corpus, profile, args.repeat)
+        print(f"{'speedup':<34} {legacy / routed:8.2f}x")
+
+    corpus = make_corpus(args.messages, unique=True)
+    intents.classify.cache_clear()
+    best = min(timeit.repeat(lambda: intents.classify_batch(corpus), number=1, repeat=args.repeat))
+    print(f"\nclassify_batch ({args.messages} unique): {best / len(corpus) * 1e6:.3f} us/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark: background job throughput as worker processes are added.
+
+Submits --jobs CPU-bound jobs to a ``JobQueue`` and times how long a
+``WorkerPool`` of 1, 2, 4, ... processes takes to finish them all. Each
+job embeds --texts synthetic chunks with the ``HashingEmbedder``, the same
+work an upload job spends most of its time on. Throughput should grow
+with the worker count up to the number of CPU cores and then level off.
+A run of no-op jobs measures what the queue itself costs per job.
+
+Run from the repository root:
+
+    python benchmarks/bench_jobs.py [--jobs 64] [--max-workers 8]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.jobs import DONE, JobQueue, WorkerPool  # noqa: E402
+from study_buddy.vector_store import HashingEmbedder  # noqa: E402
+
+WORDS = "cell membrane protein energy mitosis enzyme gradient reaction molecule structure".split()
+
+
+def embed_job(payload, progress):
+    texts = [" ".join(WORDS[(seed + i) % len(WORDS)] for i in range(80)) for seed in range(payload['texts'])]
+    HashingEmbedder(256).embed(texts)
+    return {'texts': len(texts)}
+
+
+def noop_job(payload, progress):
+    return {}
+
+
+HANDLERS = {'embed': embed_job, 'noop': noop_job}
+
+
+def run(kind, payload, jobs, workers):
+    """Seconds for workers processes to finish jobs queued jobs"""
+    with tempfile.TemporaryDirectory() as tmp:
+        job_queue = JobQueue(os.path.join(tmp, "jobs.db"))
+        with WorkerPool(job_queue.path, workers, handlers=HANDLERS):
+            # Workers start idle, so interpreter startup is not timed
+            time.sleep(1.0 + 0.2 * workers)
+            started = time.perf_counter()
+            ids = [job_queue.submit(kind, payload) for _ in range(jobs)]
+            while job_queue.counts().get(DONE, 0) < jobs:
+                time.sleep(0.01)
+            elapsed = time.perf_counter() - started
+        assert all(job_queue.get(job_id).status == DONE for job_id in ids)
+        job_queue.close()
+    return elapsed
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=64)
+    parser.add_argument("--texts", type=int, default=1000, help="chunks embedded per job")
+    parser.add_argument("--max-workers", type=int, default=max(4, 2 * cores))
+    args = parser.parse_args()
+
+    counts = []
+    workers = 1
+    while workers <= args.max_workers:
+        counts.append(workers)
+        workers *= 2
+
+    print(f"{args.jobs} jobs of {args.texts} embedded chunks each, {cores} CPU cores\n")
+    print(f"{'workers':>7} | {'seconds':>8} | {'jobs/s':>8} | {'speedup':>7}")
+    baseline = None
+    for workers in counts:
+        elapsed = run('embed', {'texts': args.texts}, args.jobs, workers)
+        baseline = baseline or elapsed
+        print(f"{workers:>7} | {elapsed:>8.2f} | {args.jobs / elapsed:>8.1f} | {baseline / elapsed:>6.2f}x")
+
+    noop_jobs = 500
+    elapsed = run('noop', {}, noop_jobs, 1)
+    print(f"\nqueue overhead: {elapsed / noop_jobs * 1000:.2f} ms per no-op job with one worker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark: tutor backend throughput against the local stub chat server.
+
+Simulates N concurrent students, each sending a series of questions, and
+reports requests/sec. A second pass has every student send the same
+prompt, to show request coalescing. Run from the repository root:
+
+    python benchmarks/bench_llm_client.py [--users 1,10,50,100] [--latency 0.2]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.llm_client import AsyncTutorClient, build_messages  # noqa: E402
+from study_buddy.stub_server import StubChatServer  # noqa: E402
+
+PROFILE = {'subject': "Science", 'learning_style': "Visual"}
+
+
+async def run(users, requests_per_user, server, concurrency, same_prompt):
+    client = AsyncTutorClient(
+        base_url=server.base_url, max_connections=concurrency, max_concurrency=concurrency, backoff_base=0.05
+    )
+
+    async def student(n):
+        for i in range(requests_per_user):
+            prompt = f"question {i}" if same_prompt else f"student {n} question {i}"
+            await client.complete(build_messages(prompt, PROFILE))
+
+    served_before = server.requests_served
+    started = time.perf_counter()
+    await asyncio.gather(*(student(n) for n in range(users)))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+    total = users * requests_per_user
+    return total / elapsed, server.requests_served - served_before, client
+
+
+async def main_async(args):
+    server = await StubChatServer(latency=args.latency, failure_rate=args.failure_rate, token_latency=0.0, seed=0).start()
+    print(f"stub latency {args.latency * 1000:.0f} ms, concurrency limit {args.concurrency}\n")
+    print(f"{'users':>6} | {'mode':<10} | {'req/s':>8} | {'upstream calls':>14} | {'coalesced':>9} | {'retries':>7}")
+    for users in (int(u) for u in args.users.split(",")):
+        for same_prompt in (False, True):
+            rate, upstream, client = await run(users, args.requests, server, args.concurrency, same_prompt)
+            mode = "identical" if same_prompt else "unique"
+            print(
+                f"{users:>6} | {mode:<10} | {rate:>8.1f} | {upstream:>14} | "
+                f"{client.requests_coalesced:>9} | {client.retries:>7}"
+            )
+    await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", default="1,10,50,100")
+    parser.add_argument("--requests", type=int, default=5, help="requests per user")
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
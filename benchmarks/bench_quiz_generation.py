@@ -0,0 +1,114 @@
+"""Benchmark: batch question generation with the local deterministic generator.
+
+Builds a synthetic document of --chunks chunks and runs
+``generate_quiz_items`` with ``ClozeGenerator`` on three backends: one
+worker thread, a --workers thread pool, and a --workers process pool. It
+reports questions generated per second, before deduplication, and how
+many were kept. It also checks backpressure, meaning how far ahead of
+the finished batches the document is read, and how long closing the
+pipeline mid-run takes. Worker pools only pay off with more than one
+core, or with a generator that waits on I/O such as a model API. Run
+from the repository root:
+
+    python benchmarks/bench_quiz_generation.py [--chunks 2000] [--workers 4] [--batch-size 8]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.quiz_generation import ClozeGenerator, generate_quiz_items  # noqa: E402
+
+TERMS = (
+    "mitochondria chloroplast ribosome nucleus membrane cytoplasm enzyme protein glucose chromosome "
+    "photosynthesis respiration osmosis diffusion vacuole lysosome cellulose hormone neuron antibody"
+).split()
+VERBS = ("regulates", "produces", "transports", "stores", "breaks down", "protects", "synthesizes")
+OBJECTS = ("energy for the cell", "genetic information", "water and nutrients", "waste products", "chemical signals")
+
+
+def make_chunks(count, sentences=12, seed=5):
+    rng = random.Random(seed)
+    return [
+        " ".join(
+            f"The {first} {rng.choice(VERBS)} {rng.choice(OBJECTS)} while the {second} supports it in living organisms."
+            for first, second in (rng.sample(TERMS, 2) for _ in range(sentences))
+        )
+        for _ in range(count)
+    ]
+
+
+def run(chunks, executor, batch_size, max_pending):
+    started = time.perf_counter()
+    kept = duplicates = 0
+    for batch in generate_quiz_items(
+        chunks, ClozeGenerator(), "biology", executor=executor, batch_size=batch_size, max_pending=max_pending
+    ):
+        kept += len(batch.items)
+        duplicates += batch.duplicates
+    return kept + duplicates, kept, time.perf_counter() - started
+
+
+def measure_read_ahead(chunks, executor, batch_size, max_pending):
+    """Most chunks read from the source beyond those in batches already yielded"""
+    read = 0
+
+    def source():
+        nonlocal read
+        for chunk in chunks:
+            read += 1
+            yield chunk
+
+    worst = 0
+    for finished, _ in enumerate(generate_quiz_items(
+        source(), ClozeGenerator(), "biology", executor=executor, batch_size=batch_size, max_pending=max_pending
+    ), start=1):
+        worst = max(worst, read - finished * batch_size)
+    return worst
+
+
+def measure_cancel(chunks, executor, batch_size, max_pending):
+    """Milliseconds to close the pipeline after its first batch"""
+    batches = generate_quiz_items(
+        chunks, ClozeGenerator(), "biology", executor=executor, batch_size=batch_size, max_pending=max_pending
+    )
+    next(batches)
+    started = time.perf_counter()
+    batches.close()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-pending", type=int, default=4)
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    print(f"{args.chunks} chunks, {args.batch_size} per batch, at most {args.max_pending} batches in flight\n")
+    print(f"{'backend':<20} | {'generated':>9} | {'kept':>6} | {'seconds':>7} | {'items/s':>8}")
+    for label, make_executor in (
+        ("1 thread", lambda: ThreadPoolExecutor(max_workers=1)),
+        (f"{args.workers} threads", lambda: ThreadPoolExecutor(max_workers=args.workers)),
+        (f"{args.workers} processes", lambda: ProcessPoolExecutor(max_workers=args.workers)),
+    ):
+        with make_executor() as executor:
+            generated, kept, seconds = run(chunks, executor, args.batch_size, args.max_pending)
+        print(f"{label:<20} | {generated:>9} | {kept:>6} | {seconds:>7.2f} | {generated / seconds:>8.0f}")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        read_ahead = measure_read_ahead(chunks, executor, args.batch_size, args.max_pending)
+        cancel_ms = measure_cancel(chunks, executor, args.batch_size, args.max_pending)
+    print(f"\nread ahead of finished batches: at most {read_ahead} chunks (bound {args.max_pending * args.batch_size})")
+    print(f"closing mid-run returned in {cancel_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
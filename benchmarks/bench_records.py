@@ -0,0 +1,128 @@
+"""Benchmark: memory per study session, quiz attempt and chat message record.
+
+Fills a temporary database with --records rows of each kind over a small
+set of topics. It then holds every row in memory three ways and measures
+the Python memory retained per record with tracemalloc:
+
+- ``legacy dict``: the dicts the app used to keep in session state, with
+  a 'date' string and an ISO 'timestamp' string
+- ``sqlite3.Row``: what storage reads returned before typed records
+- ``typed record``: the NamedTuple records storage returns now, with
+  interned topics and roles
+
+Every layout holds its own copy of each message's text, so message
+records are dominated by it. Run from the repository root:
+
+    python benchmarks/bench_records.py [--records 50000]
+"""
+
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.storage import Storage  # noqa: E402
+
+TOPICS = ("Algebra", "Cell biology", "World War II", "Poetry", "Sorting algorithms", "Geometry", "Chemistry")
+
+
+def retained_bytes(load):
+    """Bytes still allocated once load() returns, while its result is alive"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = load()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained, len(records)
+
+
+def fresh(text):
+    """A new string object equal to text, as each text input or SQLite read gives"""
+    return text.encode().decode()
+
+
+def legacy_sessions(storage, user_id):
+    sessions = []
+    for session in storage.iter_sessions(user_id):
+        moment = datetime.fromtimestamp(session.started_at)
+        sessions.append({
+            'topic': fresh(session.topic),
+            'duration': session.duration,
+            'date': moment.strftime("%Y-%m-%d %H:%M"),
+            'timestamp': moment.isoformat(),
+        })
+    return sessions
+
+
+def legacy_attempts(storage, user_id):
+    # The old app kept a bare list of scores and could not say what a score was for
+    return [attempt.score for attempt in storage.iter_quiz_attempts(user_id)]
+
+
+def legacy_messages(storage, user_id):
+    return [
+        {'role': fresh(message.role), 'content': message.content,
+         'timestamp': datetime.fromtimestamp(message.created_at).isoformat()}
+        for message in storage.iter_messages(user_id)
+    ]
+
+
+def sqlite_rows(storage, sql, user_id):
+    with storage.pool.connection() as conn:
+        return conn.execute(sql, (user_id,)).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=50000, help="sessions, quiz attempts and messages each")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(os.path.join(tmp, "bench.db"))
+        user_id = storage.get_or_create_user("bench")['id']
+        now = time.time()
+        with storage.batch() as batch:
+            for i in range(args.records):
+                topic = TOPICS[i % len(TOPICS)]
+                batch.add_session(user_id, topic, 15 + i % 90, now - i * 3600)
+                batch.add_quiz_attempt(user_id, float(i % 101), topic, now - i * 3600)
+                batch.add_message(user_id, "user" if i % 2 else "assistant", f"message {i} about {topic}", now - i * 60)
+
+        layouts = {
+            "sessions": (
+                lambda: legacy_sessions(storage, user_id),
+                lambda: sqlite_rows(
+                    storage, "SELECT topic, duration, started_at FROM study_sessions WHERE user_id = ?", user_id
+                ),
+                lambda: list(storage.iter_sessions(user_id)),
+            ),
+            "quiz attempts": (
+                lambda: legacy_attempts(storage, user_id),
+                lambda: sqlite_rows(storage, "SELECT topic, score, taken_at FROM quiz_attempts WHERE user_id = ?", user_id),
+                lambda: list(storage.iter_quiz_attempts(user_id)),
+            ),
+            "messages": (
+                lambda: legacy_messages(storage, user_id),
+                lambda: sqlite_rows(
+                    storage, "SELECT id, role, content, created_at FROM chat_messages WHERE user_id = ?", user_id
+                ),
+                lambda: list(storage.iter_messages(user_id)),
+            ),
+        }
+        print(f"{args.records} records of each kind, {len(TOPICS)} distinct topics\n")
+        print(f"{'records':<14} | {'legacy dict':>11} | {'sqlite3.Row':>11} | {'typed record':>12}  (bytes/record)")
+        for label, loads in layouts.items():
+            sizes = [retained_bytes(load) for load in loads]
+            print(f"{label:<14} | " + " | ".join(f"{size / count:>11.1f}" for size, count in sizes))
+        print("\nThe legacy quiz layout was a bare list of scores, without topic or time")
+
+
+if __name__ == "__main__":
+    main()
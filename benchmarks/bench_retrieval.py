@@ -0,0 +1,132 @@
+"""Benchmark: BM25 keyword index size and latency, and hybrid retrieval quality.
+
+Builds a ``KeywordIndex`` over --chunks synthetic chunks. Each chunk has
+--words words drawn from a Zipf-distributed vocabulary, so a few terms
+are in most chunks and most terms are rare, as in real notes. It reports
+indexing throughput, bytes of postings per chunk before and after the
+snapshot merge, the snapshot file size, and query latency for one to
+three term queries.
+
+It then plants --needles chunks, each with a unique keyword, among
+--hybrid-chunks chunks in a real ``VectorStore``. It asks keyword-precise
+questions about them ("define <keyword>") and compares how often the
+planted chunk is in the top 3 for dense search alone and for
+``hybrid_search``. Run from the repository root:
+
+    python benchmarks/bench_retrieval.py [--chunks 1000000] [--hybrid-chunks 20000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.retrieval import KeywordIndex, hybrid_search  # noqa: E402
+from study_buddy.vector_store import VectorStore  # noqa: E402
+
+BLOCK = 50000
+
+
+def vocabulary(size):
+    return np.array([f"w{i}" for i in range(size)])
+
+
+def make_chunks(rng, words, count, length):
+    # Zipf ranks past the vocabulary wrap around, which keeps the tail long
+    ids = (rng.zipf(1.3, size=(count, length)) - 1) % len(words)
+    return [" ".join(row) for row in words[ids]]
+
+
+def latency_ms(fn, queries):
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.95 * (len(samples) - 1))]
+
+
+def bench_keywords(args):
+    rng = np.random.default_rng(3)
+    words = vocabulary(args.vocabulary)
+    index = KeywordIndex()
+    started = time.perf_counter()
+    for start in range(0, args.chunks, BLOCK):
+        index.add(make_chunks(rng, words, min(BLOCK, args.chunks - start), args.words))
+    build_s = time.perf_counter() - started
+    tail_bytes = index.nbytes()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "keywords.npz")
+        started = time.perf_counter()
+        index.save(path)
+        save_s = time.perf_counter() - started
+        file_bytes = os.path.getsize(path)
+        started = time.perf_counter()
+        KeywordIndex(path)
+        load_s = time.perf_counter() - started
+
+    print(f"{args.chunks:,d} chunks of {args.words} words, vocabulary {args.vocabulary:,d}")
+    print(f"index {args.chunks / build_s:,.0f} chunks/s | merge and save {save_s:.2f} s | load {load_s:.2f} s")
+    print(
+        f"postings: {tail_bytes / args.chunks:.1f} bytes/chunk before merge, {index.nbytes() / args.chunks:.1f} after, "
+        f"snapshot file {file_bytes / 1e6:.1f} MB\n"
+    )
+    print(f"{'query':<28} | {'p50 ms':>8} | {'p95 ms':>8}")
+    for label, ranks in (
+        ("1 rare term", (slice(5000, 20000),)),
+        ("2 mid-frequency terms", (slice(100, 1000),) * 2),
+        ("3 terms, one very common", (slice(0, 5), slice(100, 1000), slice(5000, 20000))),
+    ):
+        queries = [" ".join(rng.choice(words[rank]) for rank in ranks) for _ in range(args.queries)]
+        p50, p95 = latency_ms(lambda query: index.search(query, k=10), queries)
+        print(f"{label:<28} | {p50:>8.2f} | {p95:>8.2f}")
+
+
+def bench_hybrid(args):
+    rng = np.random.default_rng(4)
+    words = vocabulary(args.vocabulary)
+    chunks = make_chunks(rng, words, args.hybrid_chunks, args.words)
+    positions = rng.choice(args.hybrid_chunks, size=args.needles, replace=False)
+    for n, position in enumerate(positions):
+        chunks[position] += f" cytokinesis{n} is where the dividing cell splits in two"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(tmp)
+        for start in range(0, len(chunks), BLOCK):
+            store.add_notes(chunks[start:start + BLOCK], "synthetic")
+        queries = [(f"define cytokinesis{n}", int(position)) for n, position in enumerate(positions)]
+        print(f"\n{args.hybrid_chunks:,d} chunks, {args.needles} keyword questions, found in the top 3")
+        print(f"{'retrieval':<14} | {'recall@3':>8} | {'p50 ms':>8} | {'p95 ms':>8}")
+        for label, search in (
+            ("dense only", lambda query: store.search(query, k=3)),
+            ("hybrid", lambda query: hybrid_search(store, query, k=3)),
+        ):
+            found = sum(position in {hit.id for hit in search(query)} for query, position in queries)
+            p50, p95 = latency_ms(search, [query for query, _ in queries])
+            print(f"{label:<14} | {found / len(queries):>8.0%} | {p50:>8.2f} | {p95:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1000000)
+    parser.add_argument("--words", type=int, default=30, help="words per chunk")
+    parser.add_argument("--vocabulary", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--hybrid-chunks", type=int, default=20000)
+    parser.add_argument("--needles", type=int, default=50)
+    args = parser.parse_args()
+
+    bench_keywords(args)
+    bench_hybrid(args)
+
+
+if __name__ == "__main__":
+    main()
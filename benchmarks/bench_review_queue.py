@@ -0,0 +1,109 @@
+"""Benchmark: picking due quiz items from a large spaced-repetition deck.
+
+Fills a temporary database with --cards items in one subject and gives a
+student random due dates for all of them. It then compares three ways to
+pick the next --limit due items: the heap in ``ReviewQueue``, an SQL
+``ORDER BY due_at LIMIT`` query, and sorting every card in Python. It
+also times loading the queue, answering an item (SQLite write plus heap
+push), and reports the on-disk bytes per scheduled card. Run from the
+repository root:
+
+    python benchmarks/bench_review_queue.py [--cards 50000] [--limit 10]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.quiz import DAY_SECONDS, ReviewQueue, answer_item  # noqa: E402
+from study_buddy.storage import Storage  # noqa: E402
+
+SUBJECT = "Benchmark"
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def table_bytes(storage, table):
+    with storage.pool.connection() as conn:
+        return conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ?", (table,)).fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", type=int, default=50000)
+    parser.add_argument("--limit", type=int, default=10, help="due items picked per call")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    now = time.time()
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = Storage(os.path.join(tmp, "bench.db"))
+        user_id = storage.get_or_create_user("bench")['id']
+        storage.add_quiz_items(
+            (SUBJECT, f"topic {i % 50}", f"question {i}", [f"answer {i}", "other", "another", "none"], 0)
+            for i in range(args.cards)
+        )
+        storage.enroll_items(user_id, SUBJECT, now)
+        # Spread due dates from two weeks overdue to two months ahead, as in a deck in steady use
+        with storage.pool.transaction() as conn:
+            conn.executemany(
+                "UPDATE review_schedule SET due_at = ?, interval_days = ?, reps = ? WHERE user_id = ? AND item_id = ?",
+                (
+                    (int(now + rng.uniform(-14, 60) * DAY_SECONDS), rng.randint(1, 60), rng.randint(1, 8), user_id, item_id)
+                    for _, item_id in storage.iter_due_times(user_id, SUBJECT)
+                ),
+            )
+        with storage.pool.connection() as conn:
+            conn.execute("VACUUM")
+
+        load_ms = median_ms(lambda: ReviewQueue.from_storage(storage, user_id, SUBJECT), 5)
+        review_queue = ReviewQueue.from_storage(storage, user_id, SUBJECT)
+        due_times = [tuple(row) for row in storage.iter_due_times(user_id, SUBJECT)]
+
+        def sql_due():
+            with storage.pool.connection() as conn:
+                return conn.execute(
+                    "SELECT s.item_id FROM review_schedule s JOIN quiz_items i ON i.id = s.item_id "
+                    "WHERE s.user_id = ? AND i.subject = ? AND s.due_at <= ? ORDER BY s.due_at, s.item_id LIMIT ?",
+                    (user_id, SUBJECT, now, args.limit),
+                ).fetchall()
+
+        def sorted_due():
+            return [item_id for due_at, item_id in sorted(due_times) if due_at <= now][:args.limit]
+
+        assert review_queue.due(now, args.limit) == [row[0] for row in sql_due()] == sorted_due()
+
+        print(f"{args.cards} cards, picking the next {args.limit} due\n")
+        print(f"{'operation':<28} | {'median ms':>10}")
+        print(f"{'heap (ReviewQueue.due)':<28} | {median_ms(lambda: review_queue.due(now, args.limit), args.repeat):>10.3f}")
+        print(f"{'SQL ORDER BY due_at LIMIT':<28} | {median_ms(sql_due, 20):>10.3f}")
+        print(f"{'sort every card in Python':<28} | {median_ms(sorted_due, 20):>10.3f}")
+        print(f"{'load queue from SQLite':<28} | {load_ms:>10.3f}")
+
+        items = [storage.get_quiz_item(item_id) for item_id in review_queue.due(now, args.repeat)]
+        answers = iter(items)
+
+        def answer():
+            item = next(answers)
+            answer_item(storage, review_queue, user_id, item, item['choices'][rng.randrange(2)], now)
+
+        print(f"{'answer an item':<28} | {median_ms(answer, len(items)):>10.3f}")
+        print(f"\nschedule on disk: {table_bytes(storage, 'review_schedule') / args.cards:.1f} bytes per card")
+
+
+if __name__ == "__main__":
+    main()
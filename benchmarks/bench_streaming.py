@@ -0,0 +1,72 @@
+"""Benchmark: time to first token vs. full-answer latency for tutor replies.
+
+Runs the local stub chat server and asks the same questions through
+``LLMBackend.generate`` (the whole answer at once) and ``LLMBackend.stream``.
+Reports the median and p95 time until the student first sees text and until
+the reply is complete. Run from the repository root:
+
+    python benchmarks/bench_streaming.py [--latency 0.3] [--token-latency 0.02] [--questions 20]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.llm_client import LLMBackend  # noqa: E402
+from study_buddy.stub_server import StubChatServer  # noqa: E402
+from study_buddy.tutor import ResponseTiming  # noqa: E402
+
+PROFILE = {'subject': "Science", 'learning_style': "Visual"}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.3, help="stub delay before the first token")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="stub delay between words")
+    parser.add_argument("--questions", type=int, default=20)
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    server = StubChatServer(latency=args.latency, token_latency=args.token_latency)
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    backend = LLMBackend(base_url=server.base_url)
+
+    blocking, first, complete = [], [], []
+    for i in range(args.questions):
+        prompt = f"Explain topic number {i} with an example"
+        started = time.perf_counter()
+        backend.generate(prompt, PROFILE)
+        blocking.append((time.perf_counter() - started) * 1000)
+
+        timing = ResponseTiming()
+        for _ in timing.track(backend.stream(prompt, PROFILE)):
+            pass
+        first.append(timing.ttft_ms)
+        complete.append(timing.total_ms)
+
+    backend.close()
+    print(f"stub latency {args.latency * 1000:.0f} ms + {args.token_latency * 1000:.0f} ms/word, "
+          f"{args.questions} questions\n")
+    print(f"{'mode':<28} | {'median ms':>9} | {'p95 ms':>7}")
+    for label, values in (
+        ("generate: first text", blocking),
+        ("stream: first token (TTFT)", first),
+        ("stream: full answer", complete),
+    ):
+        print(f"{label:<28} | {statistics.median(values):>9.1f} | {percentile(values, 0.95):>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark: vector store add, search, save and reload at several sizes.
+
+Vectors are random unit vectors added through VectorStore.add_vectors, so
+the numbers isolate indexing and retrieval from embedding cost. Embedding
+throughput of the hashing embedder is reported separately. Run from the
+repository root:
+
+    python benchmarks/bench_vector_store.py [--sizes 10000,100000,1000000] [--dim 256]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from study_buddy.vector_store import HashingEmbedder, VectorStore  # noqa: E402
+
+BLOCK = 50000
+
+
+def random_unit(rng, n, dim):
+    vectors = rng.standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def bench_size(size, dim, queries, k):
+    rng = np.random.default_rng(size)
+    embedder = HashingEmbedder(dim)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = VectorStore(tmp, embedder=embedder)
+        started = time.perf_counter()
+        for start in range(0, size, BLOCK):
+            n = min(BLOCK, size - start)
+            metadata = [{'source': "synthetic", 'page': start + i, 'text': f"chunk {start + i}"} for i in range(n)]
+            store.add_vectors(random_unit(rng, n, dim), metadata)
+        add_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        store.save()
+        save_s = time.perf_counter() - started
+
+        latencies = []
+        for query in random_unit(rng, queries, dim):
+            started = time.perf_counter()
+            store.search_vectors(query[None, :], k)
+            latencies.append((time.perf_counter() - started) * 1000)
+        latencies.sort()
+
+        started = time.perf_counter()
+        reloaded = VectorStore(tmp, embedder=embedder)
+        reload_s = time.perf_counter() - started
+        assert len(reloaded) == size
+
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    print(
+        f"{size:>9,d} chunks | add {size / add_s:>10,.0f}/s | save {save_s:6.2f}s | "
+        f"reload {reload_s:6.2f}s | search p50 {statistics.median(latencies):7.2f} ms p95 {p95:7.2f} ms"
+    )
+
+
+def bench_embedder(dim, n=2000):
+    texts = [f"mitosis produces two identical daughter cells in section {i} of chapter {i % 17}" * 8 for i in range(n)]
+    embedder = HashingEmbedder(dim)
+    started = time.perf_counter()
+    embedder.embed(texts)
+    elapsed = time.perf_counter() - started
+    print(f"hashing embedder: {n / elapsed:,.0f} chunks/s at dim {dim}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    bench_embedder(args.dim)
+    for size in (int(s) for s in args.sizes.split(",")):
+        bench_size(size, args.dim, args.queries, args.k)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Load test: simulated students driving app.py headlessly.
+
+Seeds a temporary database with --users students. Each one has --history
+study sessions, quiz attempts and chat messages. Then one ``AppTest``
+session per student goes through a typical visit, --rounds times: log in,
+add a goal, record a study session, ask the tutor a question and open
+Progress. Each step is one rerun. AppTest swaps a process-global runtime
+on every run, so sessions take turns round-robin, one rerun at a time.
+Caches and the database are shared between them, as on a real server.
+
+Reports rerun latency per action (p50/p95) and throughput in reruns per
+second of script time. Latency is the app's own ``rerun/total`` metric,
+because AppTest checks for completion only every 100 ms. Widget callbacks
+run before the script and are not included. It also reports retained memory per session. For that, a second
+pass traces allocations with tracemalloc while --memory-sessions more
+students go through one round, and divides what is still allocated
+afterwards by their number. This includes the caches each new student
+fills.
+
+Results are compared with the stored baseline for the same configuration
+in benchmarks/baselines/load_test.json. The run fails if there are
+errors, if a latency or memory figure is more than --tolerance times its
+baseline, or if throughput drops below baseline / --tolerance. Use
+--update-baseline after an intended change. The chat API settings are
+cleared, so the template tutor answers offline. Run from the repository
+root:
+
+    python benchmarks/load_test.py [--users 8] [--history 2000] [--rounds 2] [--update-baseline] [--json]
+"""
+
+import argparse
+import gc
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+APP = os.path.join(ROOT, "app.py")
+BASELINES = os.path.join(ROOT, "benchmarks", "baselines", "load_test.json")
+sys.path.insert(0, ROOT)
+
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from study_buddy.config import data_dir  # noqa: E402
+from study_buddy.instrumentation import METRICS, percentile  # noqa: E402
+from study_buddy.progress import FREQUENCIES  # noqa: E402
+from study_buddy.storage import Storage  # noqa: E402
+
+RUN_TIMEOUT = 120
+TOPICS = ("Algebra", "Photosynthesis", "World War II", "Python loops", "Cell biology", "French verbs")
+QUESTIONS = (
+    "explain mitosis",
+    "give me a quiz on fractions",
+    "make a study plan for the chemistry exam",
+    "what is a derivative?",
+)
+# Latency and memory figures where higher is a regression; throughput is checked the other way
+LOWER_IS_BETTER = ('rerun_p50_ms', 'rerun_p95_ms', 'session_kb')
+
+
+def seed_history(storage, name, history, now):
+    """Give a student a past of history sessions, quiz attempts and chat messages"""
+    user_id = storage.get_or_create_user(name)['id']
+    with storage.batch() as batch:
+        for i in range(history):
+            started_at = now - i * 3600
+            batch.add_session(user_id, TOPICS[i % len(TOPICS)], 15 + i % 60, started_at)
+            batch.add_quiz_attempt(user_id, float(i * 37 % 101), TOPICS[i % len(TOPICS)], started_at)
+            role = 'user' if i % 2 == 0 else 'assistant'
+            batch.add_message(user_id, role, f"message {i} about {TOPICS[i % len(TOPICS)].lower()}", now - i * 60)
+        batch.add_goal(user_id, "Pass the final exam")
+        batch.add_goal(user_id, "Study every day")
+
+
+def by_label(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"no widget labelled {label!r}")
+
+
+class RerunTotals:
+    """Metrics sink keeping the app's own whole-rerun times, free of AppTest's 100 ms completion polling"""
+
+    def __init__(self):
+        self.samples = []
+
+    def write(self, sample):
+        if sample['section'] == "rerun/total":
+            self.samples.append(sample['ms'])
+
+    def flush(self):
+        pass
+
+
+def rerun(app):
+    try:
+        app.run()
+    except KeyError as exc:
+        # AppTest 1.28 can read the runner's events before the shutdown event
+        # lands; the run itself finished and its element tree is already parsed
+        if exc.args != ("client_state",):
+            raise
+
+
+class Student:
+    """One browser session working through a scripted visit"""
+
+    def __init__(self, name, rounds):
+        self.name = name
+        self.app = AppTest.from_file(APP, default_timeout=RUN_TIMEOUT)
+        self.steps = self._visit(rounds)
+
+    def _visit(self, rounds):
+        """Set up each interaction, then yield its action name for the driver to run"""
+        at = self.app
+        yield "open"
+        by_label(at.text_input, "Your Name").set_value(self.name)
+        yield "login"
+        groupings = list(FREQUENCIES)
+        for i in range(rounds):
+            by_label(at.text_input, "Add a new goal").set_value(f"Goal {i} for {self.name}")
+            by_label(at.button, "Add Goal").click()
+            yield "add goal"
+
+            at.radio(key="active_page").set_value("📚 Study Materials")
+            yield "open materials"
+            by_label(at.text_input, "What did you study?").set_value(TOPICS[i % len(TOPICS)])
+            by_label(at.button, "📝 Record Session").click()
+            yield "record session"
+
+            at.radio(key="active_page").set_value("🤖 AI Tutor")
+            yield "open tutor"
+            at.text_input(key="chat_input").set_value(QUESTIONS[i % len(QUESTIONS)])
+            by_label(at.button, "Send").click()
+            yield "send message"
+
+            at.radio(key="active_page").set_value("📊 Progress")
+            yield "open progress"
+            by_label(at.radio, "Group by").set_value(groupings[(i + 1) % len(groupings)])
+            yield "regroup progress"
+
+
+def drive(students, totals):
+    """Advance every student one step at a time, round-robin; returns rerun ms by action, and errors"""
+    latencies = defaultdict(list)
+    errors = []
+    active = list(students)
+    while active:
+        for student in list(active):
+            try:
+                action = next(student.steps)
+            except StopIteration:
+                active.remove(student)
+                continue
+            except LookupError as exc:
+                errors.append(f"{student.name}: {exc}")
+                active.remove(student)
+                continue
+            recorded = len(totals.samples)
+            rerun(student.app)
+            if len(totals.samples) > recorded:
+                latencies[action].append(totals.samples[-1])
+            if student.app.exception:
+                errors.append(f"{student.name} {action}: {student.app.exception[0].message}")
+                active.remove(student)
+    return latencies, errors
+
+
+def check_writes(storage, names, history, rounds):
+    """Errors for students whose goals, sessions or messages from the visit did not all reach the database"""
+    errors = []
+    for name in names:
+        user_id = storage.get_or_create_user(name)['id']
+        found = {
+            'goals': storage.count_goals(user_id),
+            'sessions': storage.session_totals(user_id)[0],
+            'messages': storage.count_messages(user_id),
+        }
+        expected = {'goals': 2 + rounds, 'sessions': history + rounds, 'messages': history + 2 * rounds}
+        if found != expected:
+            errors.append(f"{name}: expected {expected} in the database, found {found}")
+    return errors
+
+
+def measure_session_memory(names, rounds, totals):
+    """Mean KB still allocated per session after each of names logs in and goes through the visit"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    students = [Student(name, rounds) for name in names]
+    _, errors = drive(students, totals)
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained / len(students) / 1024, errors
+
+
+def run(args):
+    names = [f"student-{i:03d}" for i in range(args.users + args.memory_sessions)]
+    storage = Storage(data_dir("study_buddy.db"))
+    now = time.time()
+    seeded = time.perf_counter()
+    for name in names:
+        seed_history(storage, name, args.history, now)
+    seed_seconds = time.perf_counter() - seeded
+
+    totals = RerunTotals()
+    METRICS.add_sink(totals)
+    students = [Student(name, args.rounds) for name in names[:args.users]]
+    started = time.perf_counter()
+    latencies, errors = drive(students, totals)
+    wall_seconds = time.perf_counter() - started
+    errors += check_writes(storage, names[:args.users], args.history, args.rounds)
+    session_kb, memory_errors = measure_session_memory(names[args.users:], 1, totals)
+
+    samples = sorted(ms for values in latencies.values() for ms in values)
+    return {
+        'config': {'users': args.users, 'history': args.history, 'rounds': args.rounds},
+        'seed_seconds': round(seed_seconds, 2),
+        'reruns': len(samples),
+        'errors': errors + memory_errors,
+        'rerun_p50_ms': round(percentile(samples, 0.5), 1),
+        'rerun_p95_ms': round(percentile(samples, 0.95), 1),
+        # What one process could serve back to back; the driver's wall time also includes AppTest's polling
+        'reruns_per_second': round(len(samples) / (sum(samples) / 1000), 2),
+        'driver_seconds': round(wall_seconds, 1),
+        'session_kb': round(session_kb, 1),
+        # ru_maxrss is in KB on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'actions': {
+            action: {
+                'count': len(values),
+                'p50_ms': round(percentile(sorted(values), 0.5), 1),
+                'p95_ms': round(percentile(sorted(values), 0.95), 1),
+            }
+            for action, values in latencies.items()
+        },
+    }
+
+
+def config_key(config):
+    return ",".join(f"{key}={value}" for key, value in config.items())
+
+
+def regressions(results, baseline, tolerance):
+    """Descriptions of each figure that is worse than its baseline by more than tolerance"""
+    over = []
+    for key in LOWER_IS_BETTER:
+        if results[key] > baseline[key] * tolerance:
+            over.append(f"{key} {results[key]} vs baseline {baseline[key]}")
+    if results['reruns_per_second'] < baseline['reruns_per_second'] / tolerance:
+        over.append(f"reruns_per_second {results['reruns_per_second']} vs baseline {baseline['reruns_per_second']}")
+    for action, row in baseline['actions'].items():
+        current = results['actions'].get(action)
+        if current and current['p95_ms'] > row['p95_ms'] * tolerance:
+            over.append(f"{action} p95 {current['p95_ms']} ms vs baseline {row['p95_ms']} ms")
+    return over
+
+
+def print_report(results):
+    config = results['config']
+    print(
+        f"{config['users']} students x {config['rounds']} rounds, {config['history']} records of each kind "
+        f"per student (seeded in {results['seed_seconds']} s)\n"
+    )
+    print(f"{'action':<18} | {'count':>5} | {'p50 ms':>8} | {'p95 ms':>8}")
+    for action, row in results['actions'].items():
+        print(f"{action:<18} | {row['count']:>5} | {row['p50_ms']:>8.1f} | {row['p95_ms']:>8.1f}")
+    print(f"{'all reruns':<18} | {results['reruns']:>5} | {results['rerun_p50_ms']:>8.1f} | {results['rerun_p95_ms']:>8.1f}\n")
+    print(f"throughput        | {results['reruns_per_second']} reruns/s of script time ({results['driver_seconds']} s driving)")
+    print(f"memory per session| {results['session_kb']} KB retained (tracemalloc)")
+    print(f"peak RSS          | {results['peak_rss_mb']} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--history", type=int, default=2000, help="sessions, quiz attempts and messages per student")
+    parser.add_argument("--rounds", type=int, default=2, help="times each student goes through the visit")
+    parser.add_argument("--memory-sessions", type=int, default=4, help="extra students traced for memory per session")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="allowed ratio to the baseline before failing")
+    parser.add_argument("--baseline", default=BASELINES)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    if args.memory_sessions < 1:
+        parser.error("--memory-sessions must be at least 1")
+
+    # Offline and isolated: the template tutor, and a throwaway data directory
+    os.environ.pop("OPENAI_API_KEY", None)
+    os.environ.pop("OPENAI_BASE_URL", None)
+    with tempfile.TemporaryDirectory() as data:
+        os.environ["STUDY_BUDDY_DATA_DIR"] = data
+        results = run(args)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
+    if results['errors']:
+        sys.exit("errors:\n" + "\n".join(results['errors']))
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+    key = config_key(results['config'])
+    if args.update_baseline:
+        baselines[key] = {name: value for name, value in results.items() if name not in ('errors', 'seed_seconds', 'driver_seconds')}
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"\nbaseline for {key} written to {os.path.relpath(args.baseline, ROOT)}")
+    elif key not in baselines:
+        print(f"\nno baseline for {key}; run with --update-baseline to store one")
+    else:
+        over = regressions(results, baselines[key], args.tolerance)
+        if over:
+            sys.exit(f"regressed beyond {args.tolerance}x baseline:\n" + "\n".join(over))
+        print(f"\nwithin {args.tolerance}x of the {key} baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Backend helpers for the AI Learning Platform Streamlit app."""
@@ -0,0 +1,150 @@
+"""Running aggregates for dashboard metrics.
+
+Totals are maintained incrementally as sessions and quiz attempts are
+recorded or removed, so reading a metric never rescans a student's history.
+Each set of totals remembers the storage revision it matches. When several
+server processes share one database, ``sync`` rebuilds totals that another
+process has made stale.
+"""
+
+import threading
+from collections import Counter
+from datetime import date
+
+
+def day_key(timestamp):
+    """Local calendar day of an epoch timestamp, as an ISO date string"""
+    return date.fromtimestamp(timestamp).isoformat()
+
+
+class StudyAggregates:
+    """O(1)-update totals over one student's study sessions and quiz scores"""
+
+    # The totals a rebuild replaces
+    TOTALS = (
+        'session_count', 'total_minutes', 'topic_minutes', 'day_minutes',
+        '_topic_sessions', '_day_sessions', 'quiz_count', 'quiz_total',
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Held across a whole sync, so concurrent reruns sharing this object rebuild it once
+        self._sync_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # Storage revision these totals match, or None when unknown
+            self.revision = None
+            self.session_count = 0
+            self.total_minutes = 0
+            self.topic_minutes = Counter()
+            self.day_minutes = Counter()
+            self._topic_sessions = Counter()
+            self._day_sessions = Counter()
+            self.quiz_count = 0
+            self.quiz_total = 0.0
+            # Bumped on every change so derived views (charts) can be cached by it
+            self.version = getattr(self, "version", 0) + 1
+
+    @classmethod
+    def from_storage(cls, storage, user_id):
+        """Build the aggregates with one pass over the stored history"""
+        aggregates = cls()
+        aggregates.sync(storage, user_id)
+        return aggregates
+
+    def sync(self, storage, user_id):
+        """Rebuild from storage if it changed other than through this object; returns True if it did"""
+        with self._sync_lock:
+            # Read first, so a write racing with the rebuild leaves the totals marked stale
+            revision = storage.revision(user_id)
+            if revision == self.revision:
+                return False
+            # Built aside and swapped in whole, so readers never see half-replayed totals
+            rebuilt = type(self)()
+            for session in storage.iter_sessions(user_id):
+                rebuilt.add_session(session.topic, session.duration, session.started_at)
+            for attempt in storage.iter_quiz_attempts(user_id):
+                rebuilt.add_quiz_score(attempt.score)
+            with self._lock:
+                for field in self.TOTALS:
+                    setattr(self, field, getattr(rebuilt, field))
+                self.revision = revision
+                self.version += 1
+        return True
+
+    def _advance(self, revision):
+        # In step only if this write is the one change since the revision these totals match
+        if revision is not None:
+            self.revision = revision if self.revision == revision - 1 else None
+
+    @property
+    def quiz_mean(self):
+        return self.quiz_total / self.quiz_count if self.quiz_count else None
+
+    def add_session(self, topic, duration, started_at, revision=None):
+        """Count a session; revision is the one storage returned for writing it, if known"""
+        day = day_key(started_at)
+        with self._lock:
+            self.session_count += 1
+            self.total_minutes += duration
+            self.topic_minutes[topic] += duration
+            self._topic_sessions[topic] += 1
+            self.day_minutes[day] += duration
+            self._day_sessions[day] += 1
+            self.version += 1
+            self._advance(revision)
+
+    def remove_session(self, topic, duration, started_at):
+        day = day_key(started_at)
+        with self._lock:
+            if not self._topic_sessions[topic] or not self._day_sessions[day]:
+                raise KeyError(f"no recorded session for {topic!r} on {day}")
+            self.session_count -= 1
+            self.total_minutes -= duration
+            self.topic_minutes[topic] -= duration
+            self._topic_sessions[topic] -= 1
+            if not self._topic_sessions[topic]:
+                del self.topic_minutes[topic], self._topic_sessions[topic]
+            self.day_minutes[day] -= duration
+            self._day_sessions[day] -= 1
+            if not self._day_sessions[day]:
+                del self.day_minutes[day], self._day_sessions[day]
+            self.version += 1
+
+    def add_quiz_score(self, score, revision=None):
+        with self._lock:
+            self.quiz_count += 1
+            self.quiz_total += score
+            self.version += 1
+            self._advance(revision)
+
+    def remove_quiz_score(self, score):
+        with self._lock:
+            if not self.quiz_count:
+                raise KeyError("no recorded quiz scores")
+            self.quiz_count -= 1
+            self.quiz_total -= score
+            self.version += 1
+
+    def snapshot(self):
+        """Plain-dict view of every aggregate, for comparisons and display"""
+        with self._lock:
+            return {
+                'session_count': self.session_count,
+                'total_minutes': self.total_minutes,
+                'topic_minutes': dict(self.topic_minutes),
+                'day_minutes': dict(self.day_minutes),
+                'quiz_count': self.quiz_count,
+                'quiz_total': round(self.quiz_total, 6),
+            }
+
+    def check_consistency(self, storage, user_id):
+        """Raise AssertionError if the running totals disagree with a full recompute"""
+        expected = StudyAggregates.from_storage(storage, user_id).snapshot()
+        actual = self.snapshot()
+        mismatched = [key for key in expected if expected[key] != actual[key]]
+        if mismatched:
+            details = ", ".join(f"{key}: {actual[key]!r} != {expected[key]!r}" for key in mismatched)
+            raise AssertionError(f"aggregates out of sync with storage ({details})")
@@ -0,0 +1,250 @@
+"""Content-addressed cache of processed uploads, shared by every student.
+
+An upload is keyed by the SHA-256 of its bytes. Everything derived from
+it lives in ``<root>/<digest[:2]>/<digest>/``:
+
+- ``chunks.jsonl``: one ``{"page", "text", "n_tokens"}`` record per chunk
+- ``embeddings.f32``: float32 rows, one per chunk
+- ``meta.json``: page, chunk and token counts, a preview, an extractive
+  summary and the recipe (tokenizer, chunk sizes, embedder) it was built with
+
+When a classmate uploads the same lecture file, the app copies chunks and
+vectors from here into their own vector store without extracting or
+embedding anything. Entries are built in a temporary directory and
+renamed into place, so readers never see a partial one. A server process
+that loses the race to finish an entry keeps the winner's. ``index.db``
+records each entry's size and last use. After a write pushes the total
+past ``max_bytes``, the least recently used entries are deleted.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from study_buddy.conversation import first_sentence
+from study_buddy.ingest import DEFAULT_CHUNK_TOKENS, DEFAULT_ENCODING, DEFAULT_OVERLAP_TOKENS, Chunk, ingest
+
+HASH_BLOCK_BYTES = 1 << 20
+PREVIEW_CHARS = 500
+SUMMARY_SENTENCES = 5
+
+CHUNKS_FILE = "chunks.jsonl"
+EMBEDDINGS_FILE = "embeddings.f32"
+META_FILE = "meta.json"
+
+
+def content_digest(stream):
+    """SHA-256 hex digest of a binary stream, read in blocks; the stream is rewound afterwards"""
+    stream.seek(0)
+    digest = hashlib.sha256()
+    while block := stream.read(HASH_BLOCK_BYTES):
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def ingest_recipe(embedder):
+    """Everything besides the bytes that shapes an entry; a cached entry with another recipe is rebuilt"""
+    return (
+        f"{DEFAULT_ENCODING}/{DEFAULT_CHUNK_TOKENS}/{DEFAULT_OVERLAP_TOKENS}/"
+        f"{type(embedder).__name__}-{embedder.dim}"
+    )
+
+
+class SummarySampler:
+    """Opening sentences of chunks spread evenly over a document of unknown length, in bounded memory"""
+
+    def __init__(self, sentences=SUMMARY_SENTENCES):
+        self.sentences = sentences
+        self.stride = 1
+        self._lines = []
+
+    def add(self, index, text):
+        if index % self.stride:
+            return
+        self._lines.append(first_sentence(text))
+        if len(self._lines) == 2 * self.sentences:
+            # Keep every other line and sample half as often from here on
+            del self._lines[1::2]
+            self.stride *= 2
+
+    def summary(self):
+        step = max(1, len(self._lines) // self.sentences)
+        return " ".join(dict.fromkeys(self._lines[::step][:self.sentences]))
+
+
+class Artifact:
+    """A cached, fully processed upload"""
+
+    def __init__(self, digest, path, meta, cached=False):
+        self.digest = digest
+        self.path = path
+        self.meta = meta
+        self.cached = cached
+
+    def iter_batches(self, batch_size=64):
+        """(chunks, embeddings) pairs of up to batch_size rows, read from disk as they are needed"""
+        count = self.meta['chunks']
+        if not count:
+            return
+        vectors = np.memmap(
+            os.path.join(self.path, EMBEDDINGS_FILE), dtype=np.float32, mode="r", shape=(count, self.meta['dim'])
+        )
+        with open(os.path.join(self.path, CHUNKS_FILE), encoding="utf-8") as f:
+            batch = []
+            for index, line in enumerate(f):
+                record = json.loads(line)
+                batch.append(Chunk(index, record['page'], record['text'], record['n_tokens']))
+                if len(batch) == batch_size:
+                    yield batch, np.array(vectors[index + 1 - len(batch):index + 1])
+                    batch = []
+            if batch:
+                yield batch, np.array(vectors[count - len(batch):count])
+        del vectors
+
+
+class ArtifactStore:
+    """Processed uploads keyed by content hash, trimmed to max_bytes by least recent use"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS artifacts (
+        digest TEXT PRIMARY KEY,
+        recipe TEXT NOT NULL,
+        bytes INTEGER NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_artifacts_accessed ON artifacts(accessed_at);
+    """
+
+    def __init__(self, root, max_bytes=2 << 30):
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(root, "index.db"), timeout=30.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest)
+
+    def get(self, digest, recipe):
+        """The entry for digest built with recipe, or None; a hit counts as a use for LRU"""
+        with self._lock:
+            row = self._conn.execute("SELECT recipe FROM artifacts WHERE digest = ?", (digest,)).fetchone()
+            if row is None or row[0] != recipe:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE artifacts SET accessed_at = ? WHERE digest = ?", (time.time(), digest))
+            self.hits += 1
+        path = self._path(digest)
+        with open(os.path.join(path, META_FILE), encoding="utf-8") as f:
+            return Artifact(digest, path, json.load(f), cached=True)
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM artifacts").fetchone()[0]
+
+    def process(self, stream, filename, embedder, on_page=None):
+        """The entry for an upload, extracting, chunking and embedding it only if it is not cached yet"""
+        digest = content_digest(stream)
+        recipe = ingest_recipe(embedder)
+        artifact = self.get(digest, recipe)
+        if artifact is not None:
+            return artifact
+
+        staging = tempfile.mkdtemp(prefix=f".{digest[:12]}-", dir=self.root)
+        try:
+            meta = self._build(staging, stream, filename, embedder, on_page)
+            meta.update(digest=digest, recipe=recipe, filename=filename, dim=embedder.dim)
+            with open(os.path.join(staging, META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            size = sum(os.path.getsize(os.path.join(staging, name)) for name in os.listdir(staging))
+            path = self._path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with self._lock:
+                row = self._conn.execute("SELECT recipe FROM artifacts WHERE digest = ?", (digest,)).fetchone()
+                if row is not None and row[0] == recipe and os.path.exists(path):
+                    # Another session or server process finished the same upload first
+                    return Artifact(digest, path, meta, cached=True)
+                if os.path.exists(path):
+                    shutil.rmtree(path)  # built with an old recipe
+                try:
+                    os.rename(staging, path)
+                except OSError:
+                    # A process beat us to the rename between the check and here; its entry is identical
+                    return Artifact(digest, path, meta, cached=True)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO artifacts (digest, recipe, bytes, accessed_at) VALUES (?, ?, ?, ?)",
+                    (digest, recipe, size, time.time()),
+                )
+                self._evict(keep=digest)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return Artifact(digest, path, meta)
+
+    def _build(self, staging, stream, filename, embedder, on_page):
+        meta = {'pages': 0, 'chunks': 0, 'tokens': 0, 'preview': ''}
+        sampler = SummarySampler()
+
+        def count_page(page):
+            meta['pages'] = page.number
+            if on_page is not None:
+                on_page(page)
+
+        with open(os.path.join(staging, CHUNKS_FILE), "w", encoding="utf-8") as chunks_file, \
+                open(os.path.join(staging, EMBEDDINGS_FILE), "wb") as vectors_file:
+            batch = []
+
+            def flush():
+                vectors_file.write(np.ascontiguousarray(embedder.embed([chunk.text for chunk in batch]), dtype=np.float32).tobytes())
+                batch.clear()
+
+            for chunk in ingest(stream, filename, on_page=count_page):
+                if not meta['chunks']:
+                    meta['preview'] = chunk.text[:PREVIEW_CHARS]
+                sampler.add(chunk.index, chunk.text)
+                meta['chunks'] += 1
+                meta['tokens'] += chunk.n_tokens
+                record = {'page': chunk.page, 'text': chunk.text, 'n_tokens': chunk.n_tokens}
+                chunks_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                batch.append(chunk)
+                if len(batch) == 64:
+                    flush()
+            if batch:
+                flush()
+        meta['summary'] = sampler.summary()
+        return meta
+
+    def _evict(self, keep):
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM artifacts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for digest, size in self._conn.execute(
+            "SELECT digest, bytes FROM artifacts WHERE digest != ? ORDER BY accessed_at", (keep,)
+        ).fetchall():
+            shutil.rmtree(self._path(digest), ignore_errors=True)
+            self._conn.execute("DELETE FROM artifacts WHERE digest = ?", (digest,))
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            for (digest,) in self._conn.execute("SELECT digest FROM artifacts").fetchall():
+                shutil.rmtree(self._path(digest), ignore_errors=True)
+            self._conn.execute("DELETE FROM artifacts")
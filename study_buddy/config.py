@@ -0,0 +1,9 @@
+"""Runtime configuration read from the environment."""
+
+import os
+
+
+def data_dir(*parts):
+    """Directory for persisted app data, overridable with STUDY_BUDDY_DATA_DIR"""
+    root = os.getenv("STUDY_BUDDY_DATA_DIR", os.path.join(os.getcwd(), "data"))
+    return os.path.join(root, *parts)
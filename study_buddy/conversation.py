@@ -0,0 +1,106 @@
+"""Token-budgeted conversation memory for tutor prompts.
+
+The full chat log stays in storage. A prompt gets the newest turns that fit
+in a token budget, measured with tiktoken, plus a short rolling summary of
+everything older. When the recent turns overflow the budget, the oldest of
+them are folded into the summary. Enough is folded each time to leave room
+for several more turns before the next fold.
+"""
+
+import re
+from itertools import chain
+
+from study_buddy.ingest import get_encoding
+from study_buddy.instrumentation import timed
+
+DEFAULT_BUDGET_TOKENS = 1500
+DEFAULT_SUMMARY_TOKENS = 300
+SUMMARY_LINE_CHARS = 160
+
+_SENTENCE_RE = re.compile(r"(.+?[.!?])(\s|$)", re.S)
+_MARKUP_RE = re.compile(r"[*_#>`]+")
+
+
+def first_sentence(text, max_chars=SUMMARY_LINE_CHARS):
+    """The opening sentence of a message, without markdown, capped at max_chars"""
+    text = " ".join(_MARKUP_RE.sub("", text).split())
+    match = _SENTENCE_RE.match(text)
+    sentence = match.group(1) if match else text
+    return sentence if len(sentence) <= max_chars else sentence[:max_chars - 1].rstrip() + "…"
+
+
+def summarize_turns(summary, messages, max_tokens, encoding):
+    """Extend an extractive summary with one line per message, dropping its oldest lines to fit max_tokens"""
+    lines = (
+        f"- {'Student' if message.role == 'user' else 'Tutor'}: {first_sentence(message.content)}"
+        for message in reversed(list(messages))
+    )
+    # Newest first, encoding each line once; joining newlines cost at most a token each
+    kept, used = [], 0
+    for line in chain(lines, reversed(summary.splitlines())):
+        used += len(encoding.encode(line, disallowed_special=())) + (1 if kept else 0)
+        if used > max_tokens:
+            break
+        kept.append(line)
+    return "\n".join(reversed(kept))
+
+
+class ConversationMemory:
+    """Prompt context for a student: a rolling summary plus the newest turns within a token budget.
+
+    ``summarize(summary, messages, max_tokens, encoding)`` can be swapped
+    for a model-backed summarizer. The default is extractive and free.
+    """
+
+    def __init__(
+        self,
+        storage,
+        budget=DEFAULT_BUDGET_TOKENS,
+        summary_budget=DEFAULT_SUMMARY_TOKENS,
+        encoding=None,
+        summarize=summarize_turns,
+    ):
+        self.storage = storage
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self.summarize = summarize
+        self._encoding = encoding
+
+    @property
+    def encoding(self):
+        if self._encoding is None:
+            self._encoding = get_encoding()
+        return self._encoding
+
+    def count_tokens(self, text):
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    @timed("conversation.context")
+    def context(self, user_id):
+        """Chat messages to send ahead of a new prompt, oldest first, within the token budget"""
+        through_id, summary = self.storage.get_chat_summary(user_id)
+        available = self.budget - (self.count_tokens(summary) if summary else 0)
+        # Once the budget overflows, keep only what fits in half of it and fold the rest
+        keep = available // 2
+        window, used, kept, overflowed = [], 0, 0, False
+        for message in self.storage.iter_messages(user_id, after_id=through_id, newest_first=True, batch_size=50):
+            used += self.count_tokens(message.content)
+            if used > available:
+                overflowed = True
+                break
+            window.append(message)
+            if used <= keep:
+                kept = len(window)
+        if overflowed:
+            # Fold whole turns, so the kept window never opens with a reply to a folded question
+            if kept and window[kept - 1].role == 'assistant':
+                kept -= 1
+            fold_through = window[kept - 1].id - 1 if kept else (window[0] if window else message).id
+            window = window[:kept]
+            older = self.storage.iter_messages(user_id, after_id=through_id, through_id=fold_through)
+            summary = self.summarize(summary, older, self.summary_budget, self.encoding)
+            self.storage.set_chat_summary(user_id, fold_through, summary)
+        messages = [{'role': row.role, 'content': row.content} for row in reversed(window)]
+        if summary:
+            messages.insert(0, {'role': "system", 'content': f"Summary of the earlier conversation:\n{summary}"})
+        return messages
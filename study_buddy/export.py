@@ -0,0 +1,292 @@
+"""Streaming export and import of a student's learning data.
+
+An export is a sequence of flat records: a header, then the profile,
+goals, study sessions, quiz attempts and chat messages, then the quiz items
+generated for the student and their spaced-repetition schedule and answer
+log. Each record has a ``type`` field. Schedule and answer records name
+their item by question rather than by id, since ids differ between
+databases. Records are read from storage in batches and written to a
+temporary file as they go, so memory stays flat however long the history
+is. Two formats are supported:
+
+- ``ndjson``: one JSON object per line, optionally gzip-compressed.
+- ``parquet``: one columnar table with a column per field, null where a
+  record type has no such field. It is written in row groups and
+  compressed with zstd.
+
+Import reads either format back record by record, so a profile can be
+restored from a file of any size.
+"""
+
+import gzip
+import json
+import os
+import pickle
+import sqlite3
+import tempfile
+import time
+import zlib
+
+import pyarrow as pa
+
+from study_buddy.lazy import lazy_import
+from study_buddy.records import ChatMessage, QuizAttempt, StudySession
+from study_buddy.storage import WriteBatch
+
+pq = lazy_import("pyarrow.parquet")
+
+# Version 2 added quiz items, review states and reviews; version 1 files still import
+FORMAT_VERSION = 2
+EXPORT_FORMATS = ("ndjson", "parquet")
+RECORD_BATCH_SIZE = 5000
+
+# Every field a record can carry, with its Parquet column type
+FIELDS = {
+    'type': pa.string(),
+    'format_version': pa.int32(),
+    'exported_at': pa.float64(),
+    'name': pa.string(),
+    'subject': pa.string(),
+    'learning_style': pa.string(),
+    'text': pa.string(),
+    'topic': pa.string(),
+    'duration': pa.int64(),
+    'started_at': pa.float64(),
+    'score': pa.float64(),
+    'taken_at': pa.float64(),
+    'role': pa.string(),
+    'content': pa.string(),
+    'created_at': pa.float64(),
+    'question': pa.string(),
+    'choices': pa.list_(pa.string()),
+    'answer': pa.int32(),
+    'own': pa.bool_(),
+    'due_at': pa.int64(),
+    'interval_days': pa.int32(),
+    'ease_permille': pa.int32(),
+    'reps': pa.int32(),
+    'lapses': pa.int32(),
+    'grade': pa.int32(),
+    'reviewed_at': pa.float64(),
+}
+PARQUET_SCHEMA = pa.schema(list(FIELDS.items()))
+
+# Fields each record type must have, checked as the file is parsed
+REQUIRED_FIELDS = {
+    "goal": ("text",),
+    StudySession.kind: ("topic", "duration", "started_at"),
+    QuizAttempt.kind: ("score", "taken_at"),
+    ChatMessage.kind: ("role", "content", "created_at"),
+    "quiz_item": ("subject", "topic", "question", "choices", "answer"),
+    "review_state": ("question", "own", "due_at", "interval_days", "ease_permille", "reps", "lapses"),
+    "review": ("question", "own", "grade", "reviewed_at"),
+}
+
+
+def _python_types(arrow_type):
+    if pa.types.is_string(arrow_type):
+        return str
+    if pa.types.is_boolean(arrow_type):
+        return bool
+    if pa.types.is_list(arrow_type):
+        return list
+    # JSON has one number type, so 30.0 is a fine duration
+    return (int, float)
+
+
+FIELD_TYPES = {name: _python_types(arrow_type) for name, arrow_type in FIELDS.items()}
+
+# Shared, since json.dumps with non-default options builds a new encoder per call
+_JSON_ENCODER = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False)
+_GZIP_MAGIC = b"\x1f\x8b"
+_PARQUET_MAGIC = b"PAR1"
+
+
+def iter_records(storage, user_id, user_data):
+    """Every record of a student's data, in export order"""
+    yield {'type': "header", 'format_version': FORMAT_VERSION, 'exported_at': time.time()}
+    yield {
+        'type': "profile",
+        'name': user_data['name'],
+        'subject': user_data['subject'],
+        'learning_style': user_data['learning_style'],
+    }
+    for goal in storage.list_goals(user_id):
+        yield {'type': "goal", 'text': goal['text']}
+    for session in storage.iter_sessions(user_id):
+        yield session.to_export()
+    for attempt in storage.iter_quiz_attempts(user_id):
+        yield attempt.to_export()
+    for message in storage.iter_messages(user_id):
+        yield message.to_export()
+    for subject, topic, question, choices, answer in storage.iter_own_quiz_items(user_id):
+        yield {
+            'type': "quiz_item", 'subject': subject, 'topic': topic,
+            'question': question, 'choices': choices, 'answer': answer,
+        }
+    for question, own, due_at, interval_days, ease_permille, reps, lapses in storage.iter_review_states(user_id):
+        yield {
+            'type': "review_state", 'question': question, 'own': bool(own), 'due_at': due_at,
+            'interval_days': interval_days, 'ease_permille': ease_permille, 'reps': reps, 'lapses': lapses,
+        }
+    for question, own, grade, reviewed_at in storage.iter_item_reviews(user_id):
+        yield {'type': "review", 'question': question, 'own': bool(own), 'grade': grade, 'reviewed_at': reviewed_at}
+
+
+def _batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def write_ndjson(records, fileobj, batch_size=RECORD_BATCH_SIZE):
+    """Write records as newline-delimited JSON to a binary file object"""
+    for batch in _batches(records, batch_size):
+        fileobj.write("".join(_JSON_ENCODER.encode(record) + "\n" for record in batch).encode())
+
+
+def write_parquet(records, fileobj, batch_size=RECORD_BATCH_SIZE):
+    """Write records to one Parquet table, a row group per batch"""
+    with pq.ParquetWriter(fileobj, PARQUET_SCHEMA, compression="zstd") as writer:
+        for batch in _batches(records, batch_size):
+            columns = {name: [record.get(name) for record in batch] for name in FIELDS}
+            writer.write_table(pa.table(columns, schema=PARQUET_SCHEMA))
+
+
+def export_extension(fmt, compress):
+    return ".parquet" if fmt == "parquet" else ".ndjson.gz" if compress else ".ndjson"
+
+
+def export_file(storage, user_id, user_data, fmt="ndjson", compress=True, directory=None):
+    """Write a student's export to a temporary file and return its path; the caller deletes it"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format {fmt!r}, expected one of {EXPORT_FORMATS}")
+    fd, path = tempfile.mkstemp(prefix="learning_data_", suffix=export_extension(fmt, compress), dir=directory)
+    records = iter_records(storage, user_id, user_data)
+    try:
+        with os.fdopen(fd, "wb") as raw:
+            if fmt == "parquet":
+                write_parquet(records, raw)
+            elif compress:
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as out:
+                    write_ndjson(records, out)
+            else:
+                write_ndjson(records, raw)
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def read_records(fileobj, batch_size=RECORD_BATCH_SIZE):
+    """Records from an export file object in any supported format, read incrementally"""
+    magic = fileobj.read(4)
+    fileobj.seek(0)
+    if magic == _PARQUET_MAGIC:
+        for batch in pq.ParquetFile(fileobj).iter_batches(batch_size=batch_size):
+            # Column lists zipped into rows are much faster than RecordBatch.to_pylist(),
+            # and most columns belong to other record types, so all-null ones are left out
+            columns = {
+                name: column.to_pylist()
+                for name, column in zip(batch.schema.names, batch.columns)
+                if column.null_count < batch.num_rows
+            }
+            for row in zip(*columns.values()):
+                yield {name: value for name, value in zip(columns, row) if value is not None}
+        return
+    stream = gzip.GzipFile(fileobj=fileobj, mode="rb") if magic[:2] == _GZIP_MAGIC else fileobj
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def check_record(record):
+    """Raise ValueError unless a record has every field its type needs, each of the right type"""
+    kind = record.get('type')
+    for name in REQUIRED_FIELDS.get(kind, ()):
+        if record.get(name) is None:
+            raise ValueError(f"a {kind} record is missing its {name!r} field")
+    for name, value in record.items():
+        expected = FIELD_TYPES.get(name)
+        if value is not None and expected is not None and not isinstance(value, expected):
+            raise ValueError(f"a {kind} record has a {type(value).__name__} for its {name!r} field")
+
+
+def import_records(storage, user_id, records, aggregates=None, batch_size=1000):
+    """Replace a student's data with exported records, in one transaction.
+
+    The whole file is parsed and checked first, into batches of rows
+    spooled to a temporary file, so memory stays flat and the write
+    transaction, which holds up every other session's writes, lasts only
+    as long as the inserts. A malformed file raises ``ValueError`` and
+    leaves the student's data untouched. Returns the number of records
+    imported per type. ``aggregates``, if given, is rebuilt afterwards.
+    """
+    counts = {}
+
+    def parse_batches():
+        header = next(records, None)
+        if not header or header.get('type') != "header":
+            raise ValueError("not a learning data export: missing header record")
+        if header.get('format_version', 0) > FORMAT_VERSION:
+            raise ValueError(f"export format version {header['format_version']} is newer than this app supports")
+        for batch in _batches(records, batch_size):
+            writes = WriteBatch()
+            for record in batch:
+                check_record(record)
+                kind = record.get('type')
+                if kind == "profile":
+                    writes.update_profile(user_id, record.get('subject', ""), record.get('learning_style', ""))
+                elif kind == "goal":
+                    writes.add_goal(user_id, record['text'])
+                elif kind == StudySession.kind:
+                    writes.add_session(user_id, *StudySession.from_export(record))
+                elif kind == QuizAttempt.kind:
+                    attempt = QuizAttempt.from_export(record)
+                    writes.add_quiz_attempt(user_id, attempt.score, attempt.topic, attempt.taken_at)
+                elif kind == ChatMessage.kind:
+                    message = ChatMessage.from_export(record)
+                    writes.add_message(user_id, message.role, message.content, message.created_at)
+                elif kind == "quiz_item":
+                    writes.add_quiz_item(
+                        user_id, record['subject'], record['topic'], record['question'],
+                        list(record['choices']), record['answer'],
+                    )
+                elif kind == "review_state":
+                    writes.add_review_state(user_id, record['question'], record['own'], (
+                        record['due_at'], record['interval_days'], record['ease_permille'],
+                        record['reps'], record['lapses'],
+                    ))
+                elif kind == "review":
+                    writes.add_item_review(user_id, record['question'], record['own'], record['grade'], record['reviewed_at'])
+                else:
+                    continue
+                counts[kind] = counts.get(kind, 0) + 1
+            yield writes
+
+    records = iter(records)
+    try:
+        with tempfile.TemporaryFile() as spool:
+            staged = 0
+            for writes in parse_batches():
+                pickle.dump(writes, spool, pickle.HIGHEST_PROTOCOL)
+                staged += 1
+            spool.seek(0)
+            storage.replace_user(user_id, (pickle.load(spool) for _ in range(staged)))
+    except sqlite3.IntegrityError as e:
+        raise ValueError(f"a record does not fit the database: {e}") from e
+    except KeyError as e:
+        raise ValueError(f"a record is missing its {e.args[0]!r} field") from e
+    except (AttributeError, TypeError) as e:
+        raise ValueError(f"a record is malformed: {e}") from e
+    except (OSError, EOFError, zlib.error) as e:
+        # Corrupt or truncated gzip and Parquet data
+        raise ValueError(f"the file is damaged: {e}") from e
+    if aggregates is not None:
+        aggregates.sync(storage, user_id)
+    return counts
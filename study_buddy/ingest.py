@@ -0,0 +1,133 @@
+"""Streaming ingestion of uploaded study materials.
+
+Uploads are read page by page and split into token-bounded chunks as they
+go, so only the current page and the chunk being built are held in memory.
+"""
+
+import codecs
+import io
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+from study_buddy.lazy import lazy_import
+
+PyPDF2 = lazy_import("PyPDF2")
+tiktoken = lazy_import("tiktoken")
+
+DEFAULT_ENCODING = "cl100k_base"
+DEFAULT_CHUNK_TOKENS = 512
+DEFAULT_OVERLAP_TOKENS = 32
+TEXT_PAGE_BYTES = 64 * 1024
+
+
+class Page(NamedTuple):
+    number: int
+    total: Optional[int]
+    text: str
+
+
+class Chunk(NamedTuple):
+    index: int
+    page: int
+    text: str
+    n_tokens: int
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name=DEFAULT_ENCODING):
+    """Load a tiktoken encoding once per process"""
+    return tiktoken.get_encoding(name)
+
+
+def iter_pages(stream, filename):
+    """Yield the pages of an uploaded file, one at a time"""
+    if filename.lower().endswith(".pdf"):
+        yield from _iter_pdf_pages(stream)
+    else:
+        yield from _iter_text_pages(stream)
+
+
+def _iter_pdf_pages(stream):
+    reader = PyPDF2.PdfReader(stream)
+    total = len(reader.pages)
+    for number in range(1, total + 1):
+        text = reader.pages[number - 1].extract_text() or ""
+        # PyPDF2 keeps every object it has parsed, including decoded content
+        # streams. Dropping the cache after each page keeps memory flat.
+        reader.resolved_objects.clear()
+        yield Page(number, total, text)
+
+
+def _iter_text_pages(stream):
+    # Plain text has no pages, so fixed-size blocks cut on line breaks stand in
+    size = _stream_size(stream)
+    total = max(1, -(-size // TEXT_PAGE_BYTES)) if size is not None else None
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    number = 0
+    while True:
+        block = stream.read(TEXT_PAGE_BYTES)
+        pending += decoder.decode(block, final=not block)
+        if not block:
+            break
+        cut = pending.rfind("\n")
+        if cut == -1:
+            continue
+        number += 1
+        yield Page(number, total and max(total, number), pending[:cut + 1])
+        pending = pending[cut + 1:]
+    if pending or number == 0:
+        number += 1
+        yield Page(number, total and max(total, number), pending)
+
+
+def _stream_size(stream):
+    size = getattr(stream, "size", None)
+    if size is not None:
+        return size
+    try:
+        position = stream.tell()
+        size = stream.seek(0, io.SEEK_END) - position
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def iter_chunks(pages, max_tokens=DEFAULT_CHUNK_TOKENS, overlap=DEFAULT_OVERLAP_TOKENS, encoding=None):
+    """Split a stream of pages into chunks of at most max_tokens tokens"""
+    if not 0 <= overlap < max_tokens:
+        raise ValueError("overlap must be smaller than max_tokens")
+    encoding = encoding or get_encoding()
+    step = max_tokens - overlap
+    buffer = []
+    carried = 0  # leading tokens of buffer already emitted as overlap
+    start_page = None
+    index = 0
+    for page in pages:
+        if not buffer:
+            start_page = page.number
+        buffer.extend(encoding.encode(page.text, disallowed_special=()))
+        while len(buffer) >= max_tokens:
+            window = buffer[:max_tokens]
+            yield Chunk(index, start_page, encoding.decode(window), len(window))
+            index += 1
+            del buffer[:step]
+            carried = overlap
+            start_page = page.number
+    if len(buffer) > carried:
+        yield Chunk(index, start_page, encoding.decode(buffer), len(buffer))
+
+
+def ingest(stream, filename, on_page=None, max_tokens=DEFAULT_CHUNK_TOKENS, overlap=DEFAULT_OVERLAP_TOKENS):
+    """Stream an upload into chunks, calling on_page(page) as each page is read"""
+    pages = iter_pages(stream, filename)
+    if on_page is not None:
+        pages = _report(pages, on_page)
+    return iter_chunks(pages, max_tokens=max_tokens, overlap=overlap)
+
+
+def _report(pages, on_page):
+    for page in pages:
+        on_page(page)
+        yield page
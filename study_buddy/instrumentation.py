@@ -0,0 +1,258 @@
+"""Hot-path instrumentation for the Streamlit app.
+
+``measure(name)`` and ``@timed(name)`` record wall-clock milliseconds in
+the process-wide ``METRICS`` registry, which every session shares. If
+tracemalloc is tracing, they also record the net bytes each section
+allocated. ``METRICS.summary()`` gives per-section count and p50/p95/max
+latency. Samples can also be appended to a JSON-lines file with
+``JsonlSink`` for analysis across processes:
+
+    python -m study_buddy.instrumentation data/metrics.jsonl
+
+``profile_rerun`` wraps one script run in cProfile and/or tracemalloc for
+the developer panel.
+"""
+
+import cProfile
+import io
+import json
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from functools import wraps
+
+SAMPLES_PER_SECTION = 2048
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class JsonlSink:
+    """Appends samples to a JSON-lines file, buffered and written in batches"""
+
+    def __init__(self, path, flush_every=100):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer = []
+        self._lock = threading.Lock()
+
+    def write(self, sample):
+        with self._lock:
+            self._buffer.append(json.dumps(sample, separators=(",", ":")) + "\n")
+            if len(self._buffer) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if self._buffer:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(self._buffer)
+            self._buffer.clear()
+
+
+class MetricsRegistry:
+    """Recent latency and allocation samples per named section, shared by all sessions"""
+
+    def __init__(self, maxlen=SAMPLES_PER_SECTION):
+        self.maxlen = maxlen
+        self.sinks = []
+        self._latencies = defaultdict(lambda: deque(maxlen=self.maxlen))
+        self._allocations = defaultdict(lambda: deque(maxlen=self.maxlen))
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+
+    def record(self, name, ms, alloc_bytes=None):
+        with self._lock:
+            self._latencies[name].append(ms)
+            self._counts[name] += 1
+            if alloc_bytes is not None:
+                self._allocations[name].append(alloc_bytes)
+        if self.sinks:
+            sample = {'ts': time.time(), 'section': name, 'ms': round(ms, 3)}
+            if alloc_bytes is not None:
+                sample['alloc_bytes'] = alloc_bytes
+            for sink in self.sinks:
+                sink.write(sample)
+
+    def summary(self):
+        """Per-section count, latency percentiles in ms and mean net allocation in KB, by section name"""
+        with self._lock:
+            latencies = {name: sorted(samples) for name, samples in self._latencies.items()}
+            allocations = {name: list(samples) for name, samples in self._allocations.items()}
+            counts = dict(self._counts)
+        rows = {}
+        for name, values in sorted(latencies.items()):
+            allocated = allocations.get(name)
+            rows[name] = {
+                'count': counts[name],
+                'p50_ms': percentile(values, 0.5),
+                'p95_ms': percentile(values, 0.95),
+                'max_ms': values[-1],
+                'alloc_kb': sum(allocated) / len(allocated) / 1024 if allocated else None,
+            }
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._latencies.clear()
+            self._allocations.clear()
+            self._counts.clear()
+
+
+METRICS = MetricsRegistry()
+
+
+@contextmanager
+def measure(name, registry=None):
+    """Record the wall time, and net traced allocation if tracemalloc is on, of a block"""
+    tracing = tracemalloc.is_tracing()
+    allocated_before = tracemalloc.get_traced_memory()[0] if tracing else None
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        alloc_bytes = tracemalloc.get_traced_memory()[0] - allocated_before if tracing else None
+        (registry or METRICS).record(name, ms, alloc_bytes)
+
+
+def timed(name):
+    """Decorator form of ``measure``"""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with measure(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class RerunTimer:
+    """Milliseconds spent in each named section of a rerun, also recorded as ``rerun/<name>`` metrics"""
+
+    def __init__(self, clock=time.perf_counter, registry=None):
+        self.clock = clock
+        self.registry = registry or METRICS
+        self.started = clock()
+        self.sections = {}
+
+    @contextmanager
+    def section(self, name):
+        started = self.clock()
+        try:
+            with measure(f"rerun/{name}", self.registry):
+                yield
+        finally:
+            self.sections[name] = self.sections.get(name, 0.0) + (self.clock() - started) * 1000
+
+    @property
+    def total_ms(self):
+        return (self.clock() - self.started) * 1000
+
+
+class RerunProfile:
+    """cProfile statistics and top allocation sites captured over one rerun"""
+
+    def __init__(self):
+        self.profile_text = None
+        self.allocations = None
+
+    def _capture_profile(self, profiler, top):
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(top)
+        self.profile_text = out.getvalue()
+
+    def _capture_allocations(self, snapshot, top):
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        self.allocations = [
+            {'location': str(stat.traceback[0]), 'size_kb': stat.size / 1024, 'count': stat.count}
+            for stat in snapshot.statistics("lineno")[:top]
+        ]
+
+
+# tracemalloc is process-wide, but sessions profile their reruns independently: it is
+# started for the first rerun that wants it and stopped when the last one finishes
+_tracing_lock = threading.Lock()
+_tracing_reruns = 0
+_started_tracing = False
+
+
+def _start_tracing():
+    global _tracing_reruns, _started_tracing
+    with _tracing_lock:
+        # Don't stop tracing that someone else started
+        if _tracing_reruns == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_reruns += 1
+
+
+def _stop_tracing():
+    """Snapshot of the allocations traced so far, then stop tracing if no other rerun needs it"""
+    global _tracing_reruns, _started_tracing
+    with _tracing_lock:
+        snapshot = tracemalloc.take_snapshot()
+        _tracing_reruns -= 1
+        if _tracing_reruns == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+    return snapshot
+
+
+@contextmanager
+def profile_rerun(cprofile=False, trace_allocations=False, top=25):
+    """Capture cProfile stats and/or tracemalloc allocation sites for the enclosed block"""
+    profile = RerunProfile()
+    profiler = cProfile.Profile() if cprofile else None
+    if trace_allocations:
+        _start_tracing()
+    if profiler:
+        profiler.enable()
+    try:
+        yield profile
+    finally:
+        if profiler:
+            profiler.disable()
+            profile._capture_profile(profiler, top)
+        if trace_allocations:
+            profile._capture_allocations(_stop_tracing(), top)
+
+
+def summarize_jsonl(path):
+    """Load a JsonlSink file into a fresh registry and return its summary"""
+    registry = MetricsRegistry(maxlen=None)
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                sample = json.loads(line)
+                registry.record(sample['section'], sample['ms'], sample.get('alloc_bytes'))
+    return registry.summary()
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m study_buddy.instrumentation METRICS.jsonl")
+    print(f"{'section':<40} | {'count':>7} | {'p50 ms':>8} | {'p95 ms':>8} | {'max ms':>8}")
+    for name, row in summarize_jsonl(sys.argv[1]).items():
+        print(f"{name:<40} | {row['count']:>7} | {row['p50_ms']:>8.2f} | {row['p95_ms']:>8.2f} | {row['max_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Precompiled intent routing and response templates for the AI tutor.
+
+Keyword tables and responses are compiled once at import time, so a
+request only pays for one keyword scan and one dict lookup.
+"""
+
+from functools import lru_cache
+
+SUBJECTS = ["Mathematics", "Science", "English", "History", "Computer Science", "Other"]
+LEARNING_STYLES = ["Visual", "Auditory", "Kinesthetic", "Reading/Writing"]
+
+EXPLAIN = "explain"
+QUIZ = "quiz"
+PLAN = "plan"
+HELP = "help"
+GENERAL = "general"
+
+# Intents in priority order: when a message matches several, the first wins
+INTENT_KEYWORDS = [
+    (EXPLAIN, ["explain", "concept"]),
+    (QUIZ, ["quiz", "question"]),
+    (PLAN, ["study plan", "plan"]),
+    (HELP, ["help", "stuck"]),
+]
+
+# Flattened once into (keyword, intent) pairs. Phrases already covered by a
+# shorter keyword of the same intent ("study plan" vs "plan") are dropped.
+# CPython's substring search beats a regex alternation for a table this
+# small, so this is the compiled form.
+_KEYWORD_TABLE = tuple(
+    (keyword, intent)
+    for intent, keywords in INTENT_KEYWORDS
+    for keyword in keywords
+    if not any(other != keyword and other in keyword for other in keywords)
+)
+
+
+@lru_cache(maxsize=4096)
+def classify(message):
+    """Return the intent of a single message"""
+    text = message.lower()
+    for keyword, intent in _KEYWORD_TABLE:
+        if keyword in text:
+            return intent
+    return GENERAL
+
+
+def classify_batch(messages):
+    """Return the intent of every message in one call"""
+    return [classify(message) for message in messages]
+
+
+def _render(intent, subject, learning_style):
+    """Build the response text for an (intent, subject, learning_style) triple"""
+    if intent == EXPLAIN:
+        if subject == "Mathematics":
+            if learning_style == "Visual":
+                return "Let me explain this mathematical concept visually! 🎨\n\n**Algebraic Equations**\n\nThink of an equation like a balanced scale. When you have 2x + 5 = 13, imagine:\n\n⚖️ Left side: 2x + 5\n⚖️ Right side: 13\n\nTo solve, you need to keep the scale balanced:\n1. Subtract 5 from both sides: 2x = 8\n2. Divide both sides by 2: x = 4\n\nVisual tip: Draw the scale and show how each operation maintains balance!"
+            return "Let me explain this mathematical concept! 📐\n\n**Algebraic Equations**\n\nAn equation is like a puzzle where you need to find the value of x.\n\nExample: 2x + 5 = 13\n\nStep 1: Isolate the variable (x)\n- Subtract 5 from both sides: 2x = 8\n\nStep 2: Solve for x\n- Divide both sides by 2: x = 4\n\n**Key Principle:** Whatever you do to one side, you must do to the other to keep the equation balanced!"
+        if subject == "Science":
+            return "Let me explain this science concept! 🔬\n\n**The Scientific Method**\n\n1. **Observation** - Notice something interesting\n2. **Question** - Ask 'why' or 'how'\n3. **Hypothesis** - Make an educated guess\n4. **Experiment** - Test your hypothesis\n5. **Analysis** - Look at the results\n6. **Conclusion** - Decide if your hypothesis was correct\n\n**Example:** Why do plants grow toward light?\n- Hypothesis: Plants need light for photosynthesis\n- Test: Grow plants with and without light\n- Result: Plants with light grow better\n- Conclusion: Light is essential for plant growth!"
+        return "I'd be happy to explain any concept! 📚\n\nTo give you the best explanation, could you tell me:\n1. What specific topic you'd like to learn about?\n2. What's your current understanding level?\n3. Do you prefer examples, definitions, or step-by-step explanations?\n\nI'll tailor my explanation to your learning style and make it engaging!"
+
+    if intent == QUIZ:
+        if subject == "Mathematics":
+            return "Here's a math quiz question for you! 🧮\n\n**Question:** If a rectangle has a length of 8 units and a width of 6 units, what is its area?\n\n**Options:**\nA) 14 square units\nB) 28 square units\nC) 48 square units\nD) 56 square units\n\n**Hint:** Remember, area of a rectangle = length × width\n\nTake your time to think about it!"
+        if subject == "Science":
+            return "Here's a science quiz question! 🔬\n\n**Question:** Which of the following is NOT a state of matter?\n\n**Options:**\nA) Solid\nB) Liquid\nC) Gas\nD) Energy\n\n**Hint:** Think about the three main states of matter and what energy is.\n\nWhat do you think the answer is?"
+        return "Here's a general knowledge question! 🎯\n\n**Question:** What is the capital of France?\n\n**Options:**\nA) London\nB) Paris\nC) Berlin\nD) Madrid\n\nThis is a great way to test your knowledge!"
+
+    if intent == PLAN:
+        return f"Here's your personalized study plan! 📋\n\n**Subject:** {subject}\n**Learning Style:** {learning_style}\n\n**Weekly Study Plan:**\n\n**Monday & Wednesday:**\n- 30 minutes: Review previous concepts\n- 45 minutes: Learn new material\n- 15 minutes: Practice problems\n\n**Tuesday & Thursday:**\n- 30 minutes: Interactive exercises\n- 30 minutes: Quiz practice\n- 15 minutes: Note-taking\n\n**Friday:**\n- 60 minutes: Comprehensive review\n- 30 minutes: Self-assessment\n\n**Weekend:**\n- 30 minutes: Relaxed review\n- 15 minutes: Plan next week\n\n**Tips for your {learning_style} learning style:**\n- Take regular breaks\n- Use active learning techniques\n- Review material within 24 hours\n- Practice regularly\n\nWould you like me to adjust this plan based on your specific goals?"
+
+    if intent == HELP:
+        return "I'm here to help! 🤝\n\n**How I can assist you:**\n\n📚 **Learning Support:**\n- Explain difficult concepts\n- Provide step-by-step solutions\n- Give examples and analogies\n\n🎯 **Study Guidance:**\n- Create personalized study plans\n- Suggest learning strategies\n- Track your progress\n\n❓ **Practice:**\n- Generate quiz questions\n- Provide practice problems\n- Give feedback on answers\n\n📊 **Progress Tracking:**\n- Monitor your study sessions\n- Analyze your performance\n- Suggest improvements\n\n**Just ask me anything!** What would you like help with today?"
+
+    return "I'm your AI learning assistant! 🤖\n\nI can help you with:\n\n📚 **Learning:** Explain concepts, provide examples, answer questions\n🎯 **Planning:** Create study plans, set goals, track progress\n❓ **Practice:** Generate quizzes, provide exercises, give feedback\n📊 **Analysis:** Review your performance, suggest improvements\n\nWhat would you like to work on today? Feel free to ask me anything about your studies!"
+
+
+# (subject, learning_style, intent) -> response, built once at import
+RESPONSES = {
+    (subject, learning_style, intent): _render(intent, subject, learning_style)
+    for subject in SUBJECTS
+    for learning_style in LEARNING_STYLES
+    for intent in [*(intent for intent, _ in INTENT_KEYWORDS), GENERAL]
+}
+
+
+def response_for(intent, subject, learning_style):
+    """Look up the prebuilt response, rendering on the fly for unknown profiles"""
+    response = RESPONSES.get((subject, learning_style, intent))
+    if response is None:
+        response = _render(intent, subject, learning_style)
+    return response
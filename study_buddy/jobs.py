@@ -0,0 +1,372 @@
+"""Background jobs for CPU-heavy work, in a SQLite queue shared by every server process.
+
+Streamlit runs every session's script in threads of one process, so a
+large PDF being parsed and embedded slows down everyone's reruns on that
+server. In worker mode the app submits such work as a job instead. Worker
+processes claim jobs from the ``jobs`` table, run them and store the
+result, and the page reads the job's status on each rerun without waiting
+for it.
+
+No broker is needed: the queue is a WAL-mode SQLite file that several app
+replicas and worker processes on one machine can share. A worker claims a
+job with one ``UPDATE ... RETURNING`` statement, so two workers never get
+the same job. A claim is a lease. A job whose worker died is claimed
+again once its lease runs out, at most ``MAX_ATTEMPTS`` times. Files a
+job's payload refers to are removed by its kind's cleanup only once the
+job is done or has failed for good, so a retry still finds them, and
+``sweep_uploads`` removes spooled uploads whose job will never run.
+
+Run workers next to the app with ``STUDY_BUDDY_WORKERS=<n>``, or as their
+own service for several replicas:
+
+    python -m study_buddy.jobs --workers 4
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from typing import NamedTuple
+
+from study_buddy.config import data_dir
+
+LEASE_SECONDS = 300.0
+MAX_ATTEMPTS = 3
+IDLE_POLL_SECONDS = 0.2
+PROGRESS_INTERVAL_SECONDS = 0.5
+# Jobs still queued this long are failed, and their spooled uploads deleted
+UNCLAIMED_MAX_AGE_SECONDS = 24 * 3600
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class Job(NamedTuple):
+    id: int
+    kind: str
+    status: str
+    progress: float
+    result: object
+    error: str
+    attempts: int
+
+
+class JobQueue:
+    """Durable job queue in one SQLite file, safe to share between processes"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        progress REAL NOT NULL DEFAULT 0,
+        result TEXT,
+        error TEXT NOT NULL DEFAULT '',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        worker TEXT NOT NULL DEFAULT '',
+        lease_until REAL NOT NULL DEFAULT 0,
+        created_at REAL NOT NULL,
+        finished_at REAL
+    );
+    CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+    """
+
+    def __init__(self, path, lease_seconds=LEASE_SECONDS):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def submit(self, kind, payload):
+        """Queue a job and return its id"""
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO jobs (kind, payload, created_at) VALUES (?, ?, ?) RETURNING id",
+                (kind, json.dumps(payload), time.time()),
+            ).fetchone()[0]
+
+    def get(self, job_id):
+        """The job's current state, or None if there is no such job"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, progress, result, error, attempts FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return Job(*row[:4], json.loads(row[4]) if row[4] is not None else None, *row[5:])
+
+    def claim(self, worker):
+        """Lease the oldest runnable job to worker; returns (id, kind, payload) or None"""
+        now = time.time()
+        with self._lock:
+            # Jobs whose worker stopped renewing its lease are retried, up to MAX_ATTEMPTS
+            row = self._conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' "
+                "OR (status = 'running' AND lease_until < ? AND attempts < ?) "
+                "ORDER BY id LIMIT 1) RETURNING id, kind, payload",
+                (worker, now + self.lease_seconds, now, MAX_ATTEMPTS),
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def report_progress(self, job_id, worker, progress):
+        """Store progress from 0 to 1 and renew the lease; False if the job is no longer this worker's"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET progress = ?, lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (min(max(progress, 0.0), 1.0), time.time() + self.lease_seconds, job_id, worker),
+            ).rowcount == 1
+
+    def complete(self, job_id, worker, result):
+        return self._finish(job_id, worker, DONE, result=json.dumps(result))
+
+    def fail(self, job_id, worker, error):
+        return self._finish(job_id, worker, FAILED, error=error)
+
+    def _finish(self, job_id, worker, status, result=None, error=""):
+        """Record the outcome; False if the job was no longer this worker's, e.g. its lease ran out"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE jobs SET status = ?, progress = 1, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (status, result, error, time.time(), job_id, worker),
+            ).rowcount == 1
+
+    def fail_abandoned(self):
+        """Fail jobs whose worker stopped responding on their last attempt; returns their (kind, payload)"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'worker stopped responding', finished_at = ? "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ? RETURNING kind, payload",
+                (now, now, MAX_ATTEMPTS),
+            ).fetchall()
+        return [(kind, json.loads(payload)) for kind, payload in rows]
+
+    def fail_unclaimed(self, older_than):
+        """Fail jobs no worker claimed within older_than seconds; returns their (kind, payload)"""
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = 'no worker claimed the job', finished_at = ? "
+                "WHERE status = 'queued' AND created_at < ? RETURNING kind, payload",
+                (now, now - older_than),
+            ).fetchall()
+        return [(kind, json.loads(payload)) for kind, payload in rows]
+
+    def pending_payloads(self):
+        """(kind, payload) of every job that may still run"""
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, payload FROM jobs WHERE status IN ('queued', 'running')").fetchall()
+        return [(kind, json.loads(payload)) for kind, payload in rows]
+
+    def counts(self):
+        """Number of jobs in each status"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def prune(self, older_than):
+        """Delete finished jobs older than older_than seconds; returns how many"""
+        with self._lock:
+            return self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (time.time() - older_than,)
+            ).rowcount
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Handlers run in worker processes: handler(payload, progress) -> JSON-serialisable result,
+# where progress(fraction) reports how far along the job is. Cleanups run with the payload
+# once a job of their kind is done or has failed for good
+
+_artifact_stores = {}
+
+
+def process_upload(payload, progress):
+    """Extract, chunk and embed a spooled upload into the shared artifact store"""
+    from study_buddy.artifacts import ArtifactStore
+    from study_buddy.vector_store import HashingEmbedder
+
+    key = (payload['artifacts'], payload['max_bytes'])
+    store = _artifact_stores.get(key)
+    if store is None:
+        store = _artifact_stores[key] = ArtifactStore(*key)
+
+    def report_page(page):
+        if page.total:
+            progress(page.number / page.total)
+
+    # The spooled file stays until the job is finished for good, so a retry can read it again
+    with open(payload['path'], "rb") as f:
+        artifact = store.process(f, payload['filename'], HashingEmbedder(payload['dim']), on_page=report_page)
+    return {'digest': artifact.digest, 'chunks': artifact.meta['chunks']}
+
+
+def discard_upload(payload):
+    """Delete an upload spooled for a job that will not run again"""
+    try:
+        os.unlink(payload['path'])
+    except FileNotFoundError:
+        pass
+
+
+HANDLERS = {
+    'process_upload': process_upload,
+}
+
+CLEANUPS = {
+    'process_upload': discard_upload,
+}
+
+
+def run_cleanup(kind, payload, cleanups=None):
+    cleanup = (CLEANUPS if cleanups is None else cleanups).get(kind)
+    if cleanup is not None:
+        cleanup(payload)
+
+
+def sweep_uploads(job_queue, directory, max_age=UNCLAIMED_MAX_AGE_SECONDS):
+    """Fail jobs no worker claimed within max_age seconds, and delete spooled files older than that no job needs.
+
+    Run it from the app: when no worker is running, nothing else would.
+    Returns the number of files deleted.
+    """
+    for kind, payload in job_queue.fail_unclaimed(max_age):
+        run_cleanup(kind, payload)
+    needed = {payload.get('path') for _, payload in job_queue.pending_payloads()}
+    cutoff = time.time() - max_age
+    deleted = 0
+    if not os.path.isdir(directory):
+        return deleted
+    for entry in os.scandir(directory):
+        # Young files may belong to a job that is being submitted right now
+        if entry.is_file() and entry.path not in needed and entry.stat().st_mtime < cutoff:
+            try:
+                os.unlink(entry.path)
+                deleted += 1
+            except FileNotFoundError:
+                pass
+    return deleted
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def run_worker(queue_path, handlers=None, stop=None, idle_poll=IDLE_POLL_SECONDS, max_jobs=None, cleanups=None):
+    """Claim and run jobs until stop is set (or max_jobs have run); returns how many ran"""
+    handlers = handlers or HANDLERS
+    stop = stop or threading.Event()
+    job_queue = JobQueue(queue_path)
+    name = worker_name()
+    done = 0
+    try:
+        while not stop.is_set() and (max_jobs is None or done < max_jobs):
+            for kind, payload in job_queue.fail_abandoned():
+                run_cleanup(kind, payload, cleanups)
+            claimed = job_queue.claim(name)
+            if claimed is None:
+                stop.wait(idle_poll)
+                continue
+            job_id, kind, payload = claimed
+            reported_at = 0.0
+
+            def progress(fraction):
+                nonlocal reported_at
+                # Each report is a write, so throttle them
+                if time.monotonic() - reported_at >= PROGRESS_INTERVAL_SECONDS:
+                    job_queue.report_progress(job_id, name, fraction)
+                    reported_at = time.monotonic()
+
+            handler = handlers.get(kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"no handler for job kind {kind!r}")
+                result = handler(payload, progress)
+            except Exception as e:
+                traceback.print_exc()
+                finished = job_queue.fail(job_id, name, f"{type(e).__name__}: {e}")
+            else:
+                finished = job_queue.complete(job_id, name, result)
+            # Handler errors are not retried, so the job is over unless another worker took it over
+            if finished:
+                run_cleanup(kind, payload, cleanups)
+            done += 1
+    finally:
+        job_queue.close()
+    return done
+
+
+class WorkerPool:
+    """Worker processes serving one queue, started with spawn so they share no state with the app"""
+
+    def __init__(self, queue_path, processes, handlers=None):
+        self.queue_path = queue_path
+        self.processes = processes
+        self.handlers = handlers
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = self._context.Event()
+        self._workers = []
+
+    def start(self):
+        for _ in range(self.processes):
+            worker = self._context.Process(
+                target=run_worker, args=(self.queue_path, self.handlers, self._stop), daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        return self
+
+    def stop(self, timeout=10.0):
+        """Let running jobs finish, then stop every worker"""
+        self._stop.set()
+        for worker in self._workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = []
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def default_queue_path():
+    return data_dir("jobs.db")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers for the study buddy app")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--queue", default=None, help="queue database (default: jobs.db in the data directory)")
+    args = parser.parse_args()
+
+    pool = WorkerPool(args.queue or default_queue_path(), args.workers).start()
+    print(f"{args.workers} workers serving {pool.queue_path}; Ctrl+C to stop")
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopped.set())
+    try:
+        stopped.wait()
+    except KeyboardInterrupt:
+        pass
+    pool.stop()
+
+
+if __name__ == "__main__":
+    main()
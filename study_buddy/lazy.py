@@ -0,0 +1,29 @@
+"""Deferred imports for heavy optional modules.
+
+``faiss = lazy_import("faiss")`` binds a stand-in module. The real import
+runs the first time an attribute is used, so a session that never opens
+the Progress page, uploads a file or calls the chat API never pays for
+plotly.express, PyPDF2, tiktoken, faiss or httpx. Concurrent first uses
+are safe, because ``importlib`` serialises imports of the same module.
+"""
+
+import importlib
+import sys
+import types
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__name__)
+        # Later lookups go straight to the real module's attributes
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self.__name__!r}>"
+
+
+def lazy_import(name):
+    """The module called name if already imported, else a stand-in that imports it on first use"""
+    module = sys.modules.get(name)
+    return module if module is not None else _LazyModule(name)
@@ -0,0 +1,166 @@
+"""Spaced-repetition practice quizzes.
+
+Multiple-choice items live in a bank keyed by subject. Each student has an
+SM-2 review state per item (stored compactly in ``review_schedule``), and
+every answer is logged in ``item_reviews``. ``ReviewQueue`` keeps one
+student's due times for a subject in a min-heap. Finding the next due
+items costs O(k log n) and rescheduling an answered item costs O(log n),
+so a 50k-card deck never gets sorted or scanned.
+"""
+
+import heapq
+import threading
+import time
+from collections import namedtuple
+
+DAY_SECONDS = 86400
+NEW_EASE_PERMILLE = 2500
+MIN_EASE_PERMILLE = 1300
+PASSING_GRADE = 3
+# SM-2 grades for a multiple-choice answer: "correct with hesitation" and "wrong, but familiar"
+CORRECT_GRADE = 4
+WRONG_GRADE = 1
+
+ReviewState = namedtuple("ReviewState", "due_at interval_days ease_permille reps lapses")
+
+# Starter bank, added to the database on startup: (topic, question, choices, index of the answer)
+ITEM_BANK = {
+    "Mathematics": [
+        ("Fractions", "What is 1/2 + 1/4?", ["3/4", "2/6", "1/6", "1/8"], 0),
+        ("Algebra", "Solve for x: 2x + 6 = 14", ["3", "4", "7", "10"], 1),
+        ("Geometry", "What is the sum of the interior angles of a triangle?", ["90°", "180°", "270°", "360°"], 1),
+        ("Arithmetic", "What is 15% of 200?", ["15", "20", "30", "35"], 2),
+        ("Calculus", "What is the derivative of x²?", ["x", "2x", "x²/2", "2"], 1),
+        ("Number theory", "Which of these numbers is prime?", ["21", "27", "29", "33"], 2),
+    ],
+    "Science": [
+        ("Biology", "What is the powerhouse of the cell?", ["Nucleus", "Ribosome", "Mitochondrion", "Golgi apparatus"], 2),
+        ("Chemistry", "What is the chemical symbol for sodium?", ["S", "Na", "So", "Sd"], 1),
+        ("Physics", "What is the SI unit of force?", ["Joule", "Watt", "Pascal", "Newton"], 3),
+        ("Biology", "Which gas do plants absorb during photosynthesis?", ["Oxygen", "Carbon dioxide", "Nitrogen", "Hydrogen"], 1),
+        ("Chemistry", "What is the pH of pure water at 25 °C?", ["5", "7", "9", "14"], 1),
+        ("Astronomy", "Which planet is closest to the Sun?", ["Venus", "Earth", "Mercury", "Mars"], 2),
+    ],
+    "English": [
+        ("Grammar", "Which word is an adverb in 'She sings beautifully'?", ["She", "sings", "beautifully", "none"], 2),
+        ("Vocabulary", "What is a synonym of 'rapid'?", ["Slow", "Quick", "Calm", "Late"], 1),
+        ("Literature", "Who wrote 'Romeo and Juliet'?", ["Charles Dickens", "Jane Austen", "William Shakespeare", "Mark Twain"], 2),
+        ("Grammar", "Which sentence uses 'their' correctly?", ["Their going home.", "The book is over their.", "They lost their keys.", "Their is a cat."], 2),
+        ("Poetry", "How many lines does a sonnet have?", ["10", "12", "14", "16"], 2),
+    ],
+    "History": [
+        ("World War II", "In which year did World War II end?", ["1918", "1939", "1945", "1950"], 2),
+        ("Ancient history", "Which civilization built Machu Picchu?", ["Aztec", "Maya", "Inca", "Olmec"], 2),
+        ("US history", "Who was the first President of the United States?", ["Thomas Jefferson", "George Washington", "John Adams", "Abraham Lincoln"], 1),
+        ("Modern history", "In which year did the Berlin Wall fall?", ["1979", "1985", "1989", "1991"], 2),
+        ("Ancient history", "What was the capital of the Roman Empire's eastern half?", ["Athens", "Alexandria", "Constantinople", "Antioch"], 2),
+    ],
+    "Computer Science": [
+        ("Algorithms", "What is the worst-case time complexity of binary search?", ["O(1)", "O(log n)", "O(n)", "O(n log n)"], 1),
+        ("Data structures", "Which structure is first-in, first-out?", ["Stack", "Queue", "Heap", "Tree"], 1),
+        ("Python", "What does len([1, 2, 3]) return?", ["2", "3", "4", "An error"], 1),
+        ("Networking", "Which protocol secures web traffic?", ["FTP", "HTTP", "HTTPS", "SMTP"], 2),
+        ("Algorithms", "Which sort has O(n log n) worst-case time?", ["Bubble sort", "Quicksort", "Merge sort", "Insertion sort"], 2),
+    ],
+    "Other": [
+        ("Geography", "What is the capital of France?", ["London", "Paris", "Berlin", "Madrid"], 1),
+        ("Geography", "Which is the largest ocean?", ["Atlantic", "Indian", "Arctic", "Pacific"], 3),
+        ("Study skills", "Spacing reviews out over days instead of cramming is called...", ["Chunking", "Spaced repetition", "Interleaving", "Skimming"], 1),
+        ("Art", "Who painted the Mona Lisa?", ["Michelangelo", "Raphael", "Leonardo da Vinci", "Donatello"], 2),
+    ],
+}
+
+
+def bank_items():
+    """The starter bank as (subject, topic, question, choices, answer) rows"""
+    return [(subject, *item) for subject, items in ITEM_BANK.items() for item in items]
+
+
+def new_state(due_at):
+    return ReviewState(int(due_at), 0, NEW_EASE_PERMILLE, 0, 0)
+
+
+def sm2(state, grade, now):
+    """Review state after answering with an SM-2 grade from 0 (blackout) to 5 (perfect)"""
+    if grade < PASSING_GRADE:
+        reps, interval, lapses = 0, 1, state.lapses + 1
+    else:
+        reps, lapses = state.reps + 1, state.lapses
+        if reps == 1:
+            interval = 1
+        elif reps == 2:
+            interval = 6
+        else:
+            interval = max(1, round(state.interval_days * state.ease_permille / 1000))
+    miss = 5 - grade
+    ease = max(MIN_EASE_PERMILLE, state.ease_permille + 100 - miss * (80 + miss * 20))
+    return ReviewState(int(now) + interval * DAY_SECONDS, interval, ease, reps, lapses)
+
+
+class ReviewQueue:
+    """One student's due times for a subject's items, in a min-heap.
+
+    Rescheduling pushes a new entry and leaves the old one in place; stale
+    entries are dropped when they reach the top of the heap.
+    """
+
+    def __init__(self, due_times=()):
+        self._lock = threading.Lock()
+        self._due = {item_id: due_at for due_at, item_id in due_times}
+        self._rebuild()
+
+    @classmethod
+    def from_storage(cls, storage, user_id, subject):
+        return cls(storage.iter_due_times(user_id, subject))
+
+    def __len__(self):
+        return len(self._due)
+
+    def _rebuild(self):
+        self._heap = [(due_at, item_id) for item_id, due_at in self._due.items()]
+        heapq.heapify(self._heap)
+
+    def _is_current(self, entry):
+        return self._due.get(entry[1]) == entry[0]
+
+    def reschedule(self, item_id, due_at):
+        with self._lock:
+            self._due[item_id] = due_at
+            heapq.heappush(self._heap, (due_at, item_id))
+            # Stale entries only cost memory; compact once they outnumber live ones
+            if len(self._heap) > 2 * len(self._due) + 64:
+                self._rebuild()
+
+    def due(self, now=None, limit=1):
+        """Ids of up to limit items due by now, most overdue first"""
+        now = time.time() if now is None else now
+        with self._lock:
+            found, seen = [], set()
+            while self._heap and len(found) < limit and self._heap[0][0] <= now:
+                entry = heapq.heappop(self._heap)
+                # Stale and duplicate entries are popped for good
+                if self._is_current(entry) and entry[1] not in seen:
+                    seen.add(entry[1])
+                    found.append(entry)
+            for entry in found:
+                heapq.heappush(self._heap, entry)
+            return [item_id for _, item_id in found]
+
+    def next_due_at(self):
+        """When the earliest item falls due, or None for an empty deck"""
+        with self._lock:
+            while self._heap and not self._is_current(self._heap[0]):
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+
+def answer_item(storage, review_queue, user_id, item, choice, now=None):
+    """Grade a multiple-choice answer, log it and reschedule the item; returns (correct, new state, revision)"""
+    now = time.time() if now is None else now
+    correct = choice == item['choices'][item['answer']]
+    grade = CORRECT_GRADE if correct else WRONG_GRADE
+    stored = storage.get_review_state(user_id, item['id'])
+    state = sm2(ReviewState(*stored) if stored else new_state(now), grade, now)
+    revision = storage.record_review(user_id, item, grade, 100.0 if correct else 0.0, state, now)
+    review_queue.reschedule(item['id'], state.due_at)
+    return correct, state, revision
@@ -0,0 +1,214 @@
+"""Batch generation of practice questions from uploaded study material.
+
+``generate_quiz_items`` reads chunk texts lazily, groups them into batches
+and runs a question generator over each batch on an executor (a thread
+pool in the app; a process pool works too). Only ``max_pending`` batches
+are in flight at once, so a slow generator throttles how fast the
+document is read instead of queueing all of it. Each finished batch is
+yielded as soon as it completes, after near-duplicate questions are
+removed with MinHash signatures and LSH buckets. Closing the generator
+(Streamlit does this when the user navigates away mid-run) cancels
+queued batches and tells running ones to stop.
+
+``ClozeGenerator`` is a deterministic local generator. It blanks out a
+key term of each informative sentence and uses other terms from the
+same material as distractors. Any object with a
+``generate(texts, topic, cancel)`` method can replace it. The method
+returns (topic, question, choices, answer index) items and should stop
+early once ``cancel`` (an Event, or None in worker processes) is set.
+"""
+
+import re
+import threading
+import zlib
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import NamedTuple
+
+import numpy as np
+
+DEFAULT_BATCH_CHUNKS = 8
+DEFAULT_MAX_PENDING = 4
+DEFAULT_WORKERS = 4
+BLANK = "_____"
+MERSENNE_31 = 2 ** 31 - 1
+SHINGLE_WORDS = 2
+
+_SENTENCE_RE = re.compile(r"[^.!?]+[.!?]")
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z-]+")
+STOPWORDS = frozenset(
+    "about above after again against because been before being below between both could does doing "
+    "down during each every from further have having here into itself more most other ought over "
+    "same should some such than that their theirs them themselves then there these they this those "
+    "through under until very were what when where which while whom with would your yours also "
+    "called known many much often only used using within without another".split()
+)
+
+
+class QuizBatch(NamedTuple):
+    index: int
+    items: list
+    duplicates: int
+
+
+class ClozeGenerator:
+    """Deterministic fill-in-the-blank questions from the key terms of a text"""
+
+    def __init__(self, per_chunk=3, choices=4, min_words=8, max_words=40):
+        self.per_chunk = per_chunk
+        self.choices = choices
+        self.min_words = min_words
+        self.max_words = max_words
+
+    @staticmethod
+    def _key_terms(sentence):
+        return [word for word in _WORD_RE.findall(sentence) if len(word) >= 5 and word.lower() not in STOPWORDS]
+
+    def _sentences(self, text):
+        for match in _SENTENCE_RE.finditer(" ".join(text.split())):
+            sentence = match.group().strip()
+            if self.min_words <= len(sentence.split()) <= self.max_words:
+                yield sentence
+
+    def generate(self, texts, topic, cancel=None):
+        # Distractors come from the whole batch, so every chunk has enough of them
+        sentences = [list(self._sentences(text)) for text in texts]
+        vocabulary = sorted({term.lower() for chunk in sentences for s in chunk for term in self._key_terms(s)})
+        items = []
+        for chunk in sentences:
+            if cancel is not None and cancel.is_set():
+                break
+            made = 0
+            for sentence in chunk:
+                if made == self.per_chunk:
+                    break
+                terms = self._key_terms(sentence)
+                if not terms:
+                    continue
+                answer = max(terms, key=len)
+                distractors = self._distractors(answer, vocabulary, {term.lower() for term in terms})
+                if len(distractors) < self.choices - 1:
+                    continue
+                question = re.sub(rf"\b{re.escape(answer)}\b", BLANK, sentence, count=1)
+                choices = sorted([answer.lower(), *distractors], key=lambda word: zlib.crc32(word.encode()))
+                items.append((topic, f"Fill in the blank: {question}", choices, choices.index(answer.lower())))
+                made += 1
+        return items
+
+    def _distractors(self, answer, vocabulary, exclude):
+        # Terms of similar length make plausible wrong answers; the hash spreads picks across the text
+        candidates = [word for word in vocabulary if word not in exclude and abs(len(word) - len(answer)) <= 3]
+        candidates.sort(key=lambda word: zlib.crc32(f"{answer}/{word}".encode()))
+        return candidates[:self.choices - 1]
+
+
+class MinHashDeduper:
+    """Drops texts whose estimated Jaccard similarity to one already seen reaches the threshold.
+
+    Each text gets a MinHash signature over its word pairs. LSH banding
+    finds candidate matches through dictionary lookups, so each check
+    costs about the same however many questions have been seen. The
+    candidates are compared in one vectorised step against a matrix of
+    kept signatures, and exact repeats skip even that.
+    """
+
+    def __init__(self, threshold=0.75, num_perm=64, bands=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._a = rng.integers(1, MERSENNE_31, num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, MERSENNE_31, num_perm, dtype=np.uint64)[:, None]
+        self._signatures = np.empty((64, num_perm), dtype=np.uint64)
+        self._count = 0
+        self._exact = set()
+        self._buckets = defaultdict(list)
+
+    def __len__(self):
+        return self._count
+
+    def signature(self, text):
+        words = [word.lower() for word in _WORD_RE.findall(text)] or [""]
+        shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+        # a < 2**31 and hashes < 2**32, so the products fit in 64 bits
+        return ((self._a * hashes + self._b) % np.uint64(MERSENNE_31)).min(axis=1)
+
+    def add(self, text):
+        """Remember text and return True, or return False if it nearly duplicates an earlier one"""
+        signature = self.signature(text)
+        exact = signature.tobytes()
+        if exact in self._exact:
+            return False
+        keys = [(band, exact[band * self.rows * 8:(band + 1) * self.rows * 8]) for band in range(self.bands)]
+        candidates = {index for key in keys for index in self._buckets.get(key, ())}
+        if candidates:
+            matches = np.count_nonzero(self._signatures[list(candidates)] == signature, axis=1)
+            if matches.max() >= self.threshold * len(signature):
+                return False
+        if self._count == len(self._signatures):
+            self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+        self._signatures[self._count] = signature
+        for key in keys:
+            self._buckets[key].append(self._count)
+        self._exact.add(exact)
+        self._count += 1
+        return True
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _generate_batch(generator, texts, topic, cancel):
+    if cancel is not None and cancel.is_set():
+        return []
+    return generator.generate(texts, topic, cancel)
+
+
+def generate_quiz_items(
+    texts, generator, topic, executor=None, batch_size=DEFAULT_BATCH_CHUNKS,
+    max_pending=DEFAULT_MAX_PENDING, cancel=None, deduper=None,
+):
+    """Yield a QuizBatch of new, deduplicated items for each batch of texts, in completion order"""
+    cancel = cancel or threading.Event()
+    deduper = deduper or MinHashDeduper()
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS, thread_name_prefix="quiz-gen")
+    # Worker processes cannot see the event; they finish their batch and the result is dropped
+    worker_cancel = cancel if isinstance(executor, ThreadPoolExecutor) else None
+    pending = {}  # future -> batch index
+
+    def finished(done):
+        for future in sorted(done, key=pending.get):
+            index = pending.pop(future)
+            items = future.result()
+            unique = [item for item in items if deduper.add(item[1])]
+            yield QuizBatch(index, unique, len(items) - len(unique))
+
+    try:
+        for index, batch in enumerate(_batched(texts, batch_size)):
+            # Backpressure: read no further until a batch slot frees up
+            while len(pending) >= max_pending and not cancel.is_set():
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from finished(done)
+            if cancel.is_set():
+                break
+            future = executor.submit(_generate_batch, generator, batch, topic, worker_cancel)
+            pending[future] = index
+        while pending and not cancel.is_set():
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            yield from finished(done)
+    finally:
+        if pending:
+            cancel.set()
+            for future in pending:
+                future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
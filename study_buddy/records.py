@@ -0,0 +1,72 @@
+"""Typed, compact records for study sessions, quiz attempts and chat messages.
+
+Storage reads return these instead of ``sqlite3.Row`` objects. Each is a
+``NamedTuple``, so an instance is one tuple with no per-record ``__dict__``.
+Time is a single float of epoch seconds, and topics and roles are
+interned, so thousands of records about "Algebra" share one string. The
+``from_row`` row factories build them straight from SQLite cursors.
+``to_export`` and ``from_export`` convert to and from the flat records in
+an export file.
+"""
+
+import sys
+from typing import NamedTuple
+
+
+class StudySession(NamedTuple):
+    topic: str
+    duration: int
+    started_at: float
+
+    kind = "session"
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        return cls(sys.intern(row[0]), row[1], row[2])
+
+    @classmethod
+    def from_export(cls, record):
+        return cls(sys.intern(record['topic']), record['duration'], record['started_at'])
+
+    def to_export(self):
+        return {'type': self.kind, 'topic': self.topic, 'duration': self.duration, 'started_at': self.started_at}
+
+
+class QuizAttempt(NamedTuple):
+    topic: str
+    score: float
+    taken_at: float
+
+    kind = "quiz"
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        return cls(sys.intern(row[0]), row[1], row[2])
+
+    @classmethod
+    def from_export(cls, record):
+        return cls(sys.intern(record.get('topic', "")), record['score'], record['taken_at'])
+
+    def to_export(self):
+        return {'type': self.kind, 'topic': self.topic, 'score': self.score, 'taken_at': self.taken_at}
+
+
+class ChatMessage(NamedTuple):
+    id: int
+    role: str
+    content: str
+    created_at: float
+
+    kind = "message"
+
+    @classmethod
+    def from_row(cls, cursor, row):
+        return cls(row[0], sys.intern(row[1]), row[2], row[3])
+
+    @classmethod
+    def from_export(cls, record):
+        # Ids are assigned again on import
+        return cls(0, sys.intern(record['role']), record['content'], record['created_at'])
+
+    def to_export(self):
+        return {'type': self.kind, 'role': self.role, 'content': self.content, 'created_at': self.created_at}
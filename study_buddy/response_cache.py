@@ -0,0 +1,235 @@
+"""Response caching in front of the tutor backend.
+
+A backend is any object with
+``generate(prompt, user_data, history=None, context=None) -> str``.
+``CachedBackend`` wraps one without changing that interface. It looks
+in an in-memory LRU/TTL tier, then an optional SQLite tier that survives
+restarts, and calls the backend only on a miss. Keys include the
+backend's ``cache_namespace`` (its kind and model), so replies cached from
+one backend are never served for another. Requests that carry
+conversation history or notes as context depend on more than the prompt,
+so they bypass the cache, unless the backend declares with
+``uses_history = False`` or ``uses_context = False`` that it ignores them.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_PROFILE_FIELDS = ("subject", "learning_style")
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt):
+    """Case- and whitespace-insensitive form of a prompt, without trailing punctuation"""
+    return _SPACE_RE.sub(" ", prompt).strip().lower().rstrip("?!. ")
+
+
+def cache_key(prompt, user_data, profile_fields=DEFAULT_PROFILE_FIELDS, namespace=""):
+    """Stable key for a prompt plus the profile fields and backend that shape the answer"""
+    payload = [namespace, normalize_prompt(prompt)] + [str(user_data.get(field, "")) for field in profile_fields]
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.bypasses = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class LRUCache:
+    """Thread-safe in-memory cache with LRU eviction and a per-entry TTL"""
+
+    def __init__(self, maxsize=1024, ttl=3600.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = CacheStats()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self.stats.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """On-disk cache tier with TTL expiry and least-recently-used trimming"""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        accessed_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+    """
+
+    def __init__(self, path, max_entries=100000, ttl=7 * 24 * 3600.0):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.stats.expirations += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            return value
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                trimmed = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+                self.stats.evictions += trimmed
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+
+class CachedBackend:
+    """Wraps a tutor backend with a memory tier and an optional disk tier"""
+
+    def __init__(self, backend, memory=None, disk=None, profile_fields=DEFAULT_PROFILE_FIELDS):
+        self.backend = backend
+        self.memory = memory if memory is not None else LRUCache()
+        self.disk = disk
+        self.profile_fields = profile_fields
+        self.namespace = getattr(backend, 'cache_namespace', type(backend).__name__)
+        self.uses_history = getattr(backend, 'uses_history', True)
+        self.uses_context = getattr(backend, 'uses_context', True)
+
+    def _bypass(self, history, context):
+        """Whether the reply depends on more than the prompt, so it must not be cached"""
+        return bool((history and self.uses_history) or (context and self.uses_context))
+
+    def _lookup(self, key):
+        response = self.memory.get(key)
+        if response is not None:
+            self.memory.stats.hits += 1
+            return response
+        if self.disk is not None:
+            response = self.disk.get(key)
+            if response is not None:
+                self.memory.stats.disk_hits += 1
+                self.memory.put(key, response)
+                return response
+        self.memory.stats.misses += 1
+        return None
+
+    def _store(self, key, response):
+        self.memory.put(key, response)
+        if self.disk is not None:
+            self.disk.put(key, response)
+
+    def generate(self, prompt, user_data, history=None, context=None):
+        if self._bypass(history, context):
+            self.memory.stats.bypasses += 1
+            return self.backend.generate(prompt, user_data, history=history, context=context)
+        key = cache_key(prompt, user_data, self.profile_fields, self.namespace)
+        response = self._lookup(key)
+        if response is None:
+            response = self.backend.generate(prompt, user_data)
+            self._store(key, response)
+        return response
+
+    def stream(self, prompt, user_data, history=None, context=None):
+        """Yield a cached reply whole, or stream a miss and cache it once it completes"""
+        if self._bypass(history, context):
+            self.memory.stats.bypasses += 1
+            if hasattr(self.backend, 'stream'):
+                yield from self.backend.stream(prompt, user_data, history=history, context=context)
+            else:
+                yield self.backend.generate(prompt, user_data, history=history, context=context)
+            return
+        key = cache_key(prompt, user_data, self.profile_fields, self.namespace)
+        response = self._lookup(key)
+        if response is not None:
+            yield response
+            return
+        if not hasattr(self.backend, 'stream'):
+            response = self.backend.generate(prompt, user_data)
+            self._store(key, response)
+            yield response
+            return
+        chunks = []
+        for chunk in self.backend.stream(prompt, user_data):
+            chunks.append(chunk)
+            yield chunk
+        self._store(key, "".join(chunks))
+
+    def stats(self):
+        """Hit/miss/eviction counters across both tiers"""
+        stats = self.memory.stats.as_dict()
+        stats['memory_entries'] = len(self.memory)
+        if self.disk is not None:
+            stats['disk_evictions'] = self.disk.stats.evictions
+            stats['disk_expirations'] = self.disk.stats.expirations
+        return stats
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
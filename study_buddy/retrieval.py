@@ -0,0 +1,218 @@
+"""Keyword (BM25) index and hybrid retrieval over a student's study notes.
+
+Embeddings find passages that talk about the same thing as a question but
+miss exact terms such as "mitosis" or "2x + 5 = 13". ``KeywordIndex``
+scores those with BM25 over an inverted index kept next to the vector
+store, with the same document ids. Postings are stored compactly:
+
+- the saved snapshot holds one CSR layout, meaning a term offsets array
+  into flat uint32 document ids and uint16 term frequencies
+- documents added since the snapshot go into per-term ``array`` buffers,
+  which ``save()`` merges into a new snapshot
+
+A query reads only the postings of its own terms, and snapshot postings
+are sliced without copying. ``hybrid_search`` fuses the keyword and dense rankings with
+reciprocal rank fusion, so neither score scale has to be calibrated
+against the other.
+"""
+
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import NamedTuple
+
+import numpy as np
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+RRF_K = 60
+HYBRID_CANDIDATES = 20
+# Keyword matches scoring below this share of the best one are not used as context
+KEYWORD_MIN_SHARE = 0.5
+MAX_TF = 2 ** 16 - 1
+
+# Words, numbers and the arithmetic symbols students type into equations
+_TERM_RE = re.compile(r"\w+|[+\-*/=^<>%]")
+STOPWORDS = frozenset(
+    "a an and are as at be been but by can do does for from had has have how i if in into is it its "
+    "me my no not of on or so than that the their them then there these they this to was we were what "
+    "when where which who why will with you your".split()
+)
+
+
+class KeywordHit(NamedTuple):
+    id: int
+    score: float
+
+
+def tokenize(text):
+    """Lowercase index terms of a text, without stopwords"""
+    return [term for term in _TERM_RE.findall(text.lower()) if term not in STOPWORDS]
+
+
+def _view(buffer, dtype):
+    return np.frombuffer(buffer, dtype=dtype) if len(buffer) else np.empty(0, dtype=dtype)
+
+
+class KeywordIndex:
+    """Incrementally built BM25 inverted index, snapshotted to a single .npz file"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._terms = {}
+        self._lengths = array("I")
+        self._total_length = 0
+        # Snapshot postings in CSR form: term id -> doc_ids[offsets[t]:offsets[t + 1]]
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._doc_ids = np.empty(0, dtype=np.uint32)
+        self._tfs = np.empty(0, dtype=np.uint16)
+        # Postings added since the snapshot: term id -> (doc ids, term frequencies)
+        self._tail = {}
+        # Per-document BM25 length normalisation, recomputed after documents are added
+        self._norm = np.empty(0, dtype=np.float32)
+        if path is not None and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def _load(self, path):
+        with np.load(path) as snapshot:
+            terms = bytes(snapshot['terms']).decode().split("\n") if len(snapshot['terms']) else []
+            self._terms = {term: tid for tid, term in enumerate(terms)}
+            self._offsets = snapshot['offsets']
+            self._doc_ids = snapshot['doc_ids']
+            self._tfs = snapshot['tfs']
+            self._lengths = array("I", snapshot['lengths'].tobytes())
+        self._total_length = sum(self._lengths)
+
+    def add(self, texts):
+        """Index texts as the next documents, in order; returns the id of the first"""
+        documents = [Counter(tokenize(text)) for text in texts]
+        with self._lock:
+            first = len(self._lengths)
+            for doc_id, counts in enumerate(documents, start=first):
+                length = sum(counts.values())
+                self._lengths.append(length)
+                self._total_length += length
+                for term, tf in counts.items():
+                    tid = self._terms.setdefault(term, len(self._terms))
+                    postings = self._tail.get(tid)
+                    if postings is None:
+                        postings = self._tail[tid] = (array("I"), array("H"))
+                    postings[0].append(doc_id)
+                    postings[1].append(min(tf, MAX_TF))
+        return first
+
+    def _postings(self, tid):
+        parts_ids, parts_tfs = [], []
+        if tid + 1 < len(self._offsets):
+            start, end = self._offsets[tid], self._offsets[tid + 1]
+            parts_ids.append(self._doc_ids[start:end])
+            parts_tfs.append(self._tfs[start:end])
+        tail = self._tail.get(tid)
+        if tail is not None:
+            # Copied, since a view would pin the buffer against later appends
+            parts_ids.append(np.array(tail[0], dtype=np.uint32))
+            parts_tfs.append(np.array(tail[1], dtype=np.uint16))
+        if len(parts_ids) == 1:
+            return parts_ids[0], parts_tfs[0]
+        if not parts_ids:
+            return np.empty(0, dtype=np.uint32), np.empty(0, dtype=np.uint16)
+        return np.concatenate(parts_ids), np.concatenate(parts_tfs)
+
+    def search(self, query, k=10):
+        """Up to k KeywordHits for the query, best BM25 score first"""
+        terms = Counter(tokenize(query))
+        with self._lock:
+            n_docs = len(self._lengths)
+            tids = [(self._terms[term], weight) for term, weight in terms.items() if term in self._terms]
+            if not n_docs or not tids:
+                return []
+            if len(self._norm) != n_docs:
+                lengths = _view(self._lengths, np.uint32).astype(np.float32)
+                self._norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / np.float32(self._total_length / n_docs))
+                # A live view would stop add() from growing the lengths buffer
+                del lengths
+            norm = self._norm
+            all_ids, all_scores = [], []
+            for tid, weight in tids:
+                doc_ids, tfs = self._postings(tid)
+                idf = np.log1p((n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                tfs = tfs.astype(np.float32)
+                all_ids.append(doc_ids)
+                all_scores.append(np.float32(weight * idf * (BM25_K1 + 1)) * tfs / (tfs + norm[doc_ids]))
+        if len(all_ids) == 1:
+            doc_ids, scores = all_ids[0], all_scores[0]
+        else:
+            doc_ids, scores = np.concatenate(all_ids), np.concatenate(all_scores)
+            if len(doc_ids) * 8 < n_docs:
+                # Sorting a few postings is cheaper than a dense array over every document
+                doc_ids, positions = np.unique(doc_ids, return_inverse=True)
+                scores = np.bincount(positions, weights=scores)
+            else:
+                scores = np.bincount(doc_ids, weights=scores)
+                doc_ids = np.flatnonzero(scores)
+                scores = scores[doc_ids]
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            doc_ids, scores = doc_ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [KeywordHit(int(doc_ids[i]), float(scores[i])) for i in order]
+
+    def nbytes(self):
+        """Bytes held by postings and document lengths, not counting the vocabulary"""
+        tail = sum(ids.itemsize * len(ids) + tfs.itemsize * len(tfs) for ids, tfs in self._tail.values())
+        return self._offsets.nbytes + self._doc_ids.nbytes + self._tfs.nbytes + tail + self._lengths.itemsize * len(self._lengths)
+
+    def save(self, path=None):
+        """Merge the postings added since the last snapshot and write a new one"""
+        path = path or self.path
+        with self._lock:
+            n_terms = len(self._terms)
+            counts = np.zeros(n_terms, dtype=np.int64)
+            counts[:len(self._offsets) - 1] = np.diff(self._offsets)
+            for tid, (ids, _) in self._tail.items():
+                counts[tid] += len(ids)
+            offsets = np.zeros(n_terms + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            doc_ids = np.empty(offsets[-1], dtype=np.uint32)
+            tfs = np.empty(offsets[-1], dtype=np.uint16)
+            for tid in range(n_terms):
+                ids, term_tfs = self._postings(tid)
+                doc_ids[offsets[tid]:offsets[tid + 1]] = ids
+                tfs[offsets[tid]:offsets[tid + 1]] = term_tfs
+            self._offsets, self._doc_ids, self._tfs, self._tail = offsets, doc_ids, tfs, {}
+            terms = "\n".join(sorted(self._terms, key=self._terms.get)).encode()
+            lengths = np.array(self._lengths, dtype=np.uint32)
+        if path is not None:
+            tmp = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp, terms=np.frombuffer(terms, dtype=np.uint8), offsets=offsets, doc_ids=doc_ids, tfs=tfs, lengths=lengths)
+            os.replace(tmp, path)
+
+
+def _ranks(ids):
+    return {doc_id: rank for rank, doc_id in enumerate(ids)}
+
+
+def hybrid_search(store, query, k=3, min_score=0.0, candidates=HYBRID_CANDIDATES):
+    """Top-k chunks of a vector store for a query, fusing dense and BM25 rankings.
+
+    Dense hits below min_score and keyword hits scoring under
+    ``KEYWORD_MIN_SHARE`` of the best keyword hit are left out, so an
+    unrelated question gets no context. Each result's score is its fused
+    reciprocal-rank score.
+    """
+    dense = [hit.id for hit in store.search(query, k=candidates) if hit.score >= min_score]
+    keyword = store.keywords.search(query, k=candidates)
+    if keyword:
+        keyword = [hit.id for hit in keyword if hit.score >= KEYWORD_MIN_SHARE * keyword[0].score]
+    fused = Counter()
+    for ranking in (_ranks(dense), _ranks(keyword)):
+        for doc_id, rank in ranking.items():
+            fused[doc_id] += 1.0 / (RRF_K + rank + 1)
+    best = fused.most_common(k)
+    return store.get_chunks([doc_id for doc_id, _ in best], [score for _, score in best])
@@ -0,0 +1,629 @@
+"""SQLite-backed persistent storage for student data.
+
+Profiles, goals, study sessions, quiz attempts, chat messages and the
+spaced-repetition quiz bank and schedules live in one WAL-mode database. Reads return only what the caller asks for (recent
+rows, aggregates, series), so the app never holds a student's full history
+in session state.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import time
+from contextlib import contextmanager
+
+from study_buddy.records import ChatMessage, QuizAttempt, StudySession
+
+MAX_ROW_ID = 2 ** 63 - 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    subject TEXT NOT NULL DEFAULT '',
+    learning_style TEXT NOT NULL DEFAULT '',
+    created_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS goals (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_goals_user ON goals(user_id);
+
+CREATE TABLE IF NOT EXISTS study_sessions (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    topic TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    started_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user_time ON study_sessions(user_id, started_at);
+
+CREATE TABLE IF NOT EXISTS quiz_attempts (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    topic TEXT NOT NULL DEFAULT '',
+    score REAL NOT NULL,
+    taken_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_user_time ON quiz_attempts(user_id, taken_at);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chat_user_id ON chat_messages(user_id, id);
+
+CREATE TABLE IF NOT EXISTS chat_summaries (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    through_id INTEGER NOT NULL,
+    content TEXT NOT NULL
+);
+
+-- owner_id 0 is the shared bank; other items were generated from one student's materials
+CREATE TABLE IF NOT EXISTS quiz_items (
+    id INTEGER PRIMARY KEY,
+    subject TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    question TEXT NOT NULL,
+    choices TEXT NOT NULL,
+    answer INTEGER NOT NULL,
+    owner_id INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_quiz_items_subject ON quiz_items(subject);
+
+-- SM-2 state per student and item: integer columns in a clustered table, about 20 bytes a card
+CREATE TABLE IF NOT EXISTS review_schedule (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL REFERENCES quiz_items(id) ON DELETE CASCADE,
+    due_at INTEGER NOT NULL,
+    interval_days INTEGER NOT NULL DEFAULT 0,
+    ease_permille INTEGER NOT NULL DEFAULT 2500,
+    reps INTEGER NOT NULL DEFAULT 0,
+    lapses INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, item_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS item_reviews (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL REFERENCES quiz_items(id) ON DELETE CASCADE,
+    grade INTEGER NOT NULL,
+    reviewed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_item_reviews_user_item ON item_reviews(user_id, item_id, reviewed_at);
+
+-- Uploads already copied into each student's vector store, by content digest
+CREATE TABLE IF NOT EXISTS indexed_documents (
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    digest TEXT NOT NULL,
+    name TEXT NOT NULL,
+    indexed_at REAL NOT NULL,
+    PRIMARY KEY (user_id, digest)
+) WITHOUT ROWID;
+"""
+
+# Columns added to a table after it first shipped: CREATE TABLE IF NOT EXISTS
+# leaves existing tables alone, so Storage adds them (and what depends on them)
+ADDED_COLUMNS = (
+    ("quiz_items", "owner_id", "INTEGER NOT NULL DEFAULT 0"),
+    # Bumped whenever a user's sessions or quiz attempts change, so each server process can tell its cached totals are stale
+    ("users", "revision", "INTEGER NOT NULL DEFAULT 0"),
+)
+POST_MIGRATION_SCHEMA = """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_quiz_items_owner_question ON quiz_items(owner_id, question);
+"""
+
+
+class ConnectionPool:
+    """A fixed-size pool of SQLite connections shared by Streamlit script threads.
+
+    Each connection is used by one thread at a time, which is what SQLite
+    requires; ``check_same_thread`` is off only because a connection may
+    be handed to a different thread on its next checkout.
+    """
+
+    def __init__(self, path, size=4, timeout=30.0):
+        self.path = path
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._pool.put(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self._pool.get(timeout=self.timeout)
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """A connection inside BEGIN IMMEDIATE ... COMMIT, rolled back on error"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self):
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+
+class WriteBatch:
+    """Rows queued by ``Storage.batch()`` and written in one transaction"""
+
+    def __init__(self):
+        self.goals = []
+        self.sessions = []
+        self.quiz_attempts = []
+        self.messages = []
+        self.profiles = []
+        self.quiz_items = []
+        self.review_states = []
+        self.item_reviews = []
+        # Filled in on commit: user id -> revision after these writes
+        self.revisions = {}
+
+    def add_goal(self, user_id, text):
+        self.goals.append((user_id, text))
+
+    def add_session(self, user_id, topic, duration, started_at=None):
+        self.sessions.append((user_id, topic, duration, time.time() if started_at is None else started_at))
+
+    def add_quiz_attempt(self, user_id, score, topic="", taken_at=None):
+        self.quiz_attempts.append((user_id, topic, score, time.time() if taken_at is None else taken_at))
+
+    def add_message(self, user_id, role, content, created_at=None):
+        self.messages.append((user_id, role, content, time.time() if created_at is None else created_at))
+
+    def update_profile(self, user_id, subject=None, learning_style=None):
+        self.profiles.append((subject, learning_style, user_id))
+
+    def add_quiz_item(self, owner_id, subject, topic, question, choices, answer):
+        self.quiz_items.append((subject, topic, question, json.dumps(choices), answer, owner_id))
+
+    # Review records name their item by question, since item ids differ between databases;
+    # own says whether it is one of the user's generated items or a shared bank item
+
+    def add_review_state(self, user_id, question, own, state):
+        self.review_states.append((user_id, *state, user_id if own else 0, question))
+
+    def add_item_review(self, user_id, question, own, grade, reviewed_at):
+        self.item_reviews.append((user_id, grade, reviewed_at, user_id if own else 0, question))
+
+
+class Storage:
+    """Query and write API over the student database"""
+
+    def __init__(self, path, pool_size=4):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.pool = ConnectionPool(path, size=pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            for table, column, definition in ADDED_COLUMNS:
+                if column not in {row['name'] for row in conn.execute(f"PRAGMA table_info({table})")}:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            conn.executescript(POST_MIGRATION_SCHEMA)
+
+    # Users and profiles
+
+    def get_or_create_user(self, name):
+        """Return the user row for a name, creating it on first use"""
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO users (name, created_at) VALUES (?, ?)",
+                (name, time.time()),
+            )
+            return conn.execute("SELECT * FROM users WHERE name = ?", (name,)).fetchone()
+
+    def update_profile(self, user_id, subject=None, learning_style=None):
+        with self.pool.connection() as conn:
+            conn.execute(
+                "UPDATE users SET subject = COALESCE(?, subject), learning_style = COALESCE(?, learning_style) WHERE id = ?",
+                (subject, learning_style, user_id),
+            )
+
+    def reset_user(self, user_id):
+        """Delete everything a user has recorded, including the quiz items generated for them, keeping the profile row"""
+        with self.pool.transaction() as conn:
+            self._reset_user(conn, user_id)
+
+    def replace_user(self, user_id, batches):
+        """Reset a user and write batches of their new data in one transaction.
+
+        ``batches`` may be a generator that parses input lazily. If it
+        raises, nothing is written and the user's old data is left as it was.
+        """
+        with self.pool.transaction() as conn:
+            self._reset_user(conn, user_id)
+            for batch in batches:
+                self._write_batch(conn, batch)
+
+    @staticmethod
+    def _reset_user(conn, user_id):
+        for table in (
+            "goals", "study_sessions", "quiz_attempts", "chat_messages", "chat_summaries",
+            "review_schedule", "item_reviews", "indexed_documents",
+        ):
+            conn.execute(f"DELETE FROM {table} WHERE user_id = ?", (user_id,))
+        conn.execute("DELETE FROM quiz_items WHERE owner_id = ?", (user_id,))
+        conn.execute(
+            "UPDATE users SET subject = '', learning_style = '', revision = revision + 1 WHERE id = ?", (user_id,)
+        )
+
+    def revision(self, user_id):
+        """Counter bumped by every write to a user's sessions or quiz attempts, from any process"""
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT revision FROM users WHERE id = ?", (user_id,)).fetchone()
+            return row[0] if row else 0
+
+    @staticmethod
+    def _bump_revision(conn, user_id):
+        return conn.execute(
+            "UPDATE users SET revision = revision + 1 WHERE id = ? RETURNING revision", (user_id,)
+        ).fetchone()[0]
+
+    # Goals
+
+    def list_goals(self, user_id):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT id, text FROM goals WHERE user_id = ? ORDER BY id", (user_id,)).fetchall()
+
+    def count_goals(self, user_id):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM goals WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def add_goal(self, user_id, text):
+        with self.pool.connection() as conn:
+            conn.execute("INSERT INTO goals (user_id, text) VALUES (?, ?)", (user_id, text))
+
+    def remove_goal(self, user_id, goal_id):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM goals WHERE id = ? AND user_id = ?", (goal_id, user_id))
+
+    # Study sessions
+
+    def add_session(self, user_id, topic, duration, started_at=None):
+        """Record a session and return the user's new revision"""
+        with self.batch() as batch:
+            batch.add_session(user_id, topic, duration, started_at)
+        return batch.revisions[user_id]
+
+    def session_totals(self, user_id):
+        """(session count, total minutes) for a user"""
+        with self.pool.connection() as conn:
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(duration), 0) FROM study_sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            return count, total
+
+    def recent_sessions(self, user_id, limit=5):
+        """The latest sessions, oldest first"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT topic, duration, started_at FROM study_sessions WHERE user_id = ? "
+                "ORDER BY started_at DESC, id DESC LIMIT ?",
+                (user_id, limit),
+            )
+            cursor.row_factory = StudySession.from_row
+            rows = cursor.fetchall()
+        return rows[::-1]
+
+    def iter_sessions(self, user_id, batch_size=1000):
+        """Every session in time order, fetched in batches"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT topic, duration, started_at FROM study_sessions WHERE user_id = ? ORDER BY started_at, id",
+                (user_id,),
+            )
+            cursor.row_factory = StudySession.from_row
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+
+    def session_series(self, user_id):
+        """(local wall-clock epoch seconds, minutes) pairs in time order, for charting"""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT CAST(strftime('%s', started_at, 'unixepoch', 'localtime') AS INTEGER), duration "
+                "FROM study_sessions WHERE user_id = ? ORDER BY started_at, id",
+                (user_id,),
+            ).fetchall()
+
+    # Quiz attempts
+
+    def add_quiz_attempt(self, user_id, score, topic="", taken_at=None):
+        """Record a quiz score and return the user's new revision"""
+        with self.batch() as batch:
+            batch.add_quiz_attempt(user_id, score, topic, taken_at)
+        return batch.revisions[user_id]
+
+    def quiz_stats(self, user_id):
+        """(attempt count, mean score or None) for a user"""
+        with self.pool.connection() as conn:
+            count, mean = conn.execute(
+                "SELECT COUNT(*), AVG(score) FROM quiz_attempts WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            return count, mean
+
+    def recent_quiz_scores(self, user_id, limit=5):
+        """The latest scores, oldest first"""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT score FROM quiz_attempts WHERE user_id = ? ORDER BY taken_at DESC, id DESC LIMIT ?",
+                (user_id, limit),
+            ).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+    def iter_quiz_attempts(self, user_id, batch_size=1000):
+        """Every quiz attempt in time order, fetched in batches"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT topic, score, taken_at FROM quiz_attempts WHERE user_id = ? ORDER BY taken_at, id",
+                (user_id,),
+            )
+            cursor.row_factory = QuizAttempt.from_row
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+
+    # Chat messages
+
+    def add_message(self, user_id, role, content, created_at=None):
+        with self.batch() as batch:
+            batch.add_message(user_id, role, content, created_at)
+
+    def count_messages(self, user_id):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM chat_messages WHERE user_id = ?", (user_id,)).fetchone()[0]
+
+    def recent_messages(self, user_id, limit=50, before_id=None):
+        """The latest chat messages (older than before_id, if given), oldest first"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT id, role, content, created_at FROM chat_messages WHERE user_id = ? AND id < ? "
+                "ORDER BY id DESC LIMIT ?",
+                (user_id, before_id if before_id is not None else MAX_ROW_ID, limit),
+            )
+            cursor.row_factory = ChatMessage.from_row
+            rows = cursor.fetchall()
+        return rows[::-1]
+
+    def iter_messages(self, user_id, after_id=0, through_id=None, newest_first=False, batch_size=1000):
+        """Chat messages with after_id < id <= through_id, fetched in batches"""
+        order = "DESC" if newest_first else ""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT id, role, content, created_at FROM chat_messages "
+                f"WHERE user_id = ? AND id > ? AND id <= ? ORDER BY id {order}",
+                (user_id, after_id, through_id if through_id is not None else MAX_ROW_ID),
+            )
+            cursor.row_factory = ChatMessage.from_row
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+
+    def get_chat_summary(self, user_id):
+        """(through_id, content) of the rolled-up summary of older chat, or (0, "")"""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT through_id, content FROM chat_summaries WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return (row['through_id'], row['content']) if row else (0, "")
+
+    def set_chat_summary(self, user_id, through_id, content):
+        with self.pool.connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO chat_summaries (user_id, through_id, content) VALUES (?, ?, ?)",
+                (user_id, through_id, content),
+            )
+
+    # Quiz items and spaced-repetition reviews
+
+    def add_quiz_items(self, items, owner_id=0):
+        """Add (subject, topic, question, choices, answer index) items, to the shared bank unless owner_id is set.
+
+        Questions the owner already has are skipped. Returns how many were added.
+        """
+        with self.pool.transaction() as conn:
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO quiz_items (subject, topic, question, choices, answer, owner_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    (subject, topic, question, json.dumps(choices), answer, owner_id)
+                    for subject, topic, question, choices, answer in items
+                ),
+            )
+            return cursor.rowcount
+
+    def get_quiz_item(self, item_id):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT * FROM quiz_items WHERE id = ?", (item_id,)).fetchone()
+        if row is None:
+            return None
+        return {**dict(row), 'choices': json.loads(row['choices'])}
+
+    def enroll_items(self, user_id, subject, due_at):
+        """Schedule the subject's shared and own items the user has no schedule for yet; returns their (due_at, item_id)"""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "INSERT OR IGNORE INTO review_schedule (user_id, item_id, due_at) "
+                "SELECT ?, id, ? FROM quiz_items WHERE subject = ? AND owner_id IN (0, ?) "
+                "RETURNING due_at, item_id",
+                (user_id, int(due_at), subject, user_id),
+            ).fetchall()
+
+    def iter_due_times(self, user_id, subject, batch_size=10000):
+        """(due_at, item_id) of every scheduled item in a subject"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT s.due_at, s.item_id FROM review_schedule s JOIN quiz_items i ON i.id = s.item_id "
+                "WHERE s.user_id = ? AND i.subject = ?",
+                (user_id, subject),
+            )
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+
+    def get_review_state(self, user_id, item_id):
+        """(due_at, interval_days, ease_permille, reps, lapses) of an item, or None if unscheduled"""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT due_at, interval_days, ease_permille, reps, lapses FROM review_schedule "
+                "WHERE user_id = ? AND item_id = ?",
+                (user_id, item_id),
+            ).fetchone()
+
+    def record_review(self, user_id, item, grade, score, state, reviewed_at):
+        """Log an answer to a quiz item and store its next review state in one transaction; returns the new revision"""
+        with self.pool.transaction() as conn:
+            conn.execute(
+                "INSERT INTO item_reviews (user_id, item_id, grade, reviewed_at) VALUES (?, ?, ?, ?)",
+                (user_id, item['id'], grade, reviewed_at),
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO review_schedule (user_id, item_id, due_at, interval_days, ease_permille, reps, lapses) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (user_id, item['id'], *state),
+            )
+            conn.execute(
+                "INSERT INTO quiz_attempts (user_id, topic, score, taken_at) VALUES (?, ?, ?, ?)",
+                (user_id, item['topic'], score, reviewed_at),
+            )
+            return self._bump_revision(conn, user_id)
+
+    def item_history(self, user_id, item_id):
+        """(grade, reviewed_at) of every answer to an item, oldest first"""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT grade, reviewed_at FROM item_reviews WHERE user_id = ? AND item_id = ? ORDER BY reviewed_at",
+                (user_id, item_id),
+            ).fetchall()
+
+    def iter_own_quiz_items(self, user_id, batch_size=1000):
+        """(subject, topic, question, choices, answer) of the items generated for a user"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT subject, topic, question, choices, answer FROM quiz_items WHERE owner_id = ? ORDER BY id",
+                (user_id,),
+            )
+            while rows := cursor.fetchmany(batch_size):
+                for subject, topic, question, choices, answer in rows:
+                    yield subject, topic, question, json.loads(choices), answer
+
+    def iter_review_states(self, user_id, batch_size=1000):
+        """(question, own item, due_at, interval_days, ease_permille, reps, lapses) of every scheduled item"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT i.question, i.owner_id != 0, s.due_at, s.interval_days, s.ease_permille, s.reps, s.lapses "
+                "FROM review_schedule s JOIN quiz_items i ON i.id = s.item_id WHERE s.user_id = ? ORDER BY s.item_id",
+                (user_id,),
+            )
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+
+    def iter_item_reviews(self, user_id, batch_size=1000):
+        """(question, own item, grade, reviewed_at) of every answer to a quiz item, oldest first"""
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                "SELECT i.question, i.owner_id != 0, r.grade, r.reviewed_at "
+                "FROM item_reviews r JOIN quiz_items i ON i.id = r.item_id WHERE r.user_id = ? ORDER BY r.reviewed_at, r.id",
+                (user_id,),
+            )
+            while rows := cursor.fetchmany(batch_size):
+                yield from rows
+
+    # Indexed uploads
+
+    def claim_document(self, user_id, digest, name):
+        """Record an upload as indexed for a user; returns (newly claimed, name it is indexed under)"""
+        with self.pool.transaction() as conn:
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO indexed_documents (user_id, digest, name, indexed_at) VALUES (?, ?, ?, ?)",
+                (user_id, digest, name, time.time()),
+            ).rowcount == 1
+            row = conn.execute(
+                "SELECT name FROM indexed_documents WHERE user_id = ? AND digest = ?", (user_id, digest)
+            ).fetchone()
+        return claimed, row['name']
+
+    def release_document(self, user_id, digest):
+        """Forget a claim whose indexing failed, so the upload is indexed again next time"""
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM indexed_documents WHERE user_id = ? AND digest = ?", (user_id, digest))
+
+    # Batched writes
+
+    @contextmanager
+    def batch(self):
+        """Queue writes and commit them together in one transaction"""
+        batch = WriteBatch()
+        yield batch
+        if not any((
+            batch.goals, batch.sessions, batch.quiz_attempts, batch.messages, batch.profiles,
+            batch.quiz_items, batch.review_states, batch.item_reviews,
+        )):
+            return
+        with self.pool.transaction() as conn:
+            self._write_batch(conn, batch)
+
+    def _write_batch(self, conn, batch):
+        if batch.goals:
+            conn.executemany("INSERT INTO goals (user_id, text) VALUES (?, ?)", batch.goals)
+        if batch.sessions:
+            conn.executemany(
+                "INSERT INTO study_sessions (user_id, topic, duration, started_at) VALUES (?, ?, ?, ?)",
+                batch.sessions,
+            )
+        if batch.quiz_attempts:
+            conn.executemany(
+                "INSERT INTO quiz_attempts (user_id, topic, score, taken_at) VALUES (?, ?, ?, ?)",
+                batch.quiz_attempts,
+            )
+        if batch.messages:
+            conn.executemany(
+                "INSERT INTO chat_messages (user_id, role, content, created_at) VALUES (?, ?, ?, ?)",
+                batch.messages,
+            )
+        if batch.profiles:
+            conn.executemany(
+                "UPDATE users SET subject = COALESCE(?, subject), learning_style = COALESCE(?, learning_style) WHERE id = ?",
+                batch.profiles,
+            )
+        if batch.quiz_items:
+            conn.executemany(
+                "INSERT OR IGNORE INTO quiz_items (subject, topic, question, choices, answer, owner_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                batch.quiz_items,
+            )
+        # Items are looked up by owner and question; records for items this database lacks are skipped
+        if batch.review_states:
+            conn.executemany(
+                "INSERT OR REPLACE INTO review_schedule (user_id, item_id, due_at, interval_days, ease_permille, reps, lapses) "
+                "SELECT ?, id, ?, ?, ?, ?, ? FROM quiz_items WHERE owner_id = ? AND question = ?",
+                batch.review_states,
+            )
+        if batch.item_reviews:
+            conn.executemany(
+                "INSERT INTO item_reviews (user_id, item_id, grade, reviewed_at) "
+                "SELECT ?, id, ?, ? FROM quiz_items WHERE owner_id = ? AND question = ?",
+                batch.item_reviews,
+            )
+        for user_id in {row[0] for row in batch.sessions} | {row[0] for row in batch.quiz_attempts}:
+            batch.revisions[user_id] = self._bump_revision(conn, user_id)
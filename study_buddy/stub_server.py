@@ -0,0 +1,184 @@
+"""Local stand-in for the OpenAI chat-completions API.
+
+Answers ``POST /v1/chat/completions`` after a configurable delay, so the
+tutor backend can be developed and benchmarked offline. Requests with
+``"stream": true`` get the reply as server-sent events, one word at a
+time. It speaks just enough HTTP/1.1, including keep-alive and chunked
+responses, for an httpx or openai client.
+
+    python -m study_buddy.stub_server --port 8765 --latency 0.3
+
+Then point the app at it with ``OPENAI_BASE_URL=http://127.0.0.1:8765/v1``.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+
+_REASONS = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 503: "Service Unavailable"}
+_WORD_RE = re.compile(r"\S+\s*")
+
+
+class StubChatServer:
+    """Minimal asyncio HTTP server that mimics chat completions"""
+
+    def __init__(
+        self, host="127.0.0.1", port=0, latency=0.2, jitter=0.0, failure_rate=0.0, token_latency=0.02, seed=None
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.requests_served = 0
+        self._random = random.Random(seed)
+        self._server = None
+        self._writers = set()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/v1"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        self._server.close()
+        for writer in list(self._writers):
+            writer.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, payload = await self._route(method, path, body)
+                if isinstance(payload, dict):
+                    data = json.dumps(payload).encode()
+                    writer.write(
+                        f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                        f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+                        + data
+                    )
+                    await writer.drain()
+                else:
+                    await self._write_events(writer, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # Clients hanging up, or idle keep-alive connections cancelled at shutdown
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _route(self, method, path, body):
+        if method != "POST" or not path.rstrip("/").endswith("/chat/completions"):
+            return 404, {'error': {'message': f"unknown route {method} {path}"}}
+        request = json.loads(body or b"{}")
+        await asyncio.sleep(self.latency + self._random.uniform(0, self.jitter))
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            return 503, {'error': {'message': "stub server overloaded", 'type': "server_error"}}
+        self.requests_served += 1
+        if request.get('stream'):
+            return 200, self._completion_chunks(request)
+        completion = self.completion(request)
+        # A non-streamed reply still takes as long to generate as a streamed one
+        words = len(_WORD_RE.findall(completion['choices'][0]['message']['content']))
+        await asyncio.sleep(self.token_latency * max(0, words - 1))
+        return 200, completion
+
+    @staticmethod
+    async def _write_events(writer, events):
+        """Send each event as one server-sent-events frame in a chunked response"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n"
+        )
+        async for event in events:
+            frame = f"data: {event if isinstance(event, str) else json.dumps(event)}\n\n".encode()
+            writer.write(f"{len(frame):X}\r\n".encode() + frame + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _completion_chunks(self, request):
+        completion = self.completion(request)
+        chunk = {key: completion[key] for key in ('id', 'created', 'model')}
+        chunk['object'] = "chat.completion.chunk"
+        words = _WORD_RE.findall(completion['choices'][0]['message']['content'])
+        for i, word in enumerate(words):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            delta = {'role': "assistant", 'content': word} if i == 0 else {'content': word}
+            yield {**chunk, 'choices': [{'index': 0, 'delta': delta, 'finish_reason': None}]}
+        yield {**chunk, 'choices': [{'index': 0, 'delta': {}, 'finish_reason': "stop"}]}
+        yield "[DONE]"
+
+    @staticmethod
+    def completion(request):
+        messages = request.get('messages') or [{'content': ""}]
+        prompt = messages[-1].get('content', "")
+        content = f"(stub tutor) Here is a short answer to: {prompt}"
+        prompt_tokens = sum(len(str(m.get('content', "")).split()) for m in messages)
+        completion_tokens = len(content.split())
+        return {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': "chat.completion",
+            'created': int(time.time()),
+            'model': request.get('model', "stub"),
+            'choices': [{
+                'index': 0,
+                'message': {'role': "assistant", 'content': content},
+                'finish_reason': "stop",
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+            },
+        }
+
+
+async def _serve(args):
+    server = await StubChatServer(
+        args.host, args.port, args.latency, args.jitter, args.failure_rate, args.token_latency
+    ).start()
+    print(f"Stub chat API listening on {server.base_url}")
+    await server._server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the OpenAI chat API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before each reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay, in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="delay between streamed words, in seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
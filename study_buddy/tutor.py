@@ -0,0 +1,106 @@
+"""AI tutor response generation."""
+
+import time
+
+from study_buddy.instrumentation import timed
+from study_buddy.intents import classify, response_for
+from study_buddy.retrieval import hybrid_search
+
+CONTEXT_K = 3
+CONTEXT_MIN_SCORE = 0.2
+CONTEXT_PREVIEW_CHARS = 300
+
+
+class TemplateBackend:
+    """Canned responses from the intent router, used until an LLM is wired in.
+
+    Canned answers cannot draw on the conversation or the student's notes,
+    so ``history`` and ``context`` are ignored, and say so for callers that
+    would otherwise spend time building them.
+    """
+
+    cache_namespace = "templates"
+    uses_history = False
+    uses_context = False
+
+    def generate(self, prompt, user_data, history=None, context=None):
+        intent = classify(prompt)
+        subject = user_data.get('subject', 'general')
+        learning_style = user_data.get('learning_style', 'general')
+        return response_for(intent, subject, learning_style)
+
+    def stream(self, prompt, user_data, history=None, context=None):
+        # Templates are ready immediately, so there is nothing to stream
+        yield self.generate(prompt, user_data, history, context)
+
+
+DEFAULT_BACKEND = TemplateBackend()
+
+
+@timed("tutor.retrieve_context")
+def retrieve_context(store, query, k=CONTEXT_K, min_score=CONTEXT_MIN_SCORE):
+    """Top-k chunks of the student's notes relevant to the query, by meaning or by exact keywords"""
+    if store is None:
+        return []
+    return hybrid_search(store, query, k=k, min_score=min_score)
+
+
+def _context_notes(store, query):
+    """Excerpts of the student's notes relevant to the query, labelled with where they came from"""
+    return [
+        f"{hit.text[:CONTEXT_PREVIEW_CHARS].strip()} ({hit.source}{f', page {hit.page}' if hit.page else ''})"
+        for hit in retrieve_context(store, query)
+    ]
+
+
+def _context_for(backend, store, query):
+    if store is None or not getattr(backend, 'uses_context', True):
+        return None
+    return _context_notes(store, query) or None
+
+
+def _stream_response(user_input, user_data, backend, history, store):
+    # Retrieval runs on the first request for a chunk, so it counts towards time to first token
+    context = _context_for(backend, store, user_input)
+    if hasattr(backend, 'stream'):
+        yield from backend.stream(user_input, user_data, history=history, context=context)
+    else:
+        yield backend.generate(user_input, user_data, history=history, context=context)
+
+
+def generate_ai_response(user_input, user_data, store=None, backend=None, stream=False, history=None):
+    """Generate AI responses based on user input and profile.
+
+    ``history`` is the earlier conversation to answer in the context of.
+    Excerpts of the student's notes in ``store`` that match the input are
+    given to the backend as ``context``, for it to ground the answer in.
+    With ``stream=True`` this returns an iterator of text chunks instead,
+    so the reply can be shown as it is produced.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if stream:
+        return _stream_response(user_input, user_data, backend, history, store)
+    return backend.generate(user_input, user_data, history=history, context=_context_for(backend, store, user_input))
+
+
+class ResponseTiming:
+    """Time to first chunk and total time of a streamed reply, in milliseconds.
+
+    ``ttft_ms`` stays None if the stream ends without producing a chunk.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.ttft_ms = None
+        self.total_ms = None
+
+    def track(self, chunks):
+        """Pass chunks through, timing from the first request for one"""
+        started = self.clock()
+        try:
+            for chunk in chunks:
+                if self.ttft_ms is None:
+                    self.ttft_ms = (self.clock() - started) * 1000
+                yield chunk
+        finally:
+            self.total_ms = (self.clock() - started) * 1000
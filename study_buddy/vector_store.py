@@ -0,0 +1,349 @@
+"""Per-user FAISS vector index over uploaded study material.
+
+Each store lives in its own directory:
+
+- ``vectors.f32``: append-only float32 embeddings, one row per chunk
+- ``chunks.jsonl`` / ``offsets.u64``: chunk metadata and its byte offsets
+- ``index.faiss``: a snapshot of the FAISS index, written by ``save()``
+- ``keywords.npz``: a snapshot of the BM25 keyword index over the same
+  chunks (see ``study_buddy.retrieval``), also written by ``save()``
+
+Adding chunks appends to the logs and the in-memory index, so nothing is
+rebuilt. On load the snapshot is read and any rows appended after it are
+replayed from a memory map of ``vectors.f32``, so a restart never
+re-embeds anything. The keyword index likewise re-reads only chunks
+added after its snapshot. The flat index itself is held in memory, 4
+bytes per dimension per chunk, so callers should bound how many stores
+they keep open.
+
+Several server processes may open the same store. Appends and loads hold
+an exclusive ``flock`` on ``.lock`` (where the platform has one), and each
+process indexes rows that others appended before it searches or adds.
+``clear()`` bumps a generation number, which tells the other processes to
+drop what they have loaded.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from array import array
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+from typing import NamedTuple
+
+import numpy as np
+
+from study_buddy.config import data_dir
+from study_buddy.lazy import lazy_import
+from study_buddy.retrieval import KeywordIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: one server process per store
+    fcntl = None
+
+faiss = lazy_import("faiss")
+
+INDEX_FILE = "index.faiss"
+VECTORS_FILE = "vectors.f32"
+CHUNKS_FILE = "chunks.jsonl"
+OFFSETS_FILE = "offsets.u64"
+KEYWORDS_FILE = "keywords.npz"
+LOCK_FILE = ".lock"
+GENERATION_FILE = "generation"
+
+_TOKEN_RE = re.compile(r"\w+")
+_REPLAY_ROWS = 65536
+
+
+class SearchResult(NamedTuple):
+    id: int
+    score: float
+    source: str
+    page: int
+    text: str
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token):
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder using the hashing trick.
+
+    Needs no model download, which makes it suitable for offline use and
+    tests. Any object with a ``dim`` attribute and an ``embed(texts)``
+    method returning an ``(n, dim)`` float32 array can replace it.
+    """
+
+    def __init__(self, dim=256):
+        self.dim = dim
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hashes = [_token_hash(token) for token in _TOKEN_RE.findall(text.lower())]
+            if not hashes:
+                continue
+            hashes = np.array(hashes, dtype=np.uint64)
+            columns = (hashes % np.uint64(self.dim)).astype(np.intp)
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], columns, signs)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+class VectorStore:
+    """Incrementally built, persisted FAISS index of study-material chunks"""
+
+    def __init__(self, path, embedder=None):
+        self.path = path
+        self.embedder = embedder or HashingEmbedder()
+        self.dim = self.embedder.dim
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        # Another process may be mid-append, which would look like a crash to repair
+        with self._file_lock():
+            self._load()
+
+    def _load(self):
+        self._generation = self._read_generation()
+        self._offsets = self._load_offsets()
+        self._index = self._load_index()
+        self.keywords = self._load_keywords()
+
+    def __len__(self):
+        return self._index.ntotal
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the store's files, held across processes"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._file(LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_generation(self):
+        try:
+            with open(self._file(GENERATION_FILE), encoding="ascii") as f:
+                return int(f.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _catch_up(self, file_locked=False):
+        """Index rows that other processes appended since this one last looked"""
+        if self._read_generation() != self._generation:
+            # Another process cleared the store
+            if file_locked:
+                self._load()
+            else:
+                with self._file_lock():
+                    self._load()
+            return
+        offsets_path = self._file(OFFSETS_FILE)
+        rows = os.path.getsize(offsets_path) // 8 if os.path.exists(offsets_path) else 0
+        start = len(self._offsets)
+        if rows <= start:
+            return
+        # Offsets are appended last, so the vectors and chunks for these rows are complete
+        with open(offsets_path, "rb") as f:
+            f.seek(start * 8)
+            self._offsets.frombytes(f.read((rows - start) * 8))
+        vectors = np.memmap(self._file(VECTORS_FILE), dtype=np.float32, mode="r", shape=(rows, self.dim))
+        self._index.add(np.ascontiguousarray(vectors[start:rows]))
+        del vectors
+        with open(self._file(CHUNKS_FILE), "rb") as f:
+            f.seek(self._offsets[start])
+            self.keywords.add([json.loads(line)['text'] for line in islice(f, rows - start)])
+
+    def refresh(self):
+        """Pick up chunks other processes added to this store"""
+        with self._lock:
+            self._catch_up()
+
+    def _load_offsets(self):
+        offsets = array("Q")
+        if os.path.exists(self._file(OFFSETS_FILE)):
+            with open(self._file(OFFSETS_FILE), "rb") as f:
+                offsets.frombytes(f.read())
+        return offsets
+
+    def _load_index(self):
+        row_bytes = 4 * self.dim
+        vectors_path = self._file(VECTORS_FILE)
+        n_vectors = os.path.getsize(vectors_path) // row_bytes if os.path.exists(vectors_path) else 0
+
+        # A crash between the two appends can leave one log a row ahead
+        rows = min(n_vectors, len(self._offsets))
+        if rows < n_vectors:
+            os.truncate(vectors_path, rows * row_bytes)
+        if rows < len(self._offsets):
+            del self._offsets[rows:]
+            with open(self._file(OFFSETS_FILE), "wb") as f:
+                self._offsets.tofile(f)
+
+        index = None
+        if os.path.exists(self._file(INDEX_FILE)):
+            index = faiss.read_index(self._file(INDEX_FILE))
+            if index.d != self.dim or index.ntotal > rows:
+                index = None  # stale snapshot, rebuild from the logs
+        if index is None:
+            index = faiss.IndexFlatIP(self.dim)
+
+        if index.ntotal < rows:
+            vectors = np.memmap(vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+            for start in range(index.ntotal, rows, _REPLAY_ROWS):
+                index.add(np.ascontiguousarray(vectors[start:start + _REPLAY_ROWS]))
+            del vectors
+        return index
+
+    def _load_keywords(self):
+        keywords = KeywordIndex(self._file(KEYWORDS_FILE))
+        if len(keywords) > len(self):
+            keywords = KeywordIndex()  # stale snapshot, rebuild from the chunk log
+        if len(keywords) < len(self):
+            with open(self._file(CHUNKS_FILE), "rb") as f:
+                f.seek(self._offsets[len(keywords)])
+                batch = []
+                for line in islice(f, len(self) - len(keywords)):
+                    batch.append(json.loads(line)['text'])
+                    if len(batch) == _REPLAY_ROWS:
+                        keywords.add(batch)
+                        batch = []
+                keywords.add(batch)
+        keywords.path = self._file(KEYWORDS_FILE)
+        return keywords
+
+    def add_chunks(self, chunks, source, vectors=None, document=None):
+        """Index ingest.Chunk objects from one uploaded document, embedding them unless vectors are given.
+
+        ``source`` is the name shown when the chunks are cited; ``document``,
+        the upload's content digest, tells apart different files of the same name.
+        """
+        chunks = list(chunks)
+        if not chunks:
+            return
+        metadata = [{'source': source, 'page': chunk.page, 'text': chunk.text} for chunk in chunks]
+        if document is not None:
+            for record in metadata:
+                record['document'] = document
+        if vectors is None:
+            vectors = self.embedder.embed([chunk.text for chunk in chunks])
+        self.add_vectors(vectors, metadata)
+
+    def add_notes(self, texts, source):
+        """Embed and index short texts that are not from a document, such as chat messages"""
+        texts = [text for text in texts if text.strip()]
+        if texts:
+            self.add_vectors(self.embedder.embed(texts), [{'source': source, 'page': 0, 'text': text} for text in texts])
+
+    def add_vectors(self, vectors, metadata):
+        """Append precomputed embeddings and their metadata"""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != self.dim:
+            raise ValueError(f"expected vectors of shape (n, {self.dim}), got {vectors.shape}")
+        if len(vectors) != len(metadata):
+            raise ValueError("vectors and metadata must have the same length")
+        with self._lock, self._file_lock():
+            self._catch_up(file_locked=True)
+            with open(self._file(CHUNKS_FILE), "ab") as f:
+                position = f.tell()
+                new_offsets = array("Q")
+                for record in metadata:
+                    line = (json.dumps(record, ensure_ascii=False) + "\n").encode()
+                    new_offsets.append(position)
+                    f.write(line)
+                    position += len(line)
+            with open(self._file(VECTORS_FILE), "ab") as f:
+                f.write(vectors.tobytes())
+            with open(self._file(OFFSETS_FILE), "ab") as f:
+                new_offsets.tofile(f)
+            self._offsets.extend(new_offsets)
+            self._index.add(vectors)
+            self.keywords.add([record['text'] for record in metadata])
+
+    def save(self):
+        """Write an index snapshot so the next load skips replaying the log"""
+        with self._lock:
+            # Rows another process cleared must not be written back into the snapshot
+            self._catch_up()
+            tmp = self._file(f"{INDEX_FILE}.{os.getpid()}.tmp")
+            faiss.write_index(self._index, tmp)
+            os.replace(tmp, self._file(INDEX_FILE))
+            self.keywords.save()
+
+    def clear(self):
+        """Delete every chunk, for this process and every other one sharing the store"""
+        with self._lock, self._file_lock():
+            for name in (INDEX_FILE, VECTORS_FILE, CHUNKS_FILE, OFFSETS_FILE, KEYWORDS_FILE):
+                if os.path.exists(self._file(name)):
+                    os.unlink(self._file(name))
+            tmp = self._file(f"{GENERATION_FILE}.{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="ascii") as f:
+                f.write(str(self._read_generation() + 1))
+            os.replace(tmp, self._file(GENERATION_FILE))
+            self._load()
+
+    def iter_chunks(self, source=None, document=None):
+        """Stored chunk metadata in insertion order, optionally only one document's.
+
+        A document is picked by its content digest; chunks indexed without
+        one are matched by ``source`` name instead.
+        """
+        if not os.path.exists(self._file(CHUNKS_FILE)):
+            return
+        with open(self._file(CHUNKS_FILE), "rb") as f:
+            for line in f:
+                record = json.loads(line)
+                if document is not None and 'document' in record:
+                    matches = record['document'] == document
+                elif source is not None:
+                    matches = record['source'] == source
+                else:
+                    matches = document is None
+                if matches:
+                    yield record
+
+    def search(self, query, k=3):
+        """Return up to k chunks most similar to the query text"""
+        self.refresh()
+        if not len(self):
+            return []
+        return self.search_vectors(self.embedder.embed([query]), k)[0]
+
+    def search_vectors(self, queries, k=3):
+        """Top-k search for a batch of query embeddings"""
+        with self._lock:
+            self._catch_up()
+            scores, ids = self._index.search(np.ascontiguousarray(queries, dtype=np.float32), k)
+        return [self.get_chunks([chunk_id for chunk_id in row_ids if chunk_id >= 0], row_scores) for row_ids, row_scores in zip(ids, scores)]
+
+    def get_chunks(self, chunk_ids, scores=None):
+        """SearchResults for stored chunk ids, with the given scores or 0.0"""
+        results = []
+        if not len(chunk_ids):
+            return results
+        with open(self._file(CHUNKS_FILE), "rb") as f:
+            for chunk_id, score in zip(chunk_ids, scores if scores is not None else [0.0] * len(chunk_ids)):
+                f.seek(self._offsets[chunk_id])
+                record = json.loads(f.readline())
+                results.append(SearchResult(int(chunk_id), float(score), record['source'], record['page'], record['text']))
+        return results
+
+
+def store_for_user(user_id, embedder=None):
+    """Open the vector store that belongs to a student, by storage user id"""
+    return VectorStore(data_dir("vectors", f"user-{int(user_id)}"), embedder=embedder)
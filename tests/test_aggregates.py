@@ -0,0 +1,88 @@
+"""Running dashboard totals against a full recompute from storage."""
+
+import pytest
+
+from study_buddy.aggregates import StudyAggregates
+from study_buddy.storage import Storage
+
+DAY = 24 * 3600
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return Storage(str(tmp_path / "study.db"))
+
+
+@pytest.fixture
+def user_id(storage):
+    return storage.get_or_create_user("Ann")['id']
+
+
+def record_session(storage, aggregates, user_id, topic, duration, started_at):
+    revision = storage.add_session(user_id, topic, duration, started_at)
+    aggregates.add_session(topic, duration, started_at, revision)
+
+
+def record_quiz(storage, aggregates, user_id, score):
+    revision = storage.add_quiz_attempt(user_id, score)
+    aggregates.add_quiz_score(score, revision)
+
+
+def test_incremental_updates_match_recompute(storage, user_id):
+    aggregates = StudyAggregates.from_storage(storage, user_id)
+    for i, (topic, duration) in enumerate([("Algebra", 30), ("Biology", 45), ("Algebra", 15), ("Chemistry", 60)]):
+        record_session(storage, aggregates, user_id, topic, duration, 1_700_000_000 + i * DAY // 2)
+    for score in (80.0, 65.5, 100.0):
+        record_quiz(storage, aggregates, user_id, score)
+
+    aggregates.check_consistency(storage, user_id)
+    assert aggregates.topic_minutes == {"Algebra": 45, "Biology": 45, "Chemistry": 60}
+    assert aggregates.quiz_mean == pytest.approx(245.5 / 3)
+    # Every write went through this object, so nothing needs rebuilding
+    assert not aggregates.sync(storage, user_id)
+
+
+def test_removals_drop_empty_keys(storage, user_id):
+    aggregates = StudyAggregates.from_storage(storage, user_id)
+    aggregates.add_session("Algebra", 30, 1_700_000_000)
+    aggregates.add_quiz_score(90.0)
+    aggregates.remove_session("Algebra", 30, 1_700_000_000)
+    aggregates.remove_quiz_score(90.0)
+
+    aggregates.check_consistency(storage, user_id)
+    assert aggregates.topic_minutes == {} and aggregates.day_minutes == {}
+    with pytest.raises(KeyError):
+        aggregates.remove_session("Algebra", 30, 1_700_000_000)
+    with pytest.raises(KeyError):
+        aggregates.remove_quiz_score(90.0)
+
+
+def test_check_consistency_reports_drift(storage, user_id):
+    aggregates = StudyAggregates.from_storage(storage, user_id)
+    storage.add_session(user_id, "Algebra", 30, 1_700_000_000)
+
+    with pytest.raises(AssertionError, match="session_count"):
+        aggregates.check_consistency(storage, user_id)
+
+
+def test_sync_rebuilds_after_writes_elsewhere(storage, user_id):
+    aggregates = StudyAggregates.from_storage(storage, user_id)
+    other = StudyAggregates.from_storage(storage, user_id)
+    record_session(storage, other, user_id, "Algebra", 30, 1_700_000_000)
+    version = aggregates.version
+
+    assert aggregates.sync(storage, user_id)
+    assert aggregates.version > version
+    aggregates.check_consistency(storage, user_id)
+    assert aggregates.snapshot() == other.snapshot()
+
+
+def test_out_of_order_revision_marks_totals_stale(storage, user_id):
+    aggregates = StudyAggregates.from_storage(storage, user_id)
+    storage.add_session(user_id, "Biology", 20, 1_700_000_000)
+    record_session(storage, aggregates, user_id, "Algebra", 30, 1_700_000_000)
+
+    # The session written behind this object's back makes the next revision a jump
+    assert aggregates.revision is None
+    assert aggregates.sync(storage, user_id)
+    aggregates.check_consistency(storage, user_id)
@@ -0,0 +1,135 @@
+"""Export and re-import of a student's data, including spaced-repetition state."""
+
+import io
+import json
+import os
+
+import pytest
+
+from study_buddy.aggregates import StudyAggregates
+from study_buddy.export import FORMAT_VERSION, export_file, import_records, read_records
+from study_buddy.quiz import ReviewQueue, answer_item, bank_items
+from study_buddy.records import StudySession
+from study_buddy.storage import Storage
+
+EXPORTS = [("ndjson", False), ("ndjson", True), ("parquet", False)]
+
+
+def open_storage(path):
+    storage = Storage(str(path))
+    storage.add_quiz_items(bank_items())
+    return storage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return open_storage(tmp_path / "study.db")
+
+
+@pytest.fixture
+def student(storage):
+    """A student with sessions, chat, an own quiz item and some answered reviews"""
+    user_id = storage.get_or_create_user("Ann")['id']
+    storage.update_profile(user_id, "Mathematics", "Visual")
+    storage.add_goal(user_id, "Finish algebra")
+    # A timestamp of 0 is a real time, not a missing one
+    storage.add_session(user_id, "Algebra", 30, 0)
+    storage.add_session(user_id, "Geometry", 45, 1_700_000_000)
+    storage.add_message(user_id, "user", "explain mitosis", 1_700_000_100)
+    storage.add_message(user_id, "assistant", "Mitosis is…", 1_700_000_101)
+    storage.add_quiz_items([("Mathematics", "Mine", "What is mine?", ["a", "b"], 1)], owner_id=user_id)
+    storage.enroll_items(user_id, "Mathematics", 1000)
+    queue = ReviewQueue.from_storage(storage, user_id, "Mathematics")
+    due = queue.due(now=2000, limit=100)
+    for item_id in due[:3] + due[-1:]:
+        item = storage.get_quiz_item(item_id)
+        answer_item(storage, queue, user_id, item, item['choices'][0], now=3000)
+    return dict(storage.get_or_create_user("Ann"))
+
+
+def student_data(storage, user_id):
+    profile = storage.get_or_create_user("Ann")
+    assert profile['id'] == user_id
+    return {
+        'profile': (profile['subject'], profile['learning_style']),
+        'goals': [goal['text'] for goal in storage.list_goals(user_id)],
+        'sessions': list(storage.iter_sessions(user_id)),
+        'attempts': list(storage.iter_quiz_attempts(user_id)),
+        'messages': [(m.role, m.content, m.created_at) for m in storage.iter_messages(user_id)],
+        'own_items': list(storage.iter_own_quiz_items(user_id)),
+        'review_states': sorted(map(tuple, storage.iter_review_states(user_id))),
+        'reviews': sorted(map(tuple, storage.iter_item_reviews(user_id))),
+    }
+
+
+def export_and_read(storage, student, fmt, compress, tmp_path):
+    path = export_file(storage, student['id'], student, fmt=fmt, compress=compress, directory=str(tmp_path))
+    try:
+        with open(path, "rb") as f:
+            return list(read_records(f))
+    finally:
+        os.unlink(path)
+
+
+@pytest.mark.parametrize("fmt, compress", EXPORTS)
+def test_round_trip_into_same_student(storage, student, fmt, compress, tmp_path):
+    before = student_data(storage, student['id'])
+    assert before['review_states'] and before['reviews'] and before['own_items']
+    records = export_and_read(storage, student, fmt, compress, tmp_path)
+    aggregates = StudyAggregates.from_storage(storage, student['id'])
+
+    counts = import_records(storage, student['id'], records, aggregates=aggregates)
+
+    assert student_data(storage, student['id']) == before
+    assert counts['review_state'] == len(before['review_states'])
+    assert counts['review'] == len(before['reviews'])
+    assert counts['quiz_item'] == 1
+    aggregates.check_consistency(storage, student['id'])
+
+
+@pytest.mark.parametrize("fmt, compress", EXPORTS)
+def test_round_trip_into_another_database(storage, student, fmt, compress, tmp_path):
+    before = student_data(storage, student['id'])
+    records = export_and_read(storage, student, fmt, compress, tmp_path)
+    other = open_storage(tmp_path / "other.db")
+    # Different ids than in the exporting database
+    other.get_or_create_user("Someone else")
+    user_id = other.get_or_create_user("Ann")['id']
+
+    import_records(other, user_id, records)
+
+    assert student_data(other, user_id) == before
+    # The imported review state carries on scheduling where the student left off
+    due_times = {question: due_at for question, _, due_at, *_ in storage.iter_review_states(student['id'])}
+    assert {question: due_at for question, _, due_at, *_ in other.iter_review_states(user_id)} == due_times
+
+
+def test_version_1_file_still_imports(storage, student, tmp_path):
+    records = [
+        {'type': "header", 'format_version': 1, 'exported_at': 1_700_000_000.0},
+        {'type': "profile", 'name': "Ann", 'subject': "Biology", 'learning_style': "Reading"},
+        {'type': "session", 'topic': "Cells", 'duration': 20, 'started_at': 1_700_000_000.0},
+    ]
+    buffer = io.BytesIO("".join(json.dumps(record) + "\n" for record in records).encode())
+
+    counts = import_records(storage, student['id'], read_records(buffer))
+
+    assert counts == {'profile': 1, StudySession.kind: 1}
+    assert [s.topic for s in storage.iter_sessions(student['id'])] == ["Cells"]
+    assert list(storage.iter_review_states(student['id'])) == []
+
+
+@pytest.mark.parametrize("bad", [
+    [{'type': "profile", 'subject': "Biology"}],
+    [{'type': "header", 'format_version': FORMAT_VERSION + 1}],
+    [{'type': "header", 'format_version': FORMAT_VERSION}, {'type': "session", 'topic': "Cells", 'duration': 20}],
+    [{'type': "header", 'format_version': FORMAT_VERSION},
+     {'type': "review", 'question': "What?", 'own': False, 'grade': "five", 'reviewed_at': 1.0}],
+])
+def test_malformed_file_leaves_data_untouched(storage, student, bad):
+    before = student_data(storage, student['id'])
+
+    with pytest.raises(ValueError):
+        import_records(storage, student['id'], bad)
+
+    assert student_data(storage, student['id']) == before
@@ -0,0 +1,33 @@
+"""Looking up one uploaded document's chunks in a student's vector store."""
+
+import json
+
+from study_buddy.ingest import Chunk
+from study_buddy.vector_store import CHUNKS_FILE, VectorStore
+
+
+def chunks(*texts):
+    return [Chunk(i, 1, text, len(text.split())) for i, text in enumerate(texts)]
+
+
+def test_same_name_documents_are_kept_apart(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.add_chunks(chunks("mitosis splits a cell", "into two"), "notes.pdf", document="aaa")
+    store.add_chunks(chunks("photosynthesis makes sugar"), "notes.pdf", document="bbb")
+
+    assert [r['text'] for r in store.iter_chunks("notes.pdf", "aaa")] == ["mitosis splits a cell", "into two"]
+    assert [r['text'] for r in store.iter_chunks("notes.pdf", "bbb")] == ["photosynthesis makes sugar"]
+    assert len(list(store.iter_chunks())) == 3
+    # Citations still name the file
+    assert {hit.source for hit in store.search("photosynthesis sugar", k=3)} == {"notes.pdf"}
+
+
+def test_chunks_indexed_without_a_digest_match_by_name(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.add_chunks(chunks("older upload"), "notes.pdf")
+    store.add_chunks(chunks("newer upload"), "notes.pdf", document="bbb")
+    with open(tmp_path / CHUNKS_FILE, "rb") as f:
+        assert 'document' not in json.loads(f.readline())
+
+    assert [r['text'] for r in store.iter_chunks("notes.pdf", "aaa")] == ["older upload"]
+    assert [r['text'] for r in store.iter_chunks("other.pdf", "aaa")] == []